@@ -12,6 +12,10 @@ class Config:
     PORT = int(os.getenv('PORT', 5050))
     DEBUG = os.getenv('DEBUG', 'true').lower() == 'true'
     VERSION = os.getenv('VERSION', '1.3.0')
+    # Conexiones largas (/cambios/, /stream/) abiertas a la vez por worker (503 al
+    # superarlo). Debe quedar por debajo de WORKER_CONNECTIONS con gevent, o de
+    # --threads con workers de hilos, para que siempre se atiendan las demas peticiones
+    CONEXIONES_LARGAS_MAX = int(os.getenv('CONEXIONES_LARGAS_MAX', 900))
 
     # Valores iniciales del termostato
     TEMPERATURA_AMBIENTE_INICIAL = int(os.getenv('TEMPERATURA_AMBIENTE_INICIAL', 20))
@@ -36,3 +40,54 @@ class Config:
 
     # Estados válidos del climatizador
     ESTADOS_CLIMATIZADOR_VALIDOS = {"apagado", "encendido", "enfriando", "calentando"}
+
+    # Persistencia del estado: json | atomico | binario | wal | compartido
+    PERSISTIDOR_TIPO = os.getenv('PERSISTIDOR_TIPO', 'json').lower()
+    # Intervalo de volcado diferido (0 = escritura inmediata)
+    PERSISTIDOR_INTERVALO_MS = int(os.getenv('PERSISTIDOR_INTERVALO_MS', 0))
+    # Persistidor atomico: politica de fsync (siempre | escrituras | intervalo)
+    PERSISTIDOR_FSYNC = os.getenv('PERSISTIDOR_FSYNC', 'siempre').lower()
+    PERSISTIDOR_FSYNC_ESCRITURAS = int(os.getenv('PERSISTIDOR_FSYNC_ESCRITURAS', 10))
+    PERSISTIDOR_FSYNC_INTERVALO_MS = int(os.getenv('PERSISTIDOR_FSYNC_INTERVALO_MS', 1000))
+    # Persistidor wal: directorio, entradas entre snapshots y fsync por agregado
+    PERSISTIDOR_WAL_DIRECTORIO = os.getenv('PERSISTIDOR_WAL_DIRECTORIO', 'data/estado_wal')
+    PERSISTIDOR_WAL_COMPACTAR = int(os.getenv('PERSISTIDOR_WAL_COMPACTAR', 1000))
+    PERSISTIDOR_WAL_FSYNC = os.getenv('PERSISTIDOR_WAL_FSYNC', 'true').lower() == 'true'
+
+    # Bus de eventos: capacidad de la cola asincrona (0 = efectos sincronos)
+    EVENTOS_CAPACIDAD = int(os.getenv('EVENTOS_CAPACIDAD', 0))
+    # Con la cola llena: bloquear | descartar (el evento mas antiguo)
+    EVENTOS_DESBORDE = os.getenv('EVENTOS_DESBORDE', 'bloquear').lower()
+
+    # Espera por defecto y maxima (s) de GET /termostato/cambios/ antes de responder 204
+    CAMBIOS_ESPERA_MAX_S = float(os.getenv('CAMBIOS_ESPERA_MAX_S', 30))
+    # Stream SSE: mensajes pendientes por suscriptor, suscriptores por worker
+    # (dentro de CONEXIONES_LARGAS_MAX) y latido (s)
+    STREAM_CAPACIDAD = int(os.getenv('STREAM_CAPACIDAD', 100))
+    STREAM_MAX_SUSCRIPTORES = int(os.getenv('STREAM_MAX_SUSCRIPTORES', 500))
+    STREAM_LATIDO_S = float(os.getenv('STREAM_LATIDO_S', 15))
+
+    # Historial de temperaturas
+    HISTORIAL_MAX_REGISTROS = int(os.getenv('HISTORIAL_MAX_REGISTROS', 100))
+    # Registrar lecturas iguales a la anterior (false = solo cambios)
+    HISTORIAL_REGISTRAR_REPETIDAS = os.getenv('HISTORIAL_REGISTRAR_REPETIDAS', 'true').lower() == 'true'
+    # Implementacion del repositorio: memoria | compacto | sqlite | segmentos | escalonado | compartido
+    HISTORIAL_BACKEND = os.getenv('HISTORIAL_BACKEND', 'memoria').lower()
+    # Backend sqlite: ruta de la base y agrupamiento de commits
+    HISTORIAL_SQLITE_RUTA = os.getenv('HISTORIAL_SQLITE_RUTA', 'data/historial.db')
+    HISTORIAL_SQLITE_LOTE = int(os.getenv('HISTORIAL_SQLITE_LOTE', 50))
+    HISTORIAL_SQLITE_INTERVALO_MS = int(os.getenv('HISTORIAL_SQLITE_INTERVALO_MS', 1000))
+    # Backend segmentos: directorio y tamaño maximo de cada segmento
+    HISTORIAL_SEGMENTOS_DIRECTORIO = os.getenv('HISTORIAL_SEGMENTOS_DIRECTORIO', 'data/historial')
+    HISTORIAL_SEGMENTO_BYTES = int(os.getenv('HISTORIAL_SEGMENTO_BYTES', 1048576))
+    # Backend escalonado: lecturas en memoria y bloques comprimidos en disco
+    HISTORIAL_CALIENTE_REGISTROS = int(os.getenv('HISTORIAL_CALIENTE_REGISTROS', 1000))
+    HISTORIAL_FRIO_BLOQUE = int(os.getenv('HISTORIAL_FRIO_BLOQUE', 4096))
+    HISTORIAL_FRIO_DIRECTORIO = os.getenv('HISTORIAL_FRIO_DIRECTORIO', 'data/historial_frio')
+    # Backend compartido: archivo mapeado por todos los workers (preferible en tmpfs)
+    HISTORIAL_COMPARTIDO_RUTA = os.getenv('HISTORIAL_COMPARTIDO_RUTA', 'data/historial_compartido.bin')
+    # Maximo de intervalos por respuesta de /termostato/historial/agregado/
+    HISTORIAL_AGREGADO_MAX_INTERVALOS = int(os.getenv('HISTORIAL_AGREGADO_MAX_INTERVALOS', 500))
+    # Registros por pagina JSON de /termostato/historial/ sin ?limite= y tope de ?limite=
+    HISTORIAL_LIMITE_DEFAULT = int(os.getenv('HISTORIAL_LIMITE_DEFAULT', 100))
+    HISTORIAL_LIMITE_MAXIMO = int(os.getenv('HISTORIAL_LIMITE_MAXIMO', 1000))
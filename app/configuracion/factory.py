@@ -4,11 +4,24 @@ Reemplaza el patrón Singleton del Configurador con un Factory puro.
 """
 from app.general.termostato import Termostato
 from app.datos import (
+    HistorialRepositorio,
     HistorialRepositorioMemoria,
+    HistorialRepositorioCompacto,
+    HistorialRepositorioSQLite,
+    HistorialRepositorioSegmentos,
+    HistorialRepositorioEscalonado,
+    HistorialRepositorioCompartido,
     HistorialMapper,
-    TermostatoPersistidorJSON
+    TermostatoPersistidor,
+    TermostatoPersistidorJSON,
+    TermostatoPersistidorAtomico,
+    TermostatoPersistidorBinario,
+    TermostatoPersistidorWAL,
+    TermostatoPersistidorCompartido,
+    TermostatoPersistidorDiferido
 )
 from app.configuracion.config import Config
+from app.servicios.eventos import BusEventos, BusEventosAsincrono
 
 
 class TermostatoFactory:
@@ -37,8 +50,8 @@ class TermostatoFactory:
             Nueva instancia de Termostato con estado cargado
         """
         cfg = config or Config
-        repo = historial_repositorio or TermostatoFactory.crear_historial_repositorio()
-        persist = persistidor or TermostatoFactory.crear_persistidor()
+        repo = historial_repositorio or TermostatoFactory.crear_historial_repositorio(config=cfg)
+        persist = persistidor or TermostatoFactory.crear_persistidor(config=cfg)
 
         termostato = Termostato(
             historial_repositorio=repo,
@@ -46,15 +59,48 @@ class TermostatoFactory:
             temperatura_ambiente_inicial=cfg.TEMPERATURA_AMBIENTE_INICIAL,
             temperatura_deseada_inicial=cfg.TEMPERATURA_DESEADA_INICIAL,
             carga_bateria_inicial=cfg.CARGA_BATERIA_INICIAL,
-            indicador_calc=indicador_calc
+            indicador_calc=indicador_calc,
+            registrar_repetidas=cfg.HISTORIAL_REGISTRAR_REPETIDAS,
+            bus=TermostatoFactory.crear_bus_eventos(cfg)
         )
         termostato.cargar_estado()
         return termostato
 
     @staticmethod
-    def crear_historial_repositorio() -> HistorialRepositorioMemoria:
-        """Crea un nuevo repositorio de historial en memoria."""
-        return HistorialRepositorioMemoria()
+    def crear_historial_repositorio(capacidad: int = None, config=None) -> HistorialRepositorio:
+        """Crea un nuevo repositorio de historial segun HISTORIAL_BACKEND.
+
+        Args:
+            capacidad: Cantidad maxima de registros (default: HISTORIAL_MAX_REGISTROS)
+            config: Clase de configuración (default: Config)
+        """
+        cfg = config or Config
+        capacidad = capacidad or cfg.HISTORIAL_MAX_REGISTROS
+        if cfg.HISTORIAL_BACKEND == 'compacto':
+            return HistorialRepositorioCompacto(capacidad)
+        if cfg.HISTORIAL_BACKEND == 'sqlite':
+            return HistorialRepositorioSQLite(
+                ruta=cfg.HISTORIAL_SQLITE_RUTA,
+                lote=cfg.HISTORIAL_SQLITE_LOTE,
+                intervalo_ms=cfg.HISTORIAL_SQLITE_INTERVALO_MS
+            )
+        if cfg.HISTORIAL_BACKEND == 'segmentos':
+            return HistorialRepositorioSegmentos(
+                directorio=cfg.HISTORIAL_SEGMENTOS_DIRECTORIO,
+                tamano_segmento=cfg.HISTORIAL_SEGMENTO_BYTES
+            )
+        if cfg.HISTORIAL_BACKEND == 'escalonado':
+            return HistorialRepositorioEscalonado(
+                directorio=cfg.HISTORIAL_FRIO_DIRECTORIO,
+                capacidad_caliente=cfg.HISTORIAL_CALIENTE_REGISTROS,
+                tamano_bloque=cfg.HISTORIAL_FRIO_BLOQUE
+            )
+        if cfg.HISTORIAL_BACKEND == 'compartido':
+            return HistorialRepositorioCompartido(ruta=cfg.HISTORIAL_COMPARTIDO_RUTA,
+                                                  capacidad=capacidad)
+        if cfg.HISTORIAL_BACKEND == 'memoria':
+            return HistorialRepositorioMemoria(capacidad)
+        raise ValueError(f"HISTORIAL_BACKEND desconocido: '{cfg.HISTORIAL_BACKEND}'")
 
     @staticmethod
     def crear_historial_mapper() -> HistorialMapper:
@@ -62,10 +108,59 @@ class TermostatoFactory:
         return HistorialMapper()
 
     @staticmethod
-    def crear_persistidor(ruta: str = None) -> TermostatoPersistidorJSON:
-        """Crea un nuevo persistidor JSON.
+    def crear_bus_eventos(config=None) -> BusEventos:
+        """Crea el bus de eventos del servicio.
+
+        Si EVENTOS_CAPACIDAD es mayor que 0, historial y persistencia se
+        ejecutan en un hilo de fondo con una cola de esa capacidad.
+
+        Args:
+            config: Clase de configuración (default: Config)
+        """
+        cfg = config or Config
+        if cfg.EVENTOS_CAPACIDAD > 0:
+            return BusEventosAsincrono(cfg.EVENTOS_CAPACIDAD, cfg.EVENTOS_DESBORDE)
+        return BusEventos()
+
+    @staticmethod
+    def crear_persistidor(ruta: str = None, config=None) -> TermostatoPersistidor:
+        """Crea un nuevo persistidor segun PERSISTIDOR_TIPO.
+
+        Si PERSISTIDOR_INTERVALO_MS es mayor que 0, las escrituras se
+        difieren y se vuelcan en segundo plano con ese intervalo. No se
+        admite con el persistidor compartido: los workers dejarian de
+        sincronizarse a traves del archivo.
 
         Args:
-            ruta: Ruta del archivo JSON (default: ruta configurada)
+            ruta: Ruta del archivo (directorio para wal) (default: ruta configurada)
+            config: Clase de configuración (default: Config)
         """
-        return TermostatoPersistidorJSON(ruta) if ruta else TermostatoPersistidorJSON()
+        cfg = config or Config
+        if cfg.PERSISTIDOR_TIPO == 'compartido' and cfg.PERSISTIDOR_INTERVALO_MS > 0:
+            raise ValueError("PERSISTIDOR_TIPO=compartido no admite PERSISTIDOR_INTERVALO_MS > 0")
+        if cfg.PERSISTIDOR_TIPO == 'atomico':
+            argumentos = {'ruta': ruta} if ruta else {}
+            persistidor = TermostatoPersistidorAtomico(
+                fsync=cfg.PERSISTIDOR_FSYNC,
+                fsync_escrituras=cfg.PERSISTIDOR_FSYNC_ESCRITURAS,
+                fsync_intervalo_ms=cfg.PERSISTIDOR_FSYNC_INTERVALO_MS,
+                **argumentos
+            )
+        elif cfg.PERSISTIDOR_TIPO == 'binario':
+            persistidor = TermostatoPersistidorBinario(ruta) if ruta else TermostatoPersistidorBinario()
+        elif cfg.PERSISTIDOR_TIPO == 'compartido':
+            persistidor = (TermostatoPersistidorCompartido(ruta) if ruta
+                           else TermostatoPersistidorCompartido())
+        elif cfg.PERSISTIDOR_TIPO == 'wal':
+            persistidor = TermostatoPersistidorWAL(
+                directorio=ruta or cfg.PERSISTIDOR_WAL_DIRECTORIO,
+                compactar_cada=cfg.PERSISTIDOR_WAL_COMPACTAR,
+                sincronizar=cfg.PERSISTIDOR_WAL_FSYNC
+            )
+        elif cfg.PERSISTIDOR_TIPO == 'json':
+            persistidor = TermostatoPersistidorJSON(ruta) if ruta else TermostatoPersistidorJSON()
+        else:
+            raise ValueError(f"PERSISTIDOR_TIPO desconocido: '{cfg.PERSISTIDOR_TIPO}'")
+        if cfg.PERSISTIDOR_INTERVALO_MS > 0:
+            return TermostatoPersistidorDiferido(persistidor, cfg.PERSISTIDOR_INTERVALO_MS)
+        return persistidor
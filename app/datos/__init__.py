@@ -2,18 +2,39 @@
 Capa de gestion de datos.
 Provee repositorios, mappers y persistidores.
 """
-from app.datos.registro import RegistroTemperatura
+from app.datos.registro import CursorHistorial, RegistroTemperatura
 from app.datos.repositorio import HistorialRepositorio
 from app.datos.mapper import HistorialMapper
 from app.datos.memoria import HistorialRepositorioMemoria
+from app.datos.compacto import HistorialRepositorioCompacto
+from app.datos.sqlite import HistorialRepositorioSQLite
+from app.datos.segmentos import HistorialRepositorioSegmentos
+from app.datos.escalonado import HistorialRepositorioEscalonado
+from app.datos.compartido import HistorialRepositorioCompartido
 from app.datos.persistidor import TermostatoPersistidor
 from app.datos.persistidor_json import TermostatoPersistidorJSON
+from app.datos.persistidor_atomico import TermostatoPersistidorAtomico
+from app.datos.persistidor_binario import TermostatoPersistidorBinario
+from app.datos.persistidor_wal import TermostatoPersistidorWAL
+from app.datos.persistidor_compartido import TermostatoPersistidorCompartido
+from app.datos.persistidor_diferido import TermostatoPersistidorDiferido
 
 __all__ = [
     'RegistroTemperatura',
+    'CursorHistorial',
     'HistorialRepositorio',
     'HistorialMapper',
     'HistorialRepositorioMemoria',
+    'HistorialRepositorioCompacto',
+    'HistorialRepositorioSQLite',
+    'HistorialRepositorioSegmentos',
+    'HistorialRepositorioEscalonado',
+    'HistorialRepositorioCompartido',
     'TermostatoPersistidor',
     'TermostatoPersistidorJSON',
+    'TermostatoPersistidorAtomico',
+    'TermostatoPersistidorBinario',
+    'TermostatoPersistidorWAL',
+    'TermostatoPersistidorCompartido',
+    'TermostatoPersistidorDiferido',
 ]
@@ -0,0 +1,71 @@
+"""
+Agregacion del historial de temperaturas por intervalos de tiempo.
+Reduce muchas lecturas a pocos puntos (min, max, media, cantidad).
+"""
+import re
+from typing import Iterable, List
+
+from app.datos.registro import RegistroTemperatura, epoch_a_timestamp, timestamp_a_epoch
+
+_UNIDADES = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+_PATRON_INTERVALO = re.compile(r'^(\d+)([smhd])$')
+
+
+def parsear_intervalo(texto: str) -> int:
+    """Convierte un intervalo como '30s', '5m', '1h' o '1d' a segundos."""
+    coincidencia = _PATRON_INTERVALO.match((texto or '').strip().lower())
+    if not coincidencia or int(coincidencia.group(1)) == 0:
+        raise ValueError(
+            f"Intervalo invalido '{texto}', se espera un entero positivo "
+            f"seguido de s, m, h o d (ej: 5m)"
+        )
+    return int(coincidencia.group(1)) * _UNIDADES[coincidencia.group(2)]
+
+
+def resumir_por_intervalo(registros: Iterable[RegistroTemperatura], segundos: int,
+                          max_intervalos: int) -> List[dict]:
+    """Agrupa registros ordenados (mas reciente primero) en intervalos fijos.
+
+    Recorre los registros una sola vez y corta al completar max_intervalos,
+    de modo que el tamaño de la respuesta no depende del volumen de datos.
+
+    Returns:
+        Lista de intervalos (mas reciente primero) con inicio, minimo,
+        maximo, media y cantidad
+    """
+    ancho = segundos * 1_000_000
+    intervalos = []
+    clave_actual = None
+    minimo = maximo = suma = cantidad = 0
+
+    for registro in registros:
+        clave = timestamp_a_epoch(registro.timestamp) // ancho
+        temperatura = registro.temperatura
+        if clave != clave_actual:
+            if clave_actual is not None:
+                intervalos.append(_intervalo(clave_actual, ancho, minimo, maximo, suma, cantidad))
+                if len(intervalos) >= max_intervalos:
+                    return intervalos
+            clave_actual = clave
+            minimo = maximo = suma = temperatura
+            cantidad = 1
+            continue
+        minimo = min(minimo, temperatura)
+        maximo = max(maximo, temperatura)
+        suma += temperatura
+        cantidad += 1
+
+    if clave_actual is not None:
+        intervalos.append(_intervalo(clave_actual, ancho, minimo, maximo, suma, cantidad))
+    return intervalos
+
+
+def _intervalo(clave, ancho, minimo, maximo, suma, cantidad) -> dict:
+    """Construye el diccionario de respuesta de un intervalo."""
+    return {
+        'inicio': epoch_a_timestamp(clave * ancho).isoformat(),
+        'minimo': minimo,
+        'maximo': maximo,
+        'media': round(suma / cantidad, 2),
+        'cantidad': cantidad
+    }
@@ -0,0 +1,50 @@
+"""
+Bloqueo exclusivo entre hilos y procesos sobre un archivo.
+"""
+import fcntl
+import os
+import threading
+
+
+class BloqueoArchivo:
+    """Seccion critica compartida por todos los procesos que usan `ruta`.
+
+    Combina un RLock (entre hilos del proceso) con flock sobre el archivo
+    (entre procesos). Es reentrante: un hilo que ya tiene el bloqueo
+    puede volver a tomarlo sin bloquearse.
+    """
+
+    def __init__(self, ruta: str):
+        self._ruta = ruta
+        self._lock = threading.RLock()
+        self._profundidad = 0
+        self._archivo = None
+
+    def __enter__(self) -> 'BloqueoArchivo':
+        self._lock.acquire()
+        try:
+            if self._profundidad == 0:
+                if self._archivo is None:
+                    directorio = os.path.dirname(self._ruta)
+                    if directorio:
+                        os.makedirs(directorio, exist_ok=True)
+                    self._archivo = open(self._ruta, 'a+b')
+                fcntl.flock(self._archivo.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            self._lock.release()
+            raise
+        self._profundidad += 1
+        return self
+
+    def __exit__(self, *excepcion) -> None:
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            fcntl.flock(self._archivo.fileno(), fcntl.LOCK_UN)
+        self._lock.release()
+
+    def cerrar(self) -> None:
+        """Cierra el archivo de bloqueo."""
+        with self._lock:
+            if self._archivo is not None and self._profundidad == 0:
+                self._archivo.close()
+                self._archivo = None
@@ -0,0 +1,34 @@
+"""
+Busqueda binaria sobre secuencias ordenadas por timestamp.
+Usada por los repositorios de historial para consultas por rango.
+"""
+from typing import Callable, Optional, Tuple
+
+
+def buscar_rango(cantidad: int, clave: Callable[[int], object],
+                 desde: Optional[object] = None,
+                 hasta: Optional[object] = None) -> Tuple[int, int]:
+    """Retorna el intervalo [inicio, fin) de indices cuya clave esta en [desde, hasta].
+
+    Args:
+        cantidad: Cantidad de elementos de la secuencia
+        clave: Funcion que retorna la clave del indice i (orden ascendente)
+        desde: Cota inferior inclusiva (None = sin cota)
+        hasta: Cota superior inclusiva (None = sin cota)
+    """
+    inicio = 0 if desde is None else _bisect(cantidad, clave, desde, derecha=False)
+    fin = cantidad if hasta is None else _bisect(cantidad, clave, hasta, derecha=True)
+    return inicio, max(inicio, fin)
+
+
+def _bisect(cantidad, clave, valor, derecha) -> int:
+    """Primer indice con clave > valor (derecha) o clave >= valor (izquierda)."""
+    bajo, alto = 0, cantidad
+    while bajo < alto:
+        medio = (bajo + alto) // 2
+        actual = clave(medio)
+        if actual < valor or (derecha and actual == valor):
+            bajo = medio + 1
+        else:
+            alto = medio
+    return bajo
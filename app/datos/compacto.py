@@ -0,0 +1,127 @@
+"""
+Implementacion compacta (columnar) del repositorio de historial.
+Guarda temperaturas y timestamps en arrays tipados en lugar de objetos.
+"""
+import threading
+import uuid
+from array import array
+from datetime import datetime
+from typing import Iterator, Optional
+
+from app.configuracion.config import Config
+from app.datos.busqueda import buscar_rango
+from app.datos.estadisticas import EstadisticasTemperatura
+from app.datos.registro import (
+    CursorHistorial,
+    RegistroTemperatura,
+    epoch_a_timestamp,
+    timestamp_a_epoch,
+)
+from app.datos.repositorio import HistorialRepositorio
+
+# Registros copiados por cada toma del lock al iterar
+_BLOQUE_LECTURA = 1000
+
+
+class HistorialRepositorioCompacto(HistorialRepositorio):
+    """Repositorio de historial en memoria con almacenamiento por columnas.
+
+    Cada lectura ocupa 12 bytes: la temperatura en un array 'i' y el
+    timestamp en microsegundos desde la epoca en un array 'q'. Los
+    RegistroTemperatura se construyen solo al consultar. Ambos arrays se
+    usan como un buffer circular de capacidad fija. Un lock serializa los
+    agregados de hilos concurrentes.
+    """
+
+    def __init__(self, capacidad: Optional[int] = None):
+        capacidad = Config.HISTORIAL_MAX_REGISTROS if capacidad is None else int(capacidad)
+        if capacidad <= 0:
+            raise ValueError("capacidad debe ser mayor que 0")
+        self._capacidad = capacidad
+        self._temperaturas = array('i', bytes(4 * capacidad))
+        self._timestamps = array('q', bytes(8 * capacidad))
+        self._agregados = 0
+        self._cantidad = 0
+        self._lock = threading.Lock()
+        self._origen = uuid.uuid4().hex[:12]
+        self._modificaciones = 0
+        self._estadisticas = EstadisticasTemperatura(ventana=True)
+
+    @property
+    def capacidad(self) -> int:
+        """Cantidad maxima de registros que conserva el repositorio."""
+        return self._capacidad
+
+    def agregar(self, registro: RegistroTemperatura) -> None:
+        """Agrega un registro sobrescribiendo el mas antiguo si esta lleno."""
+        with self._lock:
+            indice = self._agregados % self._capacidad
+            if self._cantidad == self._capacidad:
+                self._estadisticas.quitar(self._temperaturas[indice])
+            self._estadisticas.agregar(registro.temperatura)
+            self._temperaturas[indice] = registro.temperatura
+            self._timestamps[indice] = timestamp_a_epoch(registro.timestamp)
+            self._agregados += 1
+            self._modificaciones += 1
+            if self._cantidad < self._capacidad:
+                self._cantidad += 1
+
+    def iterar(self, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None,
+               limite: Optional[int] = None,
+               antes_de: Optional[CursorHistorial] = None) -> Iterator[RegistroTemperatura]:
+        """Recorre el rango del mas reciente al mas antiguo construyendo cada registro.
+
+        El cursor `antes_de` se ubica en O(1) por su numero de secuencia.
+        """
+        primero = self._agregados - self._cantidad
+        ultimo = self._agregados if antes_de is None else \
+            max(primero, min(self._agregados, antes_de.secuencia))
+        inicio, fin = buscar_rango(
+            ultimo - primero,
+            lambda i: self._timestamps[(primero + i) % self._capacidad],
+            None if desde is None else timestamp_a_epoch(desde),
+            None if hasta is None else timestamp_a_epoch(hasta)
+        )
+        secuencias = range(primero + fin - 1, primero + inicio - 1, -1)
+        if limite is not None:
+            secuencias = secuencias[:max(0, limite)]
+        for posicion in range(0, len(secuencias), _BLOQUE_LECTURA):
+            bloque = secuencias[posicion:posicion + _BLOQUE_LECTURA]
+            # Ambas columnas se copian juntas: un agregado concurrente no
+            # puede mezclar la temperatura de una lectura con el timestamp de otra
+            with self._lock:
+                vigente = self._agregados - self._cantidad
+                filas = [(secuencia,
+                          self._temperaturas[secuencia % self._capacidad],
+                          self._timestamps[secuencia % self._capacidad])
+                         for secuencia in bloque if secuencia >= vigente]
+            for secuencia, temperatura, epoch in filas:
+                yield RegistroTemperatura(
+                    temperatura=temperatura,
+                    timestamp=epoch_a_timestamp(epoch),
+                    secuencia=secuencia
+                )
+            # Los registros sobrescritos durante el recorrido cortan la iteracion
+            if len(filas) < len(bloque):
+                return
+
+    def cantidad(self) -> int:
+        """Retorna la cantidad de registros almacenados."""
+        return self._cantidad
+
+    def estadisticas(self) -> dict:
+        """Retorna las estadisticas mantenidas incrementalmente."""
+        with self._lock:
+            return self._estadisticas.resumen()
+
+    def version(self) -> str:
+        """Origen de la instancia y cantidad de agregados y limpiezas."""
+        return f'{self._origen}-{self._modificaciones}'
+
+    def limpiar(self) -> None:
+        """Elimina todos los registros."""
+        with self._lock:
+            self._modificaciones += 1
+            self._cantidad = 0
+            self._estadisticas.limpiar()
@@ -0,0 +1,283 @@
+"""
+Implementacion del repositorio de historial en memoria compartida entre procesos.
+Un buffer circular en un archivo mapeado por todos los workers.
+"""
+import math
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime
+from typing import Callable, Iterator, Optional, TypeVar
+
+from app.configuracion.config import Config
+from app.datos.bloqueo import BloqueoArchivo
+from app.datos.busqueda import buscar_rango
+from app.datos.registro import (
+    CursorHistorial,
+    RegistroTemperatura,
+    epoch_a_timestamp,
+    timestamp_a_epoch,
+)
+from app.datos.repositorio import HistorialRepositorio
+
+# magic, version, relleno, capacidad, origen (aleatorio, fijado al crear el archivo)
+_CABECERA = struct.Struct('<4sHHII')
+_MAGIC = b'THRC'
+_VERSION = 2
+# contador del seqlock: impar mientras hay una escritura en curso
+_SECUENCIA = struct.Struct('<Q')
+_DESPLAZAMIENTO_SECUENCIA = _CABECERA.size
+# registros agregados, secuencia del primero vigente, suma, suma de cuadrados,
+# minimo y maximo de las temperaturas vigentes
+_ESTADO = struct.Struct('<QQqqii')
+_DESPLAZAMIENTO_ESTADO = _DESPLAZAMIENTO_SECUENCIA + _SECUENCIA.size
+_DATOS = _DESPLAZAMIENTO_ESTADO + _ESTADO.size
+_TIMESTAMP = struct.Struct('<q')
+_TEMPERATURA = struct.Struct('<i')
+# Lecturas optimistas antes de esperar el bloqueo del escritor
+_REINTENTOS = 1000
+# Registros copiados por cada lectura de iterar()
+_BLOQUE_LECTURA = 1000
+
+T = TypeVar('T')
+
+
+class HistorialRepositorioCompartido(HistorialRepositorio):
+    """Buffer circular de historial compartido por todos los workers.
+
+    Los registros se guardan por columnas (timestamps 'q' y temperaturas
+    'i') en un archivo mapeado con MAP_SHARED; conviene ubicarlo en un
+    tmpfs como /dev/shm. Los agregados se serializan con BloqueoArchivo
+    (un escritor a la vez). Las lecturas no toman el bloqueo: siguen un
+    seqlock, descartando lo leido si el contador cambio o era impar
+    (escritura en curso). Si un escritor murio a mitad de una escritura,
+    el contador queda impar: tras _REINTENTOS lecturas fallidas se toma
+    el bloqueo y se repara.
+
+    iterar() ubica el rango con busqueda binaria directamente sobre el
+    mapa y copia solo esos registros, de a _BLOQUE_LECTURA: obtener(1)
+    lee un registro sin importar la capacidad. Las estadisticas salen de
+    sumas, minimo y maximo mantenidos en la cabecera, por lo que
+    estadisticas() es O(1). agregar() es O(1), salvo cuando desaloja la
+    temperatura que era el minimo o el maximo: entonces los recalcula
+    recorriendo la columna de temperaturas (O(capacidad), en C).
+    version() combina el origen del archivo con el contador del seqlock,
+    por lo que es la misma en todos los workers.
+    """
+
+    def __init__(self, ruta: str = None, capacidad: Optional[int] = None):
+        self._ruta = ruta or Config.HISTORIAL_COMPARTIDO_RUTA
+        capacidad = Config.HISTORIAL_MAX_REGISTROS if capacidad is None else int(capacidad)
+        if capacidad <= 0:
+            raise ValueError("capacidad debe ser mayor que 0")
+        self._capacidad = capacidad
+        self._desplazamiento_temperaturas = _DATOS + _TIMESTAMP.size * capacidad
+        self._tamano = self._desplazamiento_temperaturas + _TEMPERATURA.size * capacidad
+        self._bloqueo = BloqueoArchivo(self._ruta + '.lock')
+        with self._bloqueo:
+            self._archivo, self._mapa = self._abrir()
+
+    @property
+    def capacidad(self) -> int:
+        """Cantidad maxima de registros que conserva el repositorio."""
+        return self._capacidad
+
+    def agregar(self, registro: RegistroTemperatura) -> None:
+        """Agrega un registro sobrescribiendo el mas antiguo si esta lleno."""
+        with self._bloqueo:
+            secuencia = self._reparar()
+            agregados, primero, suma, cuadrados, minimo, maximo = self._estado()
+            indice = agregados % self._capacidad
+            temperatura = registro.temperatura
+            recalcular = False
+            _SECUENCIA.pack_into(self._mapa, _DESPLAZAMIENTO_SECUENCIA, secuencia + 1)
+            if agregados - primero >= self._capacidad:
+                desalojada = _TEMPERATURA.unpack_from(self._mapa, self._temperatura(indice))[0]
+                suma -= desalojada
+                cuadrados -= desalojada * desalojada
+                primero += 1
+                recalcular = desalojada in (minimo, maximo)
+            _TIMESTAMP.pack_into(self._mapa, self._timestamp(indice),
+                                 timestamp_a_epoch(registro.timestamp))
+            _TEMPERATURA.pack_into(self._mapa, self._temperatura(indice), temperatura)
+            if recalcular:
+                # Con desalojo el buffer esta lleno: toda la columna esta vigente
+                temperaturas = array('i', self._mapa[self._desplazamiento_temperaturas:self._tamano])
+                minimo, maximo = min(temperaturas), max(temperaturas)
+            elif agregados == primero:
+                minimo = maximo = temperatura
+            else:
+                minimo, maximo = min(minimo, temperatura), max(maximo, temperatura)
+            _ESTADO.pack_into(self._mapa, _DESPLAZAMIENTO_ESTADO, agregados + 1, primero,
+                              suma + temperatura, cuadrados + temperatura * temperatura,
+                              minimo, maximo)
+            _SECUENCIA.pack_into(self._mapa, _DESPLAZAMIENTO_SECUENCIA, secuencia + 2)
+        registro.secuencia = agregados
+
+    def iterar(self, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None,
+               limite: Optional[int] = None,
+               antes_de: Optional[CursorHistorial] = None) -> Iterator[RegistroTemperatura]:
+        """Recorre el rango, del mas reciente al mas antiguo, copiando de a bloques.
+
+        El rango se ubica con busqueda binaria sobre el mapa y el cursor
+        `antes_de` en O(1) por su numero de secuencia. Cada bloque se
+        copia en una lectura consistente; si los registros que faltan ya
+        fueron sobrescritos por otros agregados, el recorrido termina.
+        """
+        desde_epoch = None if desde is None else timestamp_a_epoch(desde)
+        hasta_epoch = None if hasta is None else timestamp_a_epoch(hasta)
+
+        def ubicar():
+            agregados, primero = self._estado()[:2]
+            ultimo = agregados if antes_de is None else \
+                max(primero, min(agregados, antes_de.secuencia))
+            inicio, fin = buscar_rango(
+                ultimo - primero,
+                lambda i: _TIMESTAMP.unpack_from(self._mapa, self._timestamp((primero + i) % self._capacidad))[0],
+                desde_epoch, hasta_epoch
+            )
+            return primero + inicio, primero + fin
+
+        inicio, fin = self._leer(ubicar)
+        if limite is not None:
+            inicio = max(inicio, fin - max(0, limite))
+        while fin > inicio:
+            comienzo = max(inicio, fin - _BLOQUE_LECTURA)
+            bloque = self._leer(lambda: self._copiar(comienzo, fin))
+            if bloque is None:
+                return
+            timestamps, temperaturas = bloque
+            for desplazamiento in range(fin - comienzo - 1, -1, -1):
+                yield RegistroTemperatura(
+                    temperatura=temperaturas[desplazamiento],
+                    timestamp=epoch_a_timestamp(timestamps[desplazamiento]),
+                    secuencia=comienzo + desplazamiento
+                )
+            fin = comienzo
+
+    def cantidad(self) -> int:
+        """Retorna la cantidad de registros almacenados por todos los procesos."""
+        agregados, primero = self._leer(self._estado)[:2]
+        return agregados - primero
+
+    def estadisticas(self) -> dict:
+        """Retorna las estadisticas mantenidas en la cabecera compartida."""
+        agregados, primero, suma, cuadrados, minimo, maximo = self._leer(self._estado)
+        cantidad = agregados - primero
+        if cantidad == 0:
+            return {
+                'cantidad': 0,
+                'media': None,
+                'desviacion_estandar': None,
+                'minimo': None,
+                'maximo': None
+            }
+        media = suma / cantidad
+        varianza = max(0.0, cuadrados / cantidad - media * media)
+        return {
+            'cantidad': cantidad,
+            'media': round(media, 2),
+            'desviacion_estandar': round(math.sqrt(varianza), 2),
+            'minimo': minimo,
+            'maximo': maximo
+        }
+
+    def version(self) -> str:
+        """Origen del archivo y cantidad de escrituras de todos los procesos."""
+        secuencia = self._leer(
+            lambda: _SECUENCIA.unpack_from(self._mapa, _DESPLAZAMIENTO_SECUENCIA)[0]
+        )
+        return f'{self._origen:08x}-{secuencia // 2}'
+
+    def limpiar(self) -> None:
+        """Elimina todos los registros para todos los procesos."""
+        with self._bloqueo:
+            secuencia = self._reparar()
+            agregados = _ESTADO.unpack_from(self._mapa, _DESPLAZAMIENTO_ESTADO)[0]
+            _SECUENCIA.pack_into(self._mapa, _DESPLAZAMIENTO_SECUENCIA, secuencia + 1)
+            _ESTADO.pack_into(self._mapa, _DESPLAZAMIENTO_ESTADO, agregados, agregados, 0, 0, 0, 0)
+            _SECUENCIA.pack_into(self._mapa, _DESPLAZAMIENTO_SECUENCIA, secuencia + 2)
+
+    def cerrar(self) -> None:
+        """Libera el mmap y los archivos de este proceso."""
+        with self._bloqueo:
+            self._mapa.close()
+            self._archivo.close()
+        self._bloqueo.cerrar()
+
+    def _leer(self, lectura: Callable[[], T]) -> T:
+        """Ejecuta `lectura` hasta obtener un resultado sin escrituras intercaladas."""
+        for _ in range(_REINTENTOS):
+            antes = _SECUENCIA.unpack_from(self._mapa, _DESPLAZAMIENTO_SECUENCIA)[0]
+            if antes % 2 == 0:
+                resultado = lectura()
+                if _SECUENCIA.unpack_from(self._mapa, _DESPLAZAMIENTO_SECUENCIA)[0] == antes:
+                    return resultado
+        with self._bloqueo:
+            self._reparar()
+            return lectura()
+
+    def _estado(self):
+        """Retorna (agregados, primero, suma, suma de cuadrados, minimo, maximo)."""
+        return _ESTADO.unpack_from(self._mapa, _DESPLAZAMIENTO_ESTADO)
+
+    def _copiar(self, inicio: int, fin: int):
+        """Copia (timestamps, temperaturas) de las secuencias [inicio, fin).
+
+        Retorna None si alguna ya fue sobrescrita o eliminada.
+        """
+        if inicio < self._estado()[1]:
+            return None
+        timestamps = array('q')
+        temperaturas = array('i')
+        desde = inicio % self._capacidad
+        tramos = [(desde, min(self._capacidad, desde + fin - inicio))]
+        if desde + fin - inicio > self._capacidad:
+            tramos.append((0, desde + fin - inicio - self._capacidad))
+        for a, b in tramos:
+            timestamps.frombytes(self._mapa[self._timestamp(a):self._timestamp(b)])
+            temperaturas.frombytes(self._mapa[self._temperatura(a):self._temperatura(b)])
+        return timestamps, temperaturas
+
+    @staticmethod
+    def _timestamp(indice: int) -> int:
+        """Desplazamiento del timestamp en el indice del buffer."""
+        return _DATOS + _TIMESTAMP.size * indice
+
+    def _temperatura(self, indice: int) -> int:
+        """Desplazamiento de la temperatura en el indice del buffer."""
+        return self._desplazamiento_temperaturas + _TEMPERATURA.size * indice
+
+    def _reparar(self) -> int:
+        """Cierra una escritura interrumpida (contador impar). Requiere el bloqueo."""
+        secuencia = _SECUENCIA.unpack_from(self._mapa, _DESPLAZAMIENTO_SECUENCIA)[0]
+        if secuencia % 2:
+            secuencia += 1
+            _SECUENCIA.pack_into(self._mapa, _DESPLAZAMIENTO_SECUENCIA, secuencia)
+        return secuencia
+
+    def _abrir(self):
+        """Mapea el archivo, creandolo si no existe. Requiere el bloqueo."""
+        directorio = os.path.dirname(self._ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        nuevo = not os.path.exists(self._ruta) or os.path.getsize(self._ruta) == 0
+        archivo = open(self._ruta, 'w+b' if nuevo else 'r+b')
+        if nuevo:
+            archivo.truncate(self._tamano)
+        elif os.path.getsize(self._ruta) != self._tamano:
+            archivo.close()
+            raise ValueError(f"El historial compartido {self._ruta} tiene otra capacidad")
+        mapa = mmap.mmap(archivo.fileno(), self._tamano)
+        if nuevo:
+            self._origen = int.from_bytes(os.urandom(4), 'little')
+            _CABECERA.pack_into(mapa, 0, _MAGIC, _VERSION, 0, self._capacidad, self._origen)
+        else:
+            magic, version, _, capacidad, self._origen = _CABECERA.unpack_from(mapa, 0)
+            if magic != _MAGIC or version != _VERSION or capacidad != self._capacidad:
+                mapa.close()
+                archivo.close()
+                raise ValueError(f"Historial compartido invalido: {self._ruta}")
+        return archivo, mapa
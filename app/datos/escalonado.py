@@ -0,0 +1,318 @@
+"""
+Implementacion escalonada del repositorio de historial.
+Mantiene las lecturas recientes en memoria y archiva las antiguas
+en segmentos comprimidos en disco.
+"""
+import atexit
+import os
+import struct
+import threading
+import uuid
+import zlib
+from array import array
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+from app.configuracion.config import Config
+from app.datos.busqueda import buscar_rango
+from app.datos.estadisticas import Acumulado, EstadisticasTemperatura, acumular
+from app.datos.registro import (
+    CursorHistorial,
+    RegistroTemperatura,
+    epoch_a_timestamp,
+    timestamp_a_epoch,
+)
+from app.datos.repositorio import HistorialRepositorio
+
+# magic, cantidad de registros, primer y ultimo timestamp (microsegundos),
+# suma y suma de cuadrados, minimo y maximo de las temperaturas
+_CABECERA = struct.Struct('<4sIqqqqii')
+_MAGIC = b'THF2'
+_PREFIJO = 'frio_'
+_EXTENSION = '.seg'
+# Diario del nivel caliente: secuencia del primer registro y luego (timestamp, temperatura)
+_DIARIO = 'caliente.log'
+_CABECERA_DIARIO = struct.Struct('<q')
+_REGISTRO_DIARIO = struct.Struct('<qi')
+
+
+class _SegmentoFrio:
+    """Indice de un segmento frio: rango de tiempo, cantidad y sumas de sus registros.
+
+    `base` es la secuencia de su primer registro.
+    """
+
+    def __init__(self, ruta: str, numero: int, base: int, desde: int, hasta: int,
+                 acumulado: Acumulado):
+        self.ruta = ruta
+        self.numero = numero
+        self.base = base
+        self.cantidad = acumulado.cantidad
+        self.desde = desde
+        self.hasta = hasta
+        self.acumulado = acumulado
+
+    @classmethod
+    def abrir(cls, ruta: str, numero: int, base: int) -> '_SegmentoFrio':
+        """Lee solo la cabecera del segmento."""
+        with open(ruta, 'rb') as archivo:
+            crudo = archivo.read(_CABECERA.size)
+        if len(crudo) < _CABECERA.size or crudo[:4] != _MAGIC:
+            raise ValueError(f"Segmento frio invalido: {ruta}")
+        _, cantidad, desde, hasta, suma, cuadrados, minimo, maximo = _CABECERA.unpack(crudo)
+        return cls(ruta, numero, base, desde, hasta,
+                   Acumulado(cantidad, suma, cuadrados, minimo, maximo))
+
+    def leer(self) -> Tuple[array, array]:
+        """Descomprime el segmento y retorna (timestamps, temperaturas)."""
+        with open(self.ruta, 'rb') as archivo:
+            archivo.seek(_CABECERA.size)
+            datos = zlib.decompress(archivo.read())
+        timestamps = array('q')
+        temperaturas = array('i')
+        corte = self.cantidad * timestamps.itemsize
+        timestamps.frombytes(datos[:corte])
+        temperaturas.frombytes(datos[corte:])
+        return timestamps, temperaturas
+
+
+class HistorialRepositorioEscalonado(HistorialRepositorio):
+    """Repositorio de historial con retencion completa en dos niveles.
+
+    Nivel caliente: las ultimas lecturas en arrays en memoria. Cuando
+    superan `capacidad_caliente + tamano_bloque`, el bloque mas antiguo
+    se comprime con zlib y se escribe como segmento frio en disco. Cada
+    segmento lleva en su cabecera la cantidad y el rango de timestamps,
+    que se mantiene en memoria como indice: las consultas solo
+    descomprimen los segmentos que intersectan lo pedido. La cabecera
+    guarda tambien las sumas de temperaturas, con las que se reconstruyen
+    las estadisticas al abrir sin descomprimir ningun segmento. El nivel
+    caliente se archiva al cerrar el repositorio (y en atexit).
+
+    Cada lectura del nivel caliente se agrega ademas a un diario en el
+    mismo directorio (una escritura sin fsync), que se reescribe al
+    archivar un bloque y se reproduce al abrir: una caida del proceso
+    (excepcion, OOM, SIGKILL) no pierde lecturas. Un corte de energia
+    puede perder las que el sistema operativo aun no escribio a disco.
+    """
+
+    def __init__(self, directorio: str = None, capacidad_caliente: int = None,
+                 tamano_bloque: int = None):
+        self._directorio = directorio or Config.HISTORIAL_FRIO_DIRECTORIO
+        self._capacidad_caliente = capacidad_caliente or Config.HISTORIAL_CALIENTE_REGISTROS
+        self._tamano_bloque = max(1, tamano_bloque or Config.HISTORIAL_FRIO_BLOQUE)
+        self._lock = threading.RLock()
+        self._timestamps = array('q')
+        self._temperaturas = array('i')
+        self._cache: Optional[Tuple[_SegmentoFrio, array, array]] = None
+        self._origen = uuid.uuid4().hex[:12]
+        self._modificaciones = 0
+        os.makedirs(self._directorio, exist_ok=True)
+        self._segmentos: List[_SegmentoFrio] = self._abrir_segmentos()
+        # Secuencia del registro mas antiguo del nivel caliente
+        self._base_caliente = sum(s.cantidad for s in self._segmentos)
+        self._diario = None
+        self._recuperar_diario()
+        # Estadisticas iniciales: las sumas de cada cabecera, sin descomprimir
+        self._estadisticas = EstadisticasTemperatura()
+        for segmento in self._segmentos:
+            self._estadisticas.combinar(segmento.acumulado)
+        for temperatura in self._temperaturas:
+            self._estadisticas.agregar(temperatura)
+        atexit.register(self.cerrar)
+
+    def agregar(self, registro: RegistroTemperatura) -> None:
+        """Agrega al nivel caliente y archiva un bloque si se excede."""
+        with self._lock:
+            epoch = timestamp_a_epoch(registro.timestamp)
+            if self._diario is None:
+                self._reescribir_diario()
+            self._diario.write(_REGISTRO_DIARIO.pack(epoch, registro.temperatura))
+            self._timestamps.append(epoch)
+            self._temperaturas.append(registro.temperatura)
+            self._modificaciones += 1
+            self._estadisticas.agregar(registro.temperatura)
+            if len(self._timestamps) >= self._capacidad_caliente + self._tamano_bloque:
+                self._archivar(self._tamano_bloque)
+
+    def iterar(self, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None,
+               limite: Optional[int] = None,
+               antes_de: Optional[CursorHistorial] = None) -> Iterator[RegistroTemperatura]:
+        """Recorre el rango de a un nivel por vez: caliente y luego cada segmento frio.
+
+        El cursor `antes_de` descarta por su secuencia el nivel caliente o
+        los segmentos posteriores sin descomprimirlos.
+        """
+        desde_epoch = None if desde is None else timestamp_a_epoch(desde)
+        hasta_epoch = None if hasta is None else timestamp_a_epoch(hasta)
+        restantes = float('inf') if limite is None else max(0, limite)
+        tope = None if antes_de is None else antes_de.secuencia
+        with self._lock:
+            segmentos = list(self._segmentos)
+            lote, continuar = self._filtrar(self._timestamps, self._temperaturas,
+                                            self._base_caliente, desde_epoch,
+                                            hasta_epoch, restantes, tope)
+        yield from lote
+        restantes -= len(lote)
+        for segmento in reversed(segmentos):
+            if not continuar or restantes <= 0:
+                return
+            if tope is not None and segmento.base >= tope:
+                continue
+            if desde_epoch is not None and segmento.hasta < desde_epoch:
+                return
+            if hasta_epoch is not None and segmento.desde > hasta_epoch:
+                continue
+            with self._lock:
+                if segmento not in self._segmentos:
+                    return
+                timestamps, temperaturas = self._leer_segmento(segmento)
+            lote, continuar = self._filtrar(timestamps, temperaturas, segmento.base,
+                                            desde_epoch, hasta_epoch, restantes, tope)
+            yield from lote
+            restantes -= len(lote)
+
+    def cantidad(self) -> int:
+        """Retorna la cantidad de registros en ambos niveles."""
+        return len(self._timestamps) + sum(s.cantidad for s in self._segmentos)
+
+    def estadisticas(self) -> dict:
+        """Retorna las estadisticas mantenidas incrementalmente."""
+        return self._estadisticas.resumen()
+
+    def version(self) -> str:
+        """Origen de la instancia y cantidad de agregados y limpiezas."""
+        return f'{self._origen}-{self._modificaciones}'
+
+    def limpiar(self) -> None:
+        """Elimina el nivel caliente y todos los segmentos frios."""
+        with self._lock:
+            for segmento in self._segmentos:
+                os.remove(segmento.ruta)
+            self._segmentos = []
+            self._base_caliente = 0
+            self._cache = None
+            self._modificaciones += 1
+            self._estadisticas.limpiar()
+            self._timestamps = array('q')
+            self._temperaturas = array('i')
+            self._cerrar_diario()
+            ruta = os.path.join(self._directorio, _DIARIO)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def cerrar(self) -> None:
+        """Archiva el nivel caliente para no perderlo al terminar."""
+        with self._lock:
+            if self._timestamps:
+                self._archivar(len(self._timestamps))
+            self._cerrar_diario()
+        atexit.unregister(self.cerrar)
+
+    def _archivar(self, cantidad: int) -> None:
+        """Comprime los `cantidad` registros mas antiguos del nivel caliente."""
+        timestamps = self._timestamps[:cantidad]
+        temperaturas = self._temperaturas[:cantidad]
+        numero = self._segmentos[-1].numero + 1 if self._segmentos else 1
+        ruta = os.path.join(self._directorio, f"{_PREFIJO}{numero:08d}{_EXTENSION}")
+        temporal = ruta + '.tmp'
+        acumulado = acumular(temperaturas)
+        with open(temporal, 'wb') as archivo:
+            archivo.write(_CABECERA.pack(_MAGIC, cantidad, timestamps[0], timestamps[-1],
+                                         acumulado.suma, acumulado.suma_cuadrados,
+                                         acumulado.minimo, acumulado.maximo))
+            archivo.write(zlib.compress(timestamps.tobytes() + temperaturas.tobytes()))
+        os.replace(temporal, ruta)
+        self._segmentos.append(_SegmentoFrio(ruta, numero, self._base_caliente,
+                                             timestamps[0], timestamps[-1], acumulado))
+        self._base_caliente += cantidad
+        del self._timestamps[:cantidad]
+        del self._temperaturas[:cantidad]
+        self._reescribir_diario()
+
+    def _reescribir_diario(self) -> None:
+        """Reemplaza el diario por el contenido actual del nivel caliente."""
+        self._cerrar_diario()
+        ruta = os.path.join(self._directorio, _DIARIO)
+        with open(ruta + '.tmp', 'wb') as archivo:
+            archivo.write(_CABECERA_DIARIO.pack(self._base_caliente))
+            for epoch, temperatura in zip(self._timestamps, self._temperaturas):
+                archivo.write(_REGISTRO_DIARIO.pack(epoch, temperatura))
+        os.replace(ruta + '.tmp', ruta)
+        self._diario = open(ruta, 'ab', buffering=0)
+
+    def _cerrar_diario(self) -> None:
+        """Cierra el descriptor del diario si esta abierto."""
+        if self._diario is not None:
+            self._diario.close()
+            self._diario = None
+
+    def _recuperar_diario(self) -> None:
+        """Carga en el nivel caliente las lecturas del diario aun no archivadas.
+
+        Si la caida ocurrio entre escribir un segmento y reescribir el
+        diario, sus primeros registros ya estan archivados y se omiten
+        por secuencia. Un registro final incompleto se descarta.
+        """
+        ruta = os.path.join(self._directorio, _DIARIO)
+        if not os.path.exists(ruta):
+            return
+        with open(ruta, 'rb') as archivo:
+            datos = archivo.read()
+        if len(datos) < _CABECERA_DIARIO.size:
+            return
+        base, = _CABECERA_DIARIO.unpack_from(datos)
+        cuerpo = datos[_CABECERA_DIARIO.size:]
+        cuerpo = cuerpo[:len(cuerpo) - len(cuerpo) % _REGISTRO_DIARIO.size]
+        for indice, (epoch, temperatura) in enumerate(_REGISTRO_DIARIO.iter_unpack(cuerpo)):
+            if base + indice >= self._base_caliente:
+                self._timestamps.append(epoch)
+                self._temperaturas.append(temperatura)
+
+    @staticmethod
+    def _filtrar(timestamps: array, temperaturas: array, base: int,
+                 desde_epoch, hasta_epoch, maximo, tope=None):
+        """Registros de un nivel dentro del rango (mas reciente primero).
+
+        Args:
+            base: Secuencia del primer registro del nivel
+            tope: Secuencia exclusiva maxima (None = sin tope)
+
+        Returns:
+            (registros, continuar) donde continuar indica si niveles mas
+            antiguos pueden contener registros del rango
+        """
+        cantidad = len(timestamps) if tope is None else \
+            max(0, min(len(timestamps), tope - base))
+        inicio, fin = buscar_rango(cantidad, timestamps.__getitem__,
+                                   desde_epoch, hasta_epoch)
+        registros = []
+        for indice in range(fin - 1, inicio - 1, -1):
+            if len(registros) >= maximo:
+                break
+            registros.append(RegistroTemperatura(
+                temperatura=temperaturas[indice],
+                timestamp=epoch_a_timestamp(timestamps[indice]),
+                secuencia=base + indice
+            ))
+        return registros, inicio == 0
+
+    def _leer_segmento(self, segmento: _SegmentoFrio) -> Tuple[array, array]:
+        """Descomprime un segmento, reutilizando el ultimo leido."""
+        if self._cache is None or self._cache[0] is not segmento:
+            self._cache = (segmento, *segmento.leer())
+        return self._cache[1], self._cache[2]
+
+    def _abrir_segmentos(self) -> List[_SegmentoFrio]:
+        """Reconstruye el indice leyendo la cabecera de cada segmento."""
+        segmentos = []
+        base = 0
+        for nombre in sorted(os.listdir(self._directorio)):
+            if nombre.startswith(_PREFIJO) and nombre.endswith(_EXTENSION):
+                numero = int(nombre[len(_PREFIJO):-len(_EXTENSION)])
+                segmento = _SegmentoFrio.abrir(os.path.join(self._directorio, nombre),
+                                               numero, base)
+                segmentos.append(segmento)
+                base += segmento.cantidad
+        return segmentos
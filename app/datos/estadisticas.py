@@ -0,0 +1,136 @@
+"""
+Estadisticas incrementales del historial de temperaturas.
+Se actualizan en O(1) con cada registro agregado o desalojado.
+"""
+import math
+from collections import deque
+from typing import Iterable, NamedTuple, Optional
+
+
+class Acumulado(NamedTuple):
+    """Sumas de un conjunto de valores enteros, combinables sin volver a leerlos."""
+    cantidad: int
+    suma: int
+    suma_cuadrados: int
+    minimo: Optional[int]
+    maximo: Optional[int]
+
+
+def acumular(valores: Iterable[int]) -> Acumulado:
+    """Recorre los valores una vez y retorna sus sumas, minimo y maximo."""
+    cantidad = suma = suma_cuadrados = 0
+    minimo = maximo = None
+    for valor in valores:
+        cantidad += 1
+        suma += valor
+        suma_cuadrados += valor * valor
+        minimo = valor if minimo is None or valor < minimo else minimo
+        maximo = valor if maximo is None or valor > maximo else maximo
+    return Acumulado(cantidad, suma, suma_cuadrados, minimo, maximo)
+
+
+def sumar(a: Acumulado, b: Acumulado) -> Acumulado:
+    """Combina dos acumulados."""
+    if not a.cantidad:
+        return b
+    if not b.cantidad:
+        return a
+    return Acumulado(a.cantidad + b.cantidad, a.suma + b.suma,
+                     a.suma_cuadrados + b.suma_cuadrados,
+                     min(a.minimo, b.minimo), max(a.maximo, b.maximo))
+
+
+class EstadisticasTemperatura:
+    """Media, desviacion estandar, minimo y maximo actualizados en linea.
+
+    La media y la varianza usan el algoritmo de Welford, que admite
+    tambien quitar valores. Si `ventana` es True, el minimo y el maximo
+    se mantienen con colas monotonas para soportar el desalojo del valor
+    mas antiguo (orden FIFO, como en un buffer circular); si es False,
+    solo se admite agregar y basta con dos escalares.
+    """
+
+    def __init__(self, ventana: bool = False):
+        self._ventana = ventana
+        self.limpiar()
+
+    def agregar(self, valor: float) -> None:
+        """Incorpora un valor."""
+        self._cantidad += 1
+        delta = valor - self._media
+        self._media += delta / self._cantidad
+        self._m2 += delta * (valor - self._media)
+        if self._ventana:
+            while self._minimos and self._minimos[-1] > valor:
+                self._minimos.pop()
+            self._minimos.append(valor)
+            while self._maximos and self._maximos[-1] < valor:
+                self._maximos.pop()
+            self._maximos.append(valor)
+        else:
+            self._minimo = valor if self._minimo is None else min(self._minimo, valor)
+            self._maximo = valor if self._maximo is None else max(self._maximo, valor)
+
+    def combinar(self, acumulado: Acumulado) -> None:
+        """Incorpora un conjunto de valores ya resumido (requiere ventana=False).
+
+        Combina media y varianza con la formula de Chan et al., sin
+        recorrer los valores.
+        """
+        if self._ventana:
+            raise RuntimeError("combinar() requiere estadisticas sin ventana")
+        if acumulado.cantidad == 0:
+            return
+        media = acumulado.suma / acumulado.cantidad
+        m2 = (acumulado.cantidad * acumulado.suma_cuadrados - acumulado.suma ** 2) / acumulado.cantidad
+        total = self._cantidad + acumulado.cantidad
+        delta = media - self._media
+        self._m2 += max(0.0, m2) + delta * delta * self._cantidad * acumulado.cantidad / total
+        self._media += delta * acumulado.cantidad / total
+        self._cantidad = total
+        self._minimo = acumulado.minimo if self._minimo is None else min(self._minimo, acumulado.minimo)
+        self._maximo = acumulado.maximo if self._maximo is None else max(self._maximo, acumulado.maximo)
+
+    def quitar(self, valor: float) -> None:
+        """Retira el valor mas antiguo incorporado (requiere ventana=True)."""
+        if not self._ventana:
+            raise RuntimeError("quitar() requiere estadisticas con ventana")
+        if self._cantidad <= 1:
+            self.limpiar()
+            return
+        media_anterior = self._media
+        self._cantidad -= 1
+        self._media -= (valor - media_anterior) / self._cantidad
+        self._m2 = max(0.0, self._m2 - (valor - media_anterior) * (valor - self._media))
+        if self._minimos and self._minimos[0] == valor:
+            self._minimos.popleft()
+        if self._maximos and self._maximos[0] == valor:
+            self._maximos.popleft()
+
+    def limpiar(self) -> None:
+        """Reinicia las estadisticas."""
+        self._cantidad = 0
+        self._media = 0.0
+        self._m2 = 0.0
+        self._minimo = None
+        self._maximo = None
+        self._minimos = deque()
+        self._maximos = deque()
+
+    def resumen(self) -> dict:
+        """Retorna cantidad, media, desviacion estandar (poblacional), minimo y maximo."""
+        if self._cantidad == 0:
+            return {
+                'cantidad': 0,
+                'media': None,
+                'desviacion_estandar': None,
+                'minimo': None,
+                'maximo': None
+            }
+        return {
+            'cantidad': self._cantidad,
+            'media': round(self._media, 2),
+            'desviacion_estandar': round(math.sqrt(self._m2 / self._cantidad), 2),
+            'minimo': self._minimos[0] if self._ventana else self._minimo,
+            'maximo': self._maximos[0] if self._ventana else self._maximo
+        }
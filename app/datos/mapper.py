@@ -1,9 +1,16 @@
 """
 Mapper para convertir entre objetos de dominio y diccionarios.
 """
+import base64
+import binascii
 from datetime import datetime
 
-from app.datos.registro import RegistroTemperatura
+from app.datos.registro import (
+    CursorHistorial,
+    RegistroTemperatura,
+    epoch_a_timestamp,
+    timestamp_a_epoch,
+)
 
 
 class HistorialMapper:
@@ -22,3 +29,18 @@ class HistorialMapper:
             temperatura=datos['temperatura'],
             timestamp=datetime.fromisoformat(datos['timestamp'])
         )
+
+    def a_cursor(self, registro: RegistroTemperatura) -> str:
+        """Codifica la posicion del registro como cursor opaco."""
+        texto = f"{timestamp_a_epoch(registro.timestamp)}:{registro.secuencia}"
+        return base64.urlsafe_b64encode(texto.encode('ascii')).decode('ascii').rstrip('=')
+
+    def desde_cursor(self, cursor: str) -> CursorHistorial:
+        """Decodifica un cursor generado por a_cursor(). Lanza ValueError si es invalido."""
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            texto = base64.urlsafe_b64decode(cursor + relleno).decode('ascii')
+            epoch, secuencia = texto.split(':')
+            return CursorHistorial(epoch_a_timestamp(int(epoch)), int(secuencia))
+        except (binascii.Error, UnicodeDecodeError, ValueError, OverflowError) as e:
+            raise ValueError(f"Cursor invalido '{cursor}'") from e
@@ -1,36 +1,107 @@
 """
 Implementacion en memoria del repositorio de historial.
+Usa un buffer circular de capacidad fija: agregar es O(1) y no realoca.
 """
-from typing import List, Optional
+import threading
+import uuid
+from datetime import datetime
+from typing import Iterator, List, Optional
 
-from app.datos.registro import RegistroTemperatura
+from app.configuracion.config import Config
+from app.datos.busqueda import buscar_rango
+from app.datos.estadisticas import EstadisticasTemperatura
+from app.datos.registro import CursorHistorial, RegistroTemperatura
 from app.datos.repositorio import HistorialRepositorio
 
 
 class HistorialRepositorioMemoria(HistorialRepositorio):
-    """Repositorio de historial que almacena en memoria."""
+    """Repositorio de historial que almacena en memoria.
 
-    MAX_REGISTROS = 100
+    Los registros se guardan en un buffer circular preasignado. Al superar
+    la capacidad se sobrescribe el registro mas antiguo. Cada registro se
+    identifica por su numero de secuencia (cantidad de agregados previos),
+    que ubica su posicion en el buffer y no cambia al agregar otros.
+    Un lock serializa los agregados de hilos concurrentes.
+    """
 
-    def __init__(self):
-        self._registros: List[RegistroTemperatura] = []
+    MAX_REGISTROS = Config.HISTORIAL_MAX_REGISTROS
+
+    def __init__(self, capacidad: Optional[int] = None):
+        capacidad = self.MAX_REGISTROS if capacidad is None else int(capacidad)
+        if capacidad <= 0:
+            raise ValueError("capacidad debe ser mayor que 0")
+        self._capacidad = capacidad
+        self._buffer: List[Optional[RegistroTemperatura]] = [None] * capacidad
+        self._agregados = 0
+        self._cantidad = 0
+        self._lock = threading.Lock()
+        self._origen = uuid.uuid4().hex[:12]
+        self._modificaciones = 0
+        self._estadisticas = EstadisticasTemperatura(ventana=True)
+
+    @property
+    def capacidad(self) -> int:
+        """Cantidad maxima de registros que conserva el repositorio."""
+        return self._capacidad
 
     def agregar(self, registro: RegistroTemperatura) -> None:
-        """Agrega un registro al inicio (mas reciente primero)."""
-        self._registros.insert(0, registro)
-        if len(self._registros) > self.MAX_REGISTROS:
-            self._registros = self._registros[:self.MAX_REGISTROS]
+        """Agrega un registro sobrescribiendo el mas antiguo si esta lleno."""
+        with self._lock:
+            indice = self._agregados % self._capacidad
+            if self._cantidad == self._capacidad:
+                self._estadisticas.quitar(self._buffer[indice].temperatura)
+            self._estadisticas.agregar(registro.temperatura)
+            registro.secuencia = self._agregados
+            self._buffer[indice] = registro
+            self._agregados += 1
+            self._modificaciones += 1
+            if self._cantidad < self._capacidad:
+                self._cantidad += 1
+
+    def iterar(self, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None,
+               limite: Optional[int] = None,
+               antes_de: Optional[CursorHistorial] = None) -> Iterator[RegistroTemperatura]:
+        """Recorre el rango del mas reciente al mas antiguo sin copiar el buffer.
 
-    def obtener(self, limite: Optional[int] = None) -> List[RegistroTemperatura]:
-        """Obtiene registros, opcionalmente limitados."""
-        if limite is None:
-            return self._registros.copy()
-        return self._registros[:limite]
+        El cursor `antes_de` se ubica en O(1) por su numero de secuencia.
+        Si durante el recorrido se desalojan registros pendientes, el
+        recorrido termina en el ultimo registro aun retenido.
+        """
+        primero = self._agregados - self._cantidad
+        ultimo = self._agregados if antes_de is None else \
+            max(primero, min(self._agregados, antes_de.secuencia))
+        inicio, fin = buscar_rango(
+            ultimo - primero,
+            lambda i: self._buffer[(primero + i) % self._capacidad].timestamp,
+            desde, hasta
+        )
+        secuencias = range(primero + fin - 1, primero + inicio - 1, -1)
+        if limite is not None:
+            secuencias = secuencias[:max(0, limite)]
+        for secuencia in secuencias:
+            registro = self._buffer[secuencia % self._capacidad]
+            if secuencia < self._agregados - self._cantidad:
+                return
+            yield registro
 
     def cantidad(self) -> int:
         """Retorna la cantidad de registros almacenados."""
-        return len(self._registros)
+        return self._cantidad
+
+    def estadisticas(self) -> dict:
+        """Retorna las estadisticas mantenidas incrementalmente."""
+        with self._lock:
+            return self._estadisticas.resumen()
+
+    def version(self) -> str:
+        """Origen de la instancia y cantidad de agregados y limpiezas."""
+        return f'{self._origen}-{self._modificaciones}'
 
     def limpiar(self) -> None:
         """Elimina todos los registros."""
-        self._registros = []
+        with self._lock:
+            self._modificaciones += 1
+            self._buffer = [None] * self._capacidad
+            self._cantidad = 0
+            self._estadisticas.limpiar()
@@ -2,11 +2,16 @@
 Interface abstracta para persistencia del estado del termostato.
 """
 from abc import ABC, abstractmethod
-from typing import Optional
+from contextlib import nullcontext
+from typing import ContextManager, Optional
 
 
 class TermostatoPersistidor(ABC):
-    """Interface para persistir el estado del termostato."""
+    """Interface para persistir el estado del termostato.
+
+    Los persistidores compartidos entre procesos redefinen version() y
+    bloqueo() para que cada proceso detecte los cambios de los demas.
+    """
 
     @abstractmethod
     def guardar(self, datos: dict) -> None:
@@ -22,3 +27,15 @@ class TermostatoPersistidor(ABC):
     def existe(self) -> bool:
         """Verifica si existe un estado guardado."""
         pass
+
+    def version(self) -> Optional[int]:
+        """Version del estado guardado, que cambia con cada guardado.
+
+        None indica que el persistidor no es compartido: el estado solo
+        cambia a traves de esta instancia.
+        """
+        return None
+
+    def bloqueo(self) -> ContextManager:
+        """Seccion critica para leer, modificar y guardar el estado."""
+        return nullcontext()
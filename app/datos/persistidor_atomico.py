@@ -0,0 +1,124 @@
+"""
+Implementacion de persistencia en archivo JSON con escritura atomica.
+"""
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from app.configuracion.config import Config
+from app.datos.persistidor_json import TermostatoPersistidorJSON
+
+# Politicas de fsync
+FSYNC_SIEMPRE = 'siempre'
+FSYNC_ESCRITURAS = 'escrituras'
+FSYNC_INTERVALO = 'intervalo'
+POLITICAS_FSYNC = (FSYNC_SIEMPRE, FSYNC_ESCRITURAS, FSYNC_INTERVALO)
+
+
+class TermostatoPersistidorAtomico(TermostatoPersistidorJSON):
+    """Persistidor JSON que nunca deja el archivo de estado a medio escribir.
+
+    Cada guardado escribe un archivo temporal en el mismo directorio y lo
+    renombra sobre el destino con os.replace(), que es atomico: ante una
+    caida queda la version anterior o la nueva, nunca una truncada.
+
+    La durabilidad frente a cortes de energia depende de `fsync`:
+    - 'siempre': fsync del temporal y del directorio en cada guardado
+    - 'escrituras': fsync cada `fsync_escrituras` guardados
+    - 'intervalo': fsync si pasaron `fsync_intervalo_ms` desde el ultimo;
+      si no llegan mas guardados, un temporizador sincroniza el ultimo al
+      vencer el intervalo
+    Entre fsyncs, un corte de energia puede perder los ultimos guardados.
+    """
+
+    def __init__(self, ruta: str = "data/termostato_estado.json", fsync: str = None,
+                 fsync_escrituras: int = None, fsync_intervalo_ms: int = None):
+        super().__init__(ruta)
+        self._fsync = (fsync or Config.PERSISTIDOR_FSYNC).lower()
+        if self._fsync not in POLITICAS_FSYNC:
+            raise ValueError(f"Politica de fsync desconocida: '{self._fsync}'")
+        self._fsync_escrituras = max(1, fsync_escrituras or Config.PERSISTIDOR_FSYNC_ESCRITURAS)
+        intervalo_ms = (Config.PERSISTIDOR_FSYNC_INTERVALO_MS if fsync_intervalo_ms is None
+                        else fsync_intervalo_ms)
+        self._fsync_intervalo = intervalo_ms / 1000
+        self._sin_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+        self._temporizador: Optional[threading.Timer] = None
+
+    def guardar(self, datos: dict) -> None:
+        """Guarda el estado en un temporal y lo renombra sobre el archivo JSON."""
+        directorio = os.path.dirname(self._ruta)
+        if directorio and not os.path.exists(directorio):
+            os.makedirs(directorio)
+        temporal = self._ruta + '.tmp'
+        with self._lock:
+            sincronizar = self._corresponde_fsync()
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(datos, archivo, indent=2, ensure_ascii=False)
+                if sincronizar:
+                    archivo.flush()
+                    os.fsync(archivo.fileno())
+            os.replace(temporal, self._ruta)
+            if sincronizar:
+                _fsync_directorio(directorio or '.')
+                self._sincronizado()
+            elif self._fsync == FSYNC_INTERVALO and self._temporizador is None:
+                self._programar_fsync()
+
+    def sincronizar(self) -> None:
+        """Sincroniza con fsync los guardados que aun no lo estan."""
+        with self._lock:
+            self._temporizador = None
+            if not self._sin_fsync or not os.path.exists(self._ruta):
+                return
+            descriptor = os.open(self._ruta, os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+            _fsync_directorio(os.path.dirname(self._ruta) or '.')
+            self._sincronizado()
+
+    def cerrar(self) -> None:
+        """Sincroniza los guardados pendientes y cancela el temporizador."""
+        with self._lock:
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+        self.sincronizar()
+
+    def _sincronizado(self) -> None:
+        """Reinicia los contadores de la politica y cancela el temporizador."""
+        self._sin_fsync = 0
+        self._ultimo_fsync = time.monotonic()
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+
+    def _programar_fsync(self) -> None:
+        """Programa la sincronizacion para cuando venza el intervalo."""
+        restante = self._fsync_intervalo - (time.monotonic() - self._ultimo_fsync)
+        self._temporizador = threading.Timer(max(0.0, restante), self.sincronizar)
+        self._temporizador.daemon = True
+        self._temporizador.start()
+
+    def _corresponde_fsync(self) -> bool:
+        """Indica si este guardado debe sincronizarse segun la politica."""
+        self._sin_fsync += 1
+        if self._fsync == FSYNC_ESCRITURAS:
+            return self._sin_fsync >= self._fsync_escrituras
+        if self._fsync == FSYNC_INTERVALO:
+            return time.monotonic() - self._ultimo_fsync >= self._fsync_intervalo
+        return True
+
+
+def _fsync_directorio(directorio: str) -> None:
+    """Sincroniza la entrada del directorio para que el rename sea durable."""
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    descriptor = os.open(directorio, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
@@ -0,0 +1,161 @@
+"""
+Implementacion de persistencia en un registro binario de formato fijo.
+El estado se actualiza en el lugar via mmap, sin serializar texto.
+"""
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Optional, Tuple
+
+from app.datos.persistidor import TermostatoPersistidor
+
+# magic, version de formato, relleno
+_CABECERA = struct.Struct('<4sHH')
+_MAGIC = b'TERM'
+_VERSION = 1
+# contador de escrituras, temperatura ambiente, temperatura deseada,
+# carga de bateria, estado del climatizador, indicador, crc32 de lo anterior
+_RANURA = struct.Struct('<Qiid16s16sI')
+_CONTADOR = struct.Struct('<Q')
+_TAMANO = _CABECERA.size + 2 * _RANURA.size
+
+
+class TermostatoPersistidorBinario(TermostatoPersistidor):
+    """Persistidor que guarda el estado en un archivo binario de 128 bytes.
+
+    El archivo tiene una cabecera (magic y version) y dos ranuras de
+    ancho fijo. Cada guardado incrementa un contador y escribe la ranura
+    contador % 2 a traves de un mmap: es una escritura de pocos bytes en
+    el page cache, sin fsync. cargar() desempaqueta ambas ranuras y usa
+    la de mayor contador cuyo crc32 sea valido, de modo que una escritura
+    interrumpida deja disponible el estado anterior.
+    """
+
+    def __init__(self, ruta: str = "data/termostato_estado.bin"):
+        self._ruta = ruta
+        self._lock = threading.Lock()
+        self._archivo = None
+        self._mapa: Optional[mmap.mmap] = None
+        self._contador = 0
+
+    @property
+    def contador(self) -> int:
+        """Cantidad de escrituras realizadas sobre el archivo."""
+        with self._lock:
+            if self._mapa is None and os.path.exists(self._ruta):
+                self._abrir()
+            return self._contador
+
+    def guardar(self, datos: dict) -> None:
+        """Escribe el estado en la ranura siguiente."""
+        with self._lock:
+            if self._mapa is None:
+                self._abrir()
+            contador = self._contador + 1
+            campos = (
+                contador,
+                int(datos['temperatura_ambiente']),
+                int(datos['temperatura_deseada']),
+                float(datos['carga_bateria']),
+                _codificar(datos['estado_climatizador']),
+                _codificar(datos.get('indicador', '')),
+            )
+            carga = _RANURA.pack(*campos, 0)[:-4]
+            _RANURA.pack_into(self._mapa, _desplazamiento(contador), *campos, zlib.crc32(carga))
+            self._contador = contador
+
+    def cargar(self) -> Optional[dict]:
+        """Carga el estado de la ranura valida mas reciente."""
+        with self._lock:
+            if not os.path.exists(self._ruta):
+                return None
+            if self._mapa is None:
+                self._abrir()
+            ranura = self._leer_ranura_vigente()
+        return None if ranura is None else _a_datos(ranura)
+
+    def existe(self) -> bool:
+        """Verifica si el archivo contiene un estado guardado."""
+        return self.cargar() is not None
+
+    def cerrar(self) -> None:
+        """Sincroniza el mmap con el disco y libera el archivo."""
+        with self._lock:
+            if self._mapa is not None:
+                self._mapa.flush()
+                self._mapa.close()
+                self._archivo.close()
+                self._mapa = None
+                self._archivo = None
+
+    def _abrir(self) -> None:
+        """Mapea el archivo, creandolo con la cabecera si no existe."""
+        directorio = os.path.dirname(self._ruta)
+        if directorio and not os.path.exists(directorio):
+            os.makedirs(directorio)
+        nuevo = not os.path.exists(self._ruta) or os.path.getsize(self._ruta) < _TAMANO
+        self._archivo = open(self._ruta, 'r+b' if os.path.exists(self._ruta) else 'w+b')
+        if nuevo:
+            self._archivo.truncate(_TAMANO)
+        self._mapa = mmap.mmap(self._archivo.fileno(), _TAMANO)
+        magic, version, _ = _CABECERA.unpack_from(self._mapa, 0)
+        if nuevo or magic == b'\0' * 4:
+            _CABECERA.pack_into(self._mapa, 0, _MAGIC, _VERSION, 0)
+        elif magic != _MAGIC or version != _VERSION:
+            self._mapa.close()
+            self._archivo.close()
+            self._mapa = None
+            self._archivo = None
+            raise ValueError(f"Archivo de estado binario invalido: {self._ruta}")
+        ranura = self._leer_ranura_vigente()
+        self._contador = ranura[0] if ranura else 0
+
+    def _leer_ranura_vigente(self) -> Optional[Tuple]:
+        """Retorna los campos de la ranura valida con mayor contador."""
+        vigente = None
+        for indice in range(2):
+            desplazamiento = _CABECERA.size + indice * _RANURA.size
+            *campos, crc = _RANURA.unpack_from(self._mapa, desplazamiento)
+            crudo = self._mapa[desplazamiento:desplazamiento + _RANURA.size - 4]
+            if campos[0] and zlib.crc32(crudo) == crc and (vigente is None or campos[0] > vigente[0]):
+                vigente = tuple(campos)
+        return vigente
+
+    def _hay_guardados(self) -> bool:
+        """Indica si alguna ranura fue escrita, sea o no valida su crc32."""
+        return any(_CONTADOR.unpack_from(self._mapa, _CABECERA.size + indice * _RANURA.size)[0]
+                   for indice in range(2))
+
+
+def _a_datos(ranura: Tuple) -> dict:
+    """Convierte los campos de una ranura en el diccionario de estado."""
+    _, ambiente, deseada, carga, estado, indicador = ranura
+    datos = {
+        'temperatura_ambiente': ambiente,
+        'temperatura_deseada': deseada,
+        'carga_bateria': carga,
+        'estado_climatizador': _decodificar(estado),
+    }
+    if indicador.strip(b'\0'):
+        datos['indicador'] = _decodificar(indicador)
+    return datos
+
+
+def _desplazamiento(contador: int) -> int:
+    """Posicion en el archivo de la ranura que corresponde al contador."""
+    return _CABECERA.size + (contador % 2) * _RANURA.size
+
+
+def _codificar(texto: str) -> bytes:
+    """Codifica un texto corto para un campo de 16 bytes."""
+    crudo = str(texto).encode('utf-8')
+    if len(crudo) > 16:
+        raise ValueError(f"Valor demasiado largo para el formato binario: '{texto}'")
+    return crudo
+
+
+def _decodificar(crudo: bytes) -> str:
+    """Decodifica un campo de texto rellenado con ceros."""
+    return crudo.rstrip(b'\0').decode('utf-8')
@@ -0,0 +1,72 @@
+"""
+Persistencia del estado compartida entre procesos.
+Varios workers mapean el mismo archivo binario y se coordinan con flock.
+"""
+import os
+from typing import Optional, Tuple
+
+from app.datos.bloqueo import BloqueoArchivo
+from app.datos.persistidor_binario import TermostatoPersistidorBinario, _a_datos
+
+# Lecturas sin bloqueo antes de esperar el flock (escrituras muy seguidas)
+_REINTENTOS = 100
+
+
+class TermostatoPersistidorCompartido(TermostatoPersistidorBinario):
+    """Persistidor binario que comparten todos los workers de un servidor.
+
+    Cada proceso mapea el mismo archivo (MAP_SHARED), por lo que un
+    guardado es visible de inmediato para los demas. Los guardados se
+    serializan con un RLock entre hilos y con flock sobre `ruta.lock`
+    entre procesos. version() y cargar() no toman el bloqueo: un guardado
+    solo escribe la ranura que no esta vigente, y la lectura elige la de
+    mayor contador con crc32 valido. Si ninguna lo es (la lectura coincidio
+    con dos guardados seguidos) se reintenta. version() retorna el
+    contador de escrituras del archivo: cuando difiere del ultimo visto,
+    otro worker cambio el estado y hay que recargarlo.
+    """
+
+    def __init__(self, ruta: str = "data/termostato_estado.bin"):
+        super().__init__(ruta)
+        self._bloqueo = BloqueoArchivo(ruta + '.lock')
+
+    def bloqueo(self) -> BloqueoArchivo:
+        """Seccion critica exclusiva entre hilos y procesos (reentrante)."""
+        return self._bloqueo
+
+    def version(self) -> Optional[int]:
+        """Contador de escrituras del archivo compartido (0 si no hay estado)."""
+        ranura = self._leer_sin_bloqueo()
+        return ranura[0] if ranura else 0
+
+    def guardar(self, datos: dict) -> None:
+        """Guarda a continuacion de la ultima escritura de cualquier proceso."""
+        with self.bloqueo():
+            self._contador = self.version()
+            super().guardar(datos)
+
+    def cargar(self) -> Optional[dict]:
+        """Carga el estado sin observar escrituras a medio hacer."""
+        ranura = self._leer_sin_bloqueo()
+        return None if ranura is None else _a_datos(ranura)
+
+    def _leer_sin_bloqueo(self) -> Optional[Tuple]:
+        """Ranura vigente del archivo, sin flock salvo al mapearlo la primera vez."""
+        if not os.path.exists(self._ruta):
+            return None
+        if self._mapa is None:
+            with self.bloqueo(), self._lock:
+                if self._mapa is None:
+                    self._abrir()
+        for _ in range(_REINTENTOS):
+            ranura = self._leer_ranura_vigente()
+            if ranura is not None or not self._hay_guardados():
+                return ranura
+        with self.bloqueo():
+            return self._leer_ranura_vigente()
+
+    def cerrar(self) -> None:
+        """Libera el mmap y el archivo de bloqueo."""
+        with self._bloqueo:
+            super().cerrar()
+        self._bloqueo.cerrar()
@@ -0,0 +1,149 @@
+"""
+Persistencia diferida (write-behind) del estado del termostato.
+Las escrituras se acumulan en memoria y se vuelcan periodicamente.
+"""
+import atexit
+import logging
+import signal
+import threading
+import weakref
+from typing import Optional
+
+from app.configuracion.config import Config
+from app.datos.persistidor import TermostatoPersistidor
+
+logger = logging.getLogger(__name__)
+
+# Persistidores diferidos vivos, a volcar al recibir SIGTERM
+_activos = weakref.WeakSet()
+_sigterm_instalado = False
+
+
+class TermostatoPersistidorDiferido(TermostatoPersistidor):
+    """Decorador de persistidor que saca la escritura del hilo de la peticion.
+
+    guardar() solo reemplaza la ultima instantanea pendiente y marca el
+    estado como sucio. Un hilo de fondo vuelca al persistidor `destino`
+    la instantanea mas reciente cada `intervalo_ms`, de modo que una
+    rafaga de actualizaciones se convierte en una sola escritura. Los
+    cambios pendientes se vuelcan al cerrar, en atexit y ante SIGTERM.
+    """
+
+    def __init__(self, destino: TermostatoPersistidor, intervalo_ms: int = None):
+        self._destino = destino
+        intervalo = Config.PERSISTIDOR_INTERVALO_MS if intervalo_ms is None else intervalo_ms
+        self._intervalo = max(1, intervalo) / 1000
+        self._lock = threading.Lock()
+        # Serializa los volcados del hilo de fondo, cerrar() y SIGTERM
+        self._lock_volcado = threading.Lock()
+        self._pendiente: Optional[dict] = None
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._ejecutar, name='persistidor-diferido',
+                                      daemon=True)
+        self._hilo.start()
+        _activos.add(self)
+        _instalar_sigterm()
+        atexit.register(self.cerrar)
+
+    @property
+    def destino(self) -> TermostatoPersistidor:
+        """Persistidor que recibe las escrituras."""
+        return self._destino
+
+    def guardar(self, datos: dict) -> None:
+        """Registra la instantanea para el proximo volcado, sin tocar el disco."""
+        with self._lock:
+            self._pendiente = dict(datos)
+
+    def cargar(self) -> Optional[dict]:
+        """Carga la instantanea pendiente o, si no hay, la del destino."""
+        with self._lock:
+            if self._pendiente is not None:
+                return dict(self._pendiente)
+        return self._destino.cargar()
+
+    def existe(self) -> bool:
+        """Verifica si hay un estado pendiente o guardado."""
+        with self._lock:
+            if self._pendiente is not None:
+                return True
+        return self._destino.existe()
+
+    def volcar(self, bloquear: bool = True) -> None:
+        """Escribe en el destino la instantanea pendiente, si la hay.
+
+        Con bloquear=False (manejador de SIGTERM) no espera los locks: si
+        la senal interrumpio a un hilo que los tiene, esperarlos seria un
+        deadlock. En ese caso no escribe y el pendiente queda para el
+        volcado de cerrar() o atexit.
+        """
+        if not self._lock_volcado.acquire(blocking=bloquear):
+            return
+        try:
+            if not self._lock.acquire(blocking=bloquear):
+                return
+            try:
+                datos, self._pendiente = self._pendiente, None
+            finally:
+                self._lock.release()
+            if datos is None:
+                return
+            try:
+                self._destino.guardar(datos)
+            except Exception:
+                # Se reintenta en el proximo volcado, salvo que haya uno mas nuevo
+                with self._lock:
+                    if self._pendiente is None:
+                        self._pendiente = datos
+                raise
+        finally:
+            self._lock_volcado.release()
+
+    def cerrar(self) -> None:
+        """Detiene el hilo de fondo y vuelca los cambios pendientes."""
+        self._detener.set()
+        if self._hilo.is_alive() and self._hilo is not threading.current_thread():
+            self._hilo.join()
+        self.volcar()
+        _activos.discard(self)
+        atexit.unregister(self.cerrar)
+
+    def _ejecutar(self) -> None:
+        """Bucle del hilo de fondo: vuelca cada intervalo hasta que se cierre."""
+        while not self._detener.wait(self._intervalo):
+            try:
+                self.volcar()
+            except Exception:
+                logger.exception("No se pudo persistir el estado del termostato")
+
+
+def _instalar_sigterm() -> None:
+    """Instala (una vez) un manejador de SIGTERM que vuelca los pendientes.
+
+    Encadena el manejador previo (por ejemplo, el de Gunicorn). Solo es
+    posible desde el hilo principal; en otro caso se confia en atexit.
+    """
+    global _sigterm_instalado
+    if _sigterm_instalado or threading.current_thread() is not threading.main_thread():
+        return
+    anterior = signal.getsignal(signal.SIGTERM)
+
+    def _al_terminar(signum, frame):
+        _volcar_activos()
+        if callable(anterior):
+            anterior(signum, frame)
+        elif anterior == signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.raise_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, _al_terminar)
+    _sigterm_instalado = True
+
+
+def _volcar_activos() -> None:
+    """Vuelca, sin esperar locks, los pendientes de los persistidores diferidos vivos."""
+    for persistidor in list(_activos):
+        try:
+            persistidor.volcar(bloquear=False)
+        except Exception:
+            logger.exception("No se pudo persistir el estado al recibir SIGTERM")
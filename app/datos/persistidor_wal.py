@@ -0,0 +1,150 @@
+"""
+Persistencia del estado con log de escritura anticipada (WAL) y snapshots.
+Cada cambio se agrega al log; periodicamente se compacta en un snapshot.
+"""
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Optional
+
+from app.configuracion.config import Config
+from app.datos.persistidor import TermostatoPersistidor
+from app.datos.persistidor_atomico import _fsync_directorio
+
+_LOG = 'estado.wal'
+_SNAPSHOT = 'estado.snapshot.json'
+
+
+class TermostatoPersistidorWAL(TermostatoPersistidor):
+    """Persistidor que agrega cada cambio de campo a un log de solo agregado.
+
+    guardar() compara el estado recibido con el ultimo conocido y agrega
+    una linea JSON (campo, valor, timestamp) por cada campo modificado,
+    en una sola escritura al final del log. Con `sincronizar` cada
+    agregado hace fsync antes de retornar. Al acumular `compactar_cada`
+    entradas, el estado completo se escribe como snapshot (temporal +
+    rename, con fsync del archivo y del directorio) y recien entonces el
+    log se trunca.
+
+    cargar() parte del snapshot y reaplica el log; una ultima linea
+    incompleta por una caida se descarta. El tiempo de recuperacion
+    queda acotado por `compactar_cada`.
+    """
+
+    def __init__(self, directorio: str = None, compactar_cada: int = None,
+                 sincronizar: bool = None):
+        self._directorio = directorio or Config.PERSISTIDOR_WAL_DIRECTORIO
+        self._compactar_cada = max(1, compactar_cada or Config.PERSISTIDOR_WAL_COMPACTAR)
+        self._sincronizar = Config.PERSISTIDOR_WAL_FSYNC if sincronizar is None else sincronizar
+        self._ruta_log = os.path.join(self._directorio, _LOG)
+        self._ruta_snapshot = os.path.join(self._directorio, _SNAPSHOT)
+        self._lock = threading.Lock()
+        self._log = None
+        self._estado: Optional[dict] = None
+        self._entradas = 0
+
+    def guardar(self, datos: dict) -> None:
+        """Agrega al log los campos que cambiaron desde el ultimo guardado."""
+        with self._lock:
+            if self._log is None:
+                self._recuperar()
+            estado = self._estado or {}
+            timestamp = datetime.now().isoformat()
+            lineas = [
+                json.dumps({'campo': campo, 'valor': valor, 'timestamp': timestamp},
+                           ensure_ascii=False) + '\n'
+                for campo, valor in datos.items()
+                if campo not in estado or estado[campo] != valor
+            ]
+            if not lineas:
+                return
+            self._log.write(''.join(lineas))
+            self._log.flush()
+            if self._sincronizar:
+                os.fsync(self._log.fileno())
+            self._estado = {**estado, **datos}
+            self._entradas += len(lineas)
+            if self._entradas >= self._compactar_cada:
+                self._compactar()
+
+    def cargar(self) -> Optional[dict]:
+        """Reconstruye el estado desde el snapshot y el log."""
+        with self._lock:
+            if self._log is None:
+                if not self._hay_archivos():
+                    return None
+                self._recuperar()
+            return None if self._estado is None else dict(self._estado)
+
+    def existe(self) -> bool:
+        """Verifica si hay un snapshot o un log."""
+        with self._lock:
+            return self._estado is not None or self._hay_archivos()
+
+    def compactar(self) -> None:
+        """Escribe el estado actual como snapshot y vacia el log."""
+        with self._lock:
+            if self._log is None:
+                self._recuperar()
+            self._compactar()
+
+    def cerrar(self) -> None:
+        """Cierra el log."""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def _hay_archivos(self) -> bool:
+        """Indica si existe un snapshot o un log no vacio."""
+        return os.path.exists(self._ruta_snapshot) or (
+            os.path.exists(self._ruta_log) and os.path.getsize(self._ruta_log) > 0
+        )
+
+    def _recuperar(self) -> None:
+        """Carga snapshot y log, descarta una cola incompleta y abre el log."""
+        os.makedirs(self._directorio, exist_ok=True)
+        estado = None
+        if os.path.exists(self._ruta_snapshot):
+            with open(self._ruta_snapshot, 'r', encoding='utf-8') as archivo:
+                estado = json.load(archivo)
+        entradas = 0
+        valido = 0
+        if os.path.exists(self._ruta_log):
+            with open(self._ruta_log, 'rb') as archivo:
+                for linea in archivo:
+                    try:
+                        entrada = json.loads(linea)
+                    except ValueError:
+                        break
+                    if not linea.endswith(b'\n'):
+                        break
+                    estado = estado or {}
+                    estado[entrada['campo']] = entrada['valor']
+                    entradas += 1
+                    valido += len(linea)
+            if valido < os.path.getsize(self._ruta_log):
+                with open(self._ruta_log, 'r+b') as archivo:
+                    archivo.truncate(valido)
+        self._estado = estado
+        self._entradas = entradas
+        self._log = open(self._ruta_log, 'a', encoding='utf-8')
+
+    def _compactar(self) -> None:
+        """Reemplaza el snapshot de forma atomica y trunca el log."""
+        if self._estado is None:
+            return
+        temporal = self._ruta_snapshot + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(self._estado, archivo, indent=2, ensure_ascii=False)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, self._ruta_snapshot)
+        # El rename debe ser durable antes de vaciar el log: si no, una caida
+        # podria conservar el log truncado junto al snapshot anterior
+        _fsync_directorio(self._directorio)
+        # Si se cae antes de truncar, reaplicar el log sobre el snapshot es idempotente
+        self._log.truncate(0)
+        os.fsync(self._log.fileno())
+        self._entradas = 0
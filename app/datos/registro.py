@@ -1,12 +1,41 @@
 """
 Modelo de dominio para registros de temperatura.
 """
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional
+
+_EPOCA = datetime(1970, 1, 1)
+_MICROSEGUNDO = timedelta(microseconds=1)
 
 
 @dataclass
 class RegistroTemperatura:
-    """Representa un registro de temperatura en un momento dado."""
+    """Representa un registro de temperatura en un momento dado.
+
+    `secuencia` la asigna el repositorio al almacenar el registro: es
+    creciente en orden de agregado y no se reutiliza.
+    """
     temperatura: int
     timestamp: datetime
+    secuencia: Optional[int] = field(default=None, compare=False)
+
+
+class CursorHistorial(NamedTuple):
+    """Posicion en el historial: se retoma con los registros anteriores a ella."""
+    timestamp: datetime
+    secuencia: int
+
+
+def timestamp_a_epoch(timestamp: datetime) -> int:
+    """Convierte un timestamp (naive, hora local) a microsegundos desde la epoca.
+
+    La conversion es aritmetica y exacta: no depende de la zona horaria
+    ni pierde precision, por lo que epoch_a_timestamp es su inversa.
+    """
+    return (timestamp.replace(tzinfo=None) - _EPOCA) // _MICROSEGUNDO
+
+
+def epoch_a_timestamp(epoch: int) -> datetime:
+    """Convierte microsegundos desde la epoca al timestamp original."""
+    return _EPOCA + timedelta(microseconds=epoch)
@@ -3,9 +3,10 @@ Interface abstracta para repositorios de historial.
 Define el contrato que deben cumplir las implementaciones.
 """
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from datetime import datetime
+from typing import Iterator, List, Optional
 
-from app.datos.registro import RegistroTemperatura
+from app.datos.registro import CursorHistorial, RegistroTemperatura
 
 
 class HistorialRepositorio(ABC):
@@ -16,9 +17,32 @@ class HistorialRepositorio(ABC):
         """Agrega un nuevo registro al historial."""
         pass
 
-    @abstractmethod
     def obtener(self, limite: Optional[int] = None) -> List[RegistroTemperatura]:
         """Obtiene registros del historial, ordenados del mas reciente al mas antiguo."""
+        return list(self.iterar(limite=limite))
+
+    def obtener_rango(self, desde: Optional[datetime] = None,
+                      hasta: Optional[datetime] = None,
+                      limite: Optional[int] = None) -> List[RegistroTemperatura]:
+        """Obtiene registros con desde <= timestamp <= hasta, del mas reciente al mas antiguo.
+
+        Las cotas son inclusivas; None significa sin cota. Asume que los
+        registros se agregan en orden cronologico.
+        """
+        return list(self.iterar(desde, hasta, limite))
+
+    @abstractmethod
+    def iterar(self, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None,
+               limite: Optional[int] = None,
+               antes_de: Optional[CursorHistorial] = None) -> Iterator[RegistroTemperatura]:
+        """Recorre los registros del rango, del mas reciente al mas antiguo, de a bloques acotados.
+
+        Si se indica `antes_de`, el recorrido retoma desde el registro
+        siguiente (mas antiguo) a esa posicion, para paginar con cursores.
+        Es la primitiva de lectura: obtener() y obtener_rango()
+        materializan su resultado.
+        """
         pass
 
     @abstractmethod
@@ -26,6 +50,24 @@ class HistorialRepositorio(ABC):
         """Retorna la cantidad total de registros en el historial."""
         pass
 
+    @abstractmethod
+    def estadisticas(self) -> dict:
+        """Retorna cantidad, media, desviacion estandar, minimo y maximo de las temperaturas.
+
+        Las implementaciones las mantienen incrementalmente, por lo que la
+        consulta es O(1).
+        """
+        pass
+
+    def version(self) -> Optional[str]:
+        """Identifica el contenido actual: cambia con cada agregar() o limpiar().
+
+        Sirve como ETag del historial. Incluye un origen aleatorio por
+        instancia, para no repetirse tras un reinicio. None si la
+        implementacion no lo lleva.
+        """
+        return None
+
     @abstractmethod
     def limpiar(self) -> None:
         """Elimina todos los registros del historial."""
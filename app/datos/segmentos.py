@@ -0,0 +1,292 @@
+"""
+Implementacion del repositorio de historial como log binario segmentado.
+Los registros se agregan con ancho fijo y se leen via mmap.
+"""
+import mmap
+import os
+import struct
+import threading
+import uuid
+from bisect import bisect_left
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from app.configuracion.config import Config
+from app.datos.busqueda import buscar_rango
+from app.datos.estadisticas import Acumulado, EstadisticasTemperatura, acumular, sumar
+from app.datos.registro import (
+    CursorHistorial,
+    RegistroTemperatura,
+    epoch_a_timestamp,
+    timestamp_a_epoch,
+)
+from app.datos.repositorio import HistorialRepositorio
+
+# timestamp (microsegundos desde la epoca, int64) + temperatura (int32)
+_REGISTRO = struct.Struct('<qi')
+_PREFIJO = 'segmento_'
+_EXTENSION = '.bin'
+# Sumas de los segmentos cerrados: cuantos cubre, cantidad, suma, suma de
+# cuadrados, minimo y maximo de las temperaturas
+_RESUMEN = struct.Struct('<IQqqii')
+_ARCHIVO_RESUMEN = 'resumen.est'
+
+
+class _Segmento:
+    """Archivo de segmento con sus registros mapeados en memoria.
+
+    `base` es la secuencia de su primer registro: el registro en el
+    indice i tiene secuencia base + i.
+    """
+
+    def __init__(self, ruta: str, numero: int, base: int):
+        self.ruta = ruta
+        self.numero = numero
+        self.base = base
+        self.cantidad = os.path.getsize(ruta) // _REGISTRO.size
+        self._mapa: Optional[mmap.mmap] = None
+
+    def mapa(self) -> mmap.mmap:
+        """Retorna un mmap de solo lectura que cubre todos los registros."""
+        largo = self.cantidad * _REGISTRO.size
+        if self._mapa is None or len(self._mapa) < largo:
+            self.cerrar()
+            with open(self.ruta, 'rb') as archivo:
+                self._mapa = mmap.mmap(archivo.fileno(), largo, access=mmap.ACCESS_READ)
+        return self._mapa
+
+    def temperaturas(self) -> Iterator[int]:
+        """Recorre las temperaturas del segmento en orden."""
+        if self.cantidad:
+            for _, temperatura in _REGISTRO.iter_unpack(self.mapa()):
+                yield temperatura
+
+    def leer(self, indice: int):
+        """Retorna (epoch, temperatura) del registro en el indice (0 = mas antiguo)."""
+        return _REGISTRO.unpack_from(self.mapa(), indice * _REGISTRO.size)
+
+    def epoch(self, indice: int) -> int:
+        """Retorna el timestamp del registro en el indice."""
+        return self.leer(indice)[0]
+
+    def cerrar(self) -> None:
+        """Libera el mmap del segmento."""
+        if self._mapa is not None:
+            self._mapa.close()
+            self._mapa = None
+
+
+class HistorialRepositorioSegmentos(HistorialRepositorio):
+    """Repositorio de historial en segmentos binarios de solo agregado.
+
+    Cada lectura se guarda como un registro de 12 bytes (timestamp en
+    microsegundos y temperatura) al final del segmento activo, que rota
+    al alcanzar `tamano_segmento` bytes. Las consultas leen directamente
+    del page cache via mmap, desde el segmento mas reciente hacia atras.
+    Las escrituras se vuelcan al sistema operativo en cada agregado
+    (sobreviven a la caida del proceso, no a la del equipo).
+
+    Al rotar, las sumas de temperaturas del segmento cerrado se acumulan
+    en un archivo de resumen: al abrir, las estadisticas solo recorren el
+    segmento activo.
+    """
+
+    def __init__(self, directorio: str = None, tamano_segmento: int = None):
+        self._directorio = directorio or Config.HISTORIAL_SEGMENTOS_DIRECTORIO
+        tamano = tamano_segmento or Config.HISTORIAL_SEGMENTO_BYTES
+        self._registros_por_segmento = max(1, tamano // _REGISTRO.size)
+        self._lock = threading.Lock()
+        self._activo = None
+        self._origen = uuid.uuid4().hex[:12]
+        self._modificaciones = 0
+        os.makedirs(self._directorio, exist_ok=True)
+        self._segmentos: List[_Segmento] = self._abrir_segmentos()
+        self._cerrados, self._acumulado_cerrados = self._leer_resumen()
+        # Estadisticas iniciales: el resumen de los cerrados y un recorrido del activo
+        self._estadisticas = EstadisticasTemperatura()
+        self._estadisticas.combinar(self._acumulado_cerrados)
+        for temperatura in (self._segmentos[-1].temperaturas() if self._segmentos else ()):
+            self._estadisticas.agregar(temperatura)
+
+    def agregar(self, registro: RegistroTemperatura) -> None:
+        """Agrega el registro al final del segmento activo."""
+        datos = _REGISTRO.pack(timestamp_a_epoch(registro.timestamp), registro.temperatura)
+        with self._lock:
+            if not self._segmentos or self._segmentos[-1].cantidad >= self._registros_por_segmento:
+                self._rotar()
+            elif self._activo is None:
+                self._activo = open(self._segmentos[-1].ruta, 'ab')
+            self._activo.write(datos)
+            self._activo.flush()
+            self._segmentos[-1].cantidad += 1
+            self._modificaciones += 1
+            self._estadisticas.agregar(registro.temperatura)
+
+    def iterar(self, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None,
+               limite: Optional[int] = None,
+               antes_de: Optional[CursorHistorial] = None) -> Iterator[RegistroTemperatura]:
+        """Recorre el rango de a un segmento por vez, del mas reciente al mas antiguo.
+
+        El lock se toma solo mientras se lee cada segmento, de modo que la
+        memoria usada queda acotada por el tamaño de segmento. El cursor
+        `antes_de` se ubica con busqueda binaria sobre la secuencia base
+        de cada segmento.
+        """
+        desde_epoch = None if desde is None else timestamp_a_epoch(desde)
+        hasta_epoch = None if hasta is None else timestamp_a_epoch(hasta)
+        restantes = float('inf') if limite is None else max(0, limite)
+        tope = None if antes_de is None else antes_de.secuencia
+        with self._lock:
+            segmentos = list(self._segmentos)
+        if tope is not None:
+            segmentos = segmentos[:bisect_left([s.base for s in segmentos], tope)]
+        for segmento in reversed(segmentos):
+            if restantes <= 0:
+                return
+            with self._lock:
+                if segmento not in self._segmentos:
+                    return
+                lote, continuar = self._leer_segmento(segmento, desde_epoch, hasta_epoch,
+                                                      restantes, tope)
+            yield from lote
+            restantes -= len(lote)
+            if not continuar:
+                return
+
+    def cantidad(self) -> int:
+        """Retorna la cantidad de registros almacenados."""
+        return sum(segmento.cantidad for segmento in self._segmentos)
+
+    def estadisticas(self) -> dict:
+        """Retorna las estadisticas mantenidas incrementalmente."""
+        return self._estadisticas.resumen()
+
+    def version(self) -> str:
+        """Origen de la instancia y cantidad de agregados y limpiezas."""
+        return f'{self._origen}-{self._modificaciones}'
+
+    def limpiar(self) -> None:
+        """Elimina todos los segmentos."""
+        with self._lock:
+            self._cerrar_archivos()
+            for segmento in self._segmentos:
+                os.remove(segmento.ruta)
+            ruta = os.path.join(self._directorio, _ARCHIVO_RESUMEN)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+            self._segmentos = []
+            self._cerrados, self._acumulado_cerrados = 0, acumular(())
+            self._modificaciones += 1
+            self._estadisticas.limpiar()
+
+    def cerrar(self) -> None:
+        """Cierra el segmento activo y libera los mmap."""
+        with self._lock:
+            self._cerrar_archivos()
+
+    @staticmethod
+    def _leer_segmento(segmento: _Segmento, desde_epoch, hasta_epoch, maximo, tope=None):
+        """Lee los registros del segmento en rango (mas reciente primero).
+
+        Args:
+            tope: Secuencia exclusiva maxima (None = sin tope)
+
+        Returns:
+            (registros, continuar) donde continuar indica si segmentos mas
+            antiguos pueden contener registros del rango
+        """
+        cantidad = segmento.cantidad if tope is None else \
+            max(0, min(segmento.cantidad, tope - segmento.base))
+        if cantidad == 0:
+            return [], True
+        if hasta_epoch is not None and segmento.epoch(0) > hasta_epoch:
+            return [], True
+        inicio, fin = buscar_rango(cantidad, segmento.epoch, desde_epoch, hasta_epoch)
+        registros = []
+        for indice in range(fin - 1, inicio - 1, -1):
+            if len(registros) >= maximo:
+                break
+            epoch, temperatura = segmento.leer(indice)
+            registros.append(RegistroTemperatura(
+                temperatura=temperatura,
+                timestamp=epoch_a_timestamp(epoch),
+                secuencia=segmento.base + indice
+            ))
+        return registros, inicio == 0
+
+    def _abrir_segmentos(self) -> List[_Segmento]:
+        """Descubre los segmentos existentes, descartando registros incompletos."""
+        segmentos = []
+        base = 0
+        for nombre in sorted(os.listdir(self._directorio)):
+            if nombre.startswith(_PREFIJO) and nombre.endswith(_EXTENSION):
+                numero = int(nombre[len(_PREFIJO):-len(_EXTENSION)])
+                segmento = _Segmento(os.path.join(self._directorio, nombre), numero, base)
+                segmentos.append(segmento)
+                base += segmento.cantidad
+        if segmentos:
+            ultimo = segmentos[-1]
+            # Un registro a medio escribir por una caida se descarta
+            with open(ultimo.ruta, 'r+b') as archivo:
+                archivo.truncate(ultimo.cantidad * _REGISTRO.size)
+            self._activo = open(ultimo.ruta, 'ab')
+        return segmentos
+
+    def _rotar(self) -> None:
+        """Cierra el segmento activo y crea uno nuevo."""
+        if self._activo:
+            self._activo.close()
+        numero, base = 1, 0
+        if self._segmentos:
+            ultimo = self._segmentos[-1]
+            numero, base = ultimo.numero + 1, ultimo.base + ultimo.cantidad
+            self._acumulado_cerrados = sumar(self._acumulado_cerrados,
+                                             acumular(ultimo.temperaturas()))
+            self._cerrados = len(self._segmentos)
+            self._escribir_resumen()
+        ruta = os.path.join(self._directorio, f"{_PREFIJO}{numero:08d}{_EXTENSION}")
+        self._activo = open(ruta, 'ab')
+        self._segmentos.append(_Segmento(ruta, numero, base))
+
+    def _leer_resumen(self):
+        """Retorna (segmentos cubiertos, acumulado) de los segmentos cerrados.
+
+        Si el resumen falta o no coincide con los segmentos en disco, se
+        reconstruye recorriendo los cerrados una vez.
+        """
+        cerrados = max(0, len(self._segmentos) - 1)
+        ruta = os.path.join(self._directorio, _ARCHIVO_RESUMEN)
+        if os.path.exists(ruta):
+            with open(ruta, 'rb') as archivo:
+                crudo = archivo.read()
+            if len(crudo) == _RESUMEN.size:
+                cubiertos, cantidad, suma, cuadrados, minimo, maximo = _RESUMEN.unpack(crudo)
+                if (cubiertos == cerrados and
+                        cantidad == sum(s.cantidad for s in self._segmentos[:cerrados])):
+                    return cubiertos, Acumulado(cantidad, suma, cuadrados,
+                                                minimo if cantidad else None,
+                                                maximo if cantidad else None)
+        acumulado = acumular(t for s in self._segmentos[:cerrados] for t in s.temperaturas())
+        if cerrados:
+            self._cerrados, self._acumulado_cerrados = cerrados, acumulado
+            self._escribir_resumen()
+        return cerrados, acumulado
+
+    def _escribir_resumen(self) -> None:
+        """Reemplaza el archivo de resumen de los segmentos cerrados."""
+        acumulado = self._acumulado_cerrados
+        ruta = os.path.join(self._directorio, _ARCHIVO_RESUMEN)
+        with open(ruta + '.tmp', 'wb') as archivo:
+            archivo.write(_RESUMEN.pack(self._cerrados, acumulado.cantidad, acumulado.suma,
+                                        acumulado.suma_cuadrados, acumulado.minimo or 0,
+                                        acumulado.maximo or 0))
+        os.replace(ruta + '.tmp', ruta)
+
+    def _cerrar_archivos(self) -> None:
+        """Cierra el archivo activo y los mmap abiertos."""
+        if self._activo:
+            self._activo.close()
+            self._activo = None
+        for segmento in self._segmentos:
+            segmento.cerrar()
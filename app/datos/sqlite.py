@@ -0,0 +1,176 @@
+"""
+Implementacion SQLite del repositorio de historial.
+Persiste el historial en disco usando WAL y commits agrupados.
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Iterator, Optional
+
+from app.configuracion.config import Config
+from app.datos.estadisticas import Acumulado, EstadisticasTemperatura
+from app.datos.registro import (
+    CursorHistorial,
+    RegistroTemperatura,
+    epoch_a_timestamp,
+    timestamp_a_epoch,
+)
+from app.datos.repositorio import HistorialRepositorio
+
+_ESQUEMA = (
+    "CREATE TABLE IF NOT EXISTS historial ("
+    " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+    " timestamp INTEGER NOT NULL,"
+    " temperatura INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS idx_historial_timestamp ON historial (timestamp)",
+)
+_EPOCH_MIN = -2 ** 63
+_EPOCH_MAX = 2 ** 63 - 1
+# Filas leidas por consulta al recorrer el historial
+_LOTE_LECTURA = 1000
+
+
+class HistorialRepositorioSQLite(HistorialRepositorio):
+    """Repositorio de historial persistido en una base SQLite.
+
+    La base usa journal WAL con synchronous=NORMAL, de modo que un commit
+    no fuerza fsync. Los inserts se agrupan en una transaccion que se
+    confirma al acumular `lote` registros o al pasar `intervalo_ms` desde
+    el primer registro pendiente. Ante una caida se pierden como maximo
+    los registros de la transaccion abierta.
+    """
+
+    def __init__(self, ruta: str = None, lote: int = None, intervalo_ms: int = None):
+        self._ruta = ruta or Config.HISTORIAL_SQLITE_RUTA
+        self._lote = max(1, lote or Config.HISTORIAL_SQLITE_LOTE)
+        self._intervalo = (Config.HISTORIAL_SQLITE_INTERVALO_MS if intervalo_ms is None
+                           else intervalo_ms) / 1000
+        self._lock = threading.RLock()
+        self._pendientes = 0
+        self._temporizador: Optional[threading.Timer] = None
+        self._origen = uuid.uuid4().hex[:12]
+        self._modificaciones = 0
+
+        directorio = os.path.dirname(self._ruta)
+        if directorio and not os.path.exists(directorio):
+            os.makedirs(directorio)
+        self._conexion = sqlite3.connect(self._ruta, check_same_thread=False,
+                                         isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        for sentencia in _ESQUEMA:
+            self._conexion.execute(sentencia)
+        # Estadisticas iniciales: una sola consulta de agregacion al abrir la base
+        acumulado = Acumulado(*self._conexion.execute(
+            "SELECT COUNT(*), COALESCE(SUM(temperatura), 0),"
+            " COALESCE(SUM(temperatura * temperatura), 0), MIN(temperatura), MAX(temperatura)"
+            " FROM historial"
+        ).fetchone())
+        self._cantidad = acumulado.cantidad
+        self._estadisticas = EstadisticasTemperatura()
+        self._estadisticas.combinar(acumulado)
+        atexit.register(self.cerrar)
+
+    def agregar(self, registro: RegistroTemperatura) -> None:
+        """Inserta el registro en la transaccion abierta y confirma por lotes."""
+        with self._lock:
+            if self._pendientes == 0:
+                self._conexion.execute("BEGIN")
+                self._programar_confirmacion()
+            self._conexion.execute(
+                "INSERT INTO historial (timestamp, temperatura) VALUES (?, ?)",
+                (timestamp_a_epoch(registro.timestamp), registro.temperatura)
+            )
+            self._pendientes += 1
+            self._cantidad += 1
+            self._modificaciones += 1
+            self._estadisticas.agregar(registro.temperatura)
+            if self._pendientes >= self._lote:
+                self.confirmar()
+
+    def iterar(self, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None,
+               limite: Optional[int] = None,
+               antes_de: Optional[CursorHistorial] = None) -> Iterator[RegistroTemperatura]:
+        """Recorre el rango en lotes de _LOTE_LECTURA filas.
+
+        Cada lote es una consulta independiente que continua desde el
+        ultimo (timestamp, id) leido, por lo que no se mantiene un cursor
+        abierto ni el lock entre lotes. El cursor `antes_de` es el punto de
+        partida de esa misma busqueda sobre el indice. La secuencia de
+        cada registro es su id.
+        """
+        desde_epoch = _EPOCH_MIN if desde is None else timestamp_a_epoch(desde)
+        hasta_epoch = _EPOCH_MAX if hasta is None else timestamp_a_epoch(hasta)
+        restantes = float('inf') if limite is None else max(0, limite)
+        ultimo = (_EPOCH_MAX, _EPOCH_MAX) if antes_de is None else \
+            (timestamp_a_epoch(antes_de.timestamp), antes_de.secuencia)
+        while restantes > 0:
+            lote = int(min(restantes, _LOTE_LECTURA))
+            with self._lock:
+                filas = self._conexion.execute(
+                    "SELECT id, timestamp, temperatura FROM historial"
+                    " WHERE timestamp BETWEEN ? AND ? AND (timestamp, id) < (?, ?)"
+                    " ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (desde_epoch, hasta_epoch, *ultimo, lote)
+                ).fetchall()
+            for secuencia, epoch, temperatura in filas:
+                yield RegistroTemperatura(temperatura=temperatura,
+                                          timestamp=epoch_a_timestamp(epoch),
+                                          secuencia=secuencia)
+            if len(filas) < lote:
+                return
+            restantes -= len(filas)
+            ultimo = (filas[-1][1], filas[-1][0])
+
+    def cantidad(self) -> int:
+        """Retorna la cantidad de registros almacenados."""
+        return self._cantidad
+
+    def estadisticas(self) -> dict:
+        """Retorna las estadisticas mantenidas incrementalmente."""
+        return self._estadisticas.resumen()
+
+    def version(self) -> str:
+        """Origen de la instancia y cantidad de agregados y limpiezas."""
+        return f'{self._origen}-{self._modificaciones}'
+
+    def limpiar(self) -> None:
+        """Elimina todos los registros."""
+        with self._lock:
+            self.confirmar()
+            self._conexion.execute("DELETE FROM historial")
+            self._cantidad = 0
+            self._modificaciones += 1
+            self._estadisticas.limpiar()
+
+    def confirmar(self) -> None:
+        """Confirma la transaccion abierta, si hay registros pendientes."""
+        with self._lock:
+            if self._temporizador:
+                self._temporizador.cancel()
+                self._temporizador = None
+            if self._pendientes:
+                self._conexion.execute("COMMIT")
+                self._pendientes = 0
+
+    def cerrar(self) -> None:
+        """Confirma los registros pendientes y cierra la conexion."""
+        with self._lock:
+            if self._conexion is None:
+                return
+            self.confirmar()
+            self._conexion.close()
+            self._conexion = None
+        atexit.unregister(self.cerrar)
+
+    def _programar_confirmacion(self) -> None:
+        """Programa la confirmacion del lote al vencer el intervalo."""
+        if self._intervalo <= 0:
+            return
+        self._temporizador = threading.Timer(self._intervalo, self.confirmar)
+        self._temporizador.daemon = True
+        self._temporizador.start()
@@ -25,7 +25,8 @@ class Termostato:
 
     def __init__(self, historial_repositorio=None, persistidor=None,
                  temperatura_ambiente_inicial=20, temperatura_deseada_inicial=24,
-                 carga_bateria_inicial=5.0, indicador_calc=None):
+                 carga_bateria_inicial=5.0, indicador_calc=None,
+                 registrar_repetidas=True, bus=None):
         modelo = TermostatoModelo(
             temperatura_ambiente=temperatura_ambiente_inicial,
             temperatura_deseada=temperatura_deseada_inicial,
@@ -37,6 +38,8 @@ class Termostato:
             indicador_calc=indicador_calc or IndicadorCalculatorTresNiveles(),
             persistidor=persistidor,
             historial_repositorio=historial_repositorio,
+            registrar_repetidas=registrar_repetidas,
+            bus=bus,
         )
 
     @property
@@ -84,6 +87,39 @@ class Termostato:
         """Calcula el indicador de carga basado en el nivel de batería."""
         return self._service.obtener_indicador()
 
+    @property
+    def version(self):
+        """Version del estado; crece con cada cambio aplicado."""
+        return self._service.version
+
+    def actualizar(self, valores):
+        """Aplica varios campos juntos: todos validos o ninguno."""
+        self._service.actualizar(valores)
+
+    def esperar_cambio(self, version, timeout):
+        """Espera a que la version difiera de `version`; retorna el snapshot o None."""
+        return self._service.esperar_cambio(version, timeout)
+
+    def etiqueta(self, version):
+        """Etiqueta de entidad (ETag) del estado en `version`."""
+        return self._service.etiqueta(version)
+
+    def snapshot(self):
+        """Retorna todo el estado, el indicador y la version en una sola lectura."""
+        return self._service.snapshot()
+
+    def metricas(self):
+        """Retorna los contadores de actualizaciones y escrituras evitadas."""
+        return self._service.metricas()
+
+    def suscribir(self, suscriptor):
+        """Agrega un suscriptor a los eventos de actualizacion."""
+        self._service.suscribir(suscriptor)
+
+    def vaciar_eventos(self, timeout=None):
+        """Espera a que el historial y la persistencia reflejen las actualizaciones."""
+        return self._service.vaciar_eventos(timeout)
+
     def cargar_estado(self):
         """Carga el estado desde el persistidor si existe."""
         self._service.cargar_estado()
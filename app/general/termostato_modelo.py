@@ -5,10 +5,16 @@ Representa el estado del dispositivo sin lógica de negocio.
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(frozen=True)
 class TermostatoModelo:
-    """Estado del termostato como modelo de datos puro."""
+    """Estado inmutable del termostato en una version dada.
+
+    Cada cambio crea un modelo nuevo (dataclasses.replace) con la version
+    siguiente, de modo que quien tenga una referencia ve siempre un estado
+    completo y coherente.
+    """
     temperatura_ambiente: int = 20
     temperatura_deseada: int = 24
     carga_bateria: float = 5.0
     estado_climatizador: str = "apagado"
+    version: int = 0
@@ -2,17 +2,24 @@
 API REST del termostato.
 Expone endpoints para consultar y modificar el estado del termostato.
 """
+import json
 import logging
+import math
 from datetime import datetime
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flasgger import Swagger
 
 from app.configuracion import Config
 from app.configuracion.factory import TermostatoFactory
 from app.configuracion.swagger_config import get_swagger_config, get_swagger_template
+from app.datos.agregacion import parsear_intervalo, resumir_por_intervalo
+from app.servicios.condicional import respuesta_condicional
+from app.servicios.cupo import CupoConexiones
+from app.servicios.cache_respuestas import CacheRespuestas
 from app.servicios.decorators import endpoint_termostato
+from app.servicios.difusor import Difusor
 from app.servicios.errors import error_response
 
 # Configurar logging
@@ -23,6 +30,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Registros por bloque al transmitir el historial como NDJSON
+_LINEAS_POR_BLOQUE = 500
+# Campo del request -> campo del modelo, como en los endpoints individuales
+_CAMPOS_REQUEST = {
+    'ambiente': 'temperatura_ambiente',
+    'deseada': 'temperatura_deseada',
+    'bateria': 'carga_bateria',
+    'climatizador': 'estado_climatizador',
+}
+
 
 def create_app(termostato=None, historial_repositorio=None, historial_mapper=None):
     """Crea la aplicación Flask con inyección de dependencias.
@@ -44,6 +61,11 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
     _historial_mapper = historial_mapper or TermostatoFactory.crear_historial_mapper()
 
     app_state = _AppState()
+    _difusor = Difusor()
+    _cache = CacheRespuestas(_termostato)
+    # Long polling y streams abiertos a la vez en este worker
+    _conexiones_largas = CupoConexiones(Config.CONEXIONES_LARGAS_MAX)
+    _termostato.suscribir(_difusor.publicar_evento)
 
     @app.errorhandler(404)
     def not_found_error(error):
@@ -119,15 +141,147 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
                 indicador:
                   type: string
                   example: NORMAL
+                version:
+                  type: integer
+                  description: Version del estado, crece con cada cambio
+                  example: 3
+          304:
+            description: El estado no cambio desde el ETag enviado en If-None-Match
         """
-        logger.info("GET /termostato/ -> 200")
-        return jsonify({
-            'temperatura_ambiente': _termostato.temperatura_ambiente,
-            'temperatura_deseada': _termostato.temperatura_deseada,
-            'carga_bateria': _termostato.carga_bateria,
-            'estado_climatizador': _termostato.estado_climatizador,
-            'indicador': _termostato.indicador
-        })
+        version, generar = _cache.respuesta('termostato', lambda t: t.snapshot())
+        respuesta = respuesta_condicional(_termostato.etiqueta(version), generar)
+        logger.info("GET /termostato/ -> %d", respuesta.status_code)
+        return respuesta
+
+    @app.route("/termostato/", methods=["PATCH"])
+    def actualizar_termostato():
+        """Actualiza varios campos del termostato en una sola operacion.
+        ---
+        tags:
+          - Termostato
+        parameters:
+          - name: body
+            in: body
+            required: true
+            schema:
+              type: object
+              description: Cualquier subconjunto de los campos
+              properties:
+                ambiente:
+                  type: integer
+                  example: 25
+                deseada:
+                  type: integer
+                  example: 22
+                bateria:
+                  type: number
+                  example: 4.2
+                climatizador:
+                  type: string
+                  example: enfriando
+        responses:
+          200:
+            description: Campos aplicados; retorna el estado completo resultante
+          400:
+            description: Campo desconocido o valor invalido (no se aplica ningun campo)
+        """
+        datos = request.get_json()
+        if not isinstance(datos, dict) or not datos:
+            logger.warning("PATCH /termostato/ - Sin campos")
+            return error_response(400, "Campo requerido faltante",
+                                  f"Se requiere al menos uno de: {', '.join(_CAMPOS_REQUEST)}")
+        desconocidos = [campo for campo in datos if campo not in _CAMPOS_REQUEST]
+        if desconocidos:
+            logger.warning("PATCH /termostato/ - Campos desconocidos: %s", desconocidos)
+            return error_response(400, "Campo desconocido", ', '.join(desconocidos))
+        try:
+            _termostato.actualizar({_CAMPOS_REQUEST[campo]: valor for campo, valor in datos.items()})
+        except ValueError as e:
+            logger.warning("PATCH /termostato/ - %s", e)
+            return error_response(400, "Valor fuera de rango", str(e))
+        logger.info("PATCH /termostato/ -> 200")
+        return jsonify(_termostato.snapshot())
+
+    @app.route("/termostato/cambios/", methods=["GET"])
+    def esperar_cambios():
+        """Espera un cambio de estado posterior a una version (long polling).
+        ---
+        tags:
+          - Termostato
+        parameters:
+          - name: version
+            in: query
+            type: integer
+            required: true
+            description: Ultima version conocida por el cliente
+          - name: timeout
+            in: query
+            type: number
+            required: false
+            description: Segundos maximos de espera (default y maximo CAMBIOS_ESPERA_MAX_S)
+        responses:
+          200:
+            description: Estado completo de la version nueva (mismo formato que GET /termostato/)
+          204:
+            description: No hubo cambios durante la espera
+          400:
+            description: Parametro version o timeout invalido
+          503:
+            description: Se alcanzo el maximo de conexiones largas (CONEXIONES_LARGAS_MAX)
+        """
+        version = request.args.get('version', type=int)
+        timeout = _parsear_timeout(request.args.get('timeout'))
+        if version is None or timeout is None:
+            logger.warning("GET /termostato/cambios/ - Parametros invalidos")
+            return error_response(400, "Parametro invalido",
+                                  "Se requiere version entera y timeout no negativo")
+        if not _conexiones_largas.tomar():
+            logger.warning("GET /termostato/cambios/ - Maximo de esperas alcanzado")
+            return error_response(503, "Servicio no disponible", "Maximo de esperas alcanzado")
+        try:
+            estado = _termostato.esperar_cambio(version, min(timeout, Config.CAMBIOS_ESPERA_MAX_S))
+        finally:
+            _conexiones_largas.liberar()
+        if estado is None:
+            logger.info("GET /termostato/cambios/ -> 204")
+            return Response(status=204)
+        logger.info("GET /termostato/cambios/ -> 200 (version %d)", estado['version'])
+        respuesta = jsonify(estado)
+        respuesta.set_etag(_termostato.etiqueta(estado['version']))
+        return respuesta
+
+    @app.route("/termostato/stream/", methods=["GET"])
+    def stream_termostato():
+        """Transmite los cambios del termostato como Server-Sent Events.
+        ---
+        tags:
+          - Termostato
+        produces:
+          - text/event-stream
+        responses:
+          200:
+            description: >
+              Stream SSE. Primero un evento `estado` con el estado completo;
+              luego `cambio` (version y campos modificados) y `lectura`
+              (temperatura ambiente registrada). Un cliente que no consume a
+              tiempo recibe `desconectado` y debe reconectarse.
+          503:
+            description: >
+              Se alcanzo el maximo de suscriptores (STREAM_MAX_SUSCRIPTORES)
+              o de conexiones largas (CONEXIONES_LARGAS_MAX)
+        """
+        if not _conexiones_largas.tomar():
+            logger.warning("GET /termostato/stream/ - Maximo de esperas alcanzado")
+            return error_response(503, "Servicio no disponible", "Maximo de esperas alcanzado")
+        suscripcion = _difusor.suscribir()
+        if suscripcion is None:
+            _conexiones_largas.liberar()
+            logger.warning("GET /termostato/stream/ - Maximo de suscriptores alcanzado")
+            return error_response(503, "Servicio no disponible", "Maximo de suscriptores alcanzado")
+        logger.info("GET /termostato/stream/ -> 200")
+        respuesta = _respuesta_sse(suscripcion, _termostato.snapshot(), Config.STREAM_LATIDO_S)
+        respuesta.call_on_close(_conexiones_largas.liberar)
+        return respuesta
 
     @app.route("/termostato/historial/", methods=["GET"])
     def obtener_historial():
@@ -140,7 +294,36 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
             in: query
             type: integer
             required: false
-            description: Numero maximo de registros a retornar
+            description: >
+              Registros por pagina (default HISTORIAL_LIMITE_DEFAULT, maximo
+              HISTORIAL_LIMITE_MAXIMO). En NDJSON no tiene tope y sin el se
+              exporta todo el rango
+          - name: desde
+            in: query
+            type: string
+            format: date-time
+            required: false
+            description: Timestamp ISO 8601 minimo (inclusivo)
+          - name: hasta
+            in: query
+            type: string
+            format: date-time
+            required: false
+            description: Timestamp ISO 8601 maximo (inclusivo)
+          - name: formato
+            in: query
+            type: string
+            required: false
+            enum: [json, ndjson]
+            description: ndjson transmite un registro por linea (equivale a Accept application/x-ndjson)
+          - name: cursor
+            in: query
+            type: string
+            required: false
+            description: Cursor opaco (campo siguiente de la pagina anterior); retoma con los registros mas antiguos
+        produces:
+          - application/json
+          - application/x-ndjson
         responses:
           200:
             description: Historial de temperaturas
@@ -158,18 +341,241 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
                         type: string
                 total:
                   type: integer
+                siguiente:
+                  type: string
+                  description: Cursor de la pagina siguiente (null si no hay mas registros en el rango)
+          304:
+            description: El historial no cambio desde el ETag enviado en If-None-Match
+          400:
+            description: Parametro desde/hasta/cursor con formato invalido
         """
         limite = request.args.get('limite', type=int)
-        registros = _historial_repo.obtener(limite)
-        historial = [_historial_mapper.a_dict(r) for r in registros]
-        logger.info("GET /termostato/historial/ -> 200 (%d registros)", len(historial))
+        try:
+            desde = _parsear_fecha(request.args.get('desde'))
+            hasta = _parsear_fecha(request.args.get('hasta'))
+            cursor = request.args.get('cursor')
+            antes_de = None if cursor is None else _historial_mapper.desde_cursor(cursor)
+        except ValueError as e:
+            logger.warning("GET /termostato/historial/ - %s", e)
+            return error_response(400, "Parametro invalido", str(e))
+
+        if _solicita_ndjson():
+            logger.info("GET /termostato/historial/ -> 200 (ndjson)")
+            return _respuesta_ndjson(
+                _historial_repo.iterar(desde, hasta, limite, antes_de=antes_de),
+                _historial_mapper,
+                _historial_repo.cantidad()
+            )
+
+        # JSON arma la pagina completa en memoria: se acota y se ofrece cursor
+        limite = Config.HISTORIAL_LIMITE_DEFAULT if limite is None else \
+            max(0, min(limite, Config.HISTORIAL_LIMITE_MAXIMO))
+
+        def generar():
+            # Un registro de mas indica si existe una pagina siguiente
+            registros = list(_historial_repo.iterar(desde, hasta, limite + 1, antes_de=antes_de))
+            siguiente = None
+            if limite and len(registros) > limite:
+                registros = registros[:limite]
+                siguiente = _historial_mapper.a_cursor(registros[-1])
+            historial = [_historial_mapper.a_dict(r) for r in registros]
+            logger.info("GET /termostato/historial/ -> 200 (%d registros)", len(historial))
+            return jsonify({
+                'historial': historial,
+                'total': _historial_repo.cantidad(),
+                'siguiente': siguiente
+            })
+
+        respuesta = respuesta_condicional(_historial_repo.version(), generar)
+        # La misma URL puede responder NDJSON segun Accept
+        respuesta.vary.add('Accept')
+        if respuesta.status_code == 304:
+            logger.info("GET /termostato/historial/ -> 304")
+        return respuesta
+
+    @app.route("/termostato/historial/agregado/", methods=["GET"])
+    def obtener_historial_agregado():
+        """Obtiene el historial resumido por intervalos de tiempo.
+        ---
+        tags:
+          - Historial
+        parameters:
+          - name: bucket
+            in: query
+            type: string
+            required: false
+            default: 5m
+            description: Ancho del intervalo (ej. 30s, 5m, 1h, 1d)
+          - name: desde
+            in: query
+            type: string
+            format: date-time
+            required: false
+            description: Timestamp ISO 8601 minimo (inclusivo)
+          - name: hasta
+            in: query
+            type: string
+            format: date-time
+            required: false
+            description: Timestamp ISO 8601 maximo (inclusivo)
+        responses:
+          200:
+            description: Intervalos del mas reciente al mas antiguo
+            schema:
+              type: object
+              properties:
+                bucket:
+                  type: string
+                  example: 5m
+                intervalos:
+                  type: array
+                  items:
+                    type: object
+                    properties:
+                      inicio:
+                        type: string
+                      minimo:
+                        type: integer
+                      maximo:
+                        type: integer
+                      media:
+                        type: number
+                      cantidad:
+                        type: integer
+          400:
+            description: Parametro bucket, desde o hasta invalido
+        """
+        bucket = request.args.get('bucket', '5m')
+        try:
+            segundos = parsear_intervalo(bucket)
+            desde = _parsear_fecha(request.args.get('desde'))
+            hasta = _parsear_fecha(request.args.get('hasta'))
+        except ValueError as e:
+            logger.warning("GET /termostato/historial/agregado/ - %s", e)
+            return error_response(400, "Parametro invalido", str(e))
+
+        def generar():
+            intervalos = resumir_por_intervalo(
+                _historial_repo.iterar(desde, hasta),
+                segundos,
+                Config.HISTORIAL_AGREGADO_MAX_INTERVALOS
+            )
+            logger.info("GET /termostato/historial/agregado/ -> 200 (%d intervalos)",
+                        len(intervalos))
+            return jsonify({
+                'bucket': bucket,
+                'intervalos': intervalos
+            })
+
+        return respuesta_condicional(_historial_repo.version(), generar)
+
+    @app.route("/termostato/historial/estadisticas/", methods=["GET"])
+    def obtener_historial_estadisticas():
+        """Obtiene estadisticas de la temperatura ambiente registrada.
+        ---
+        tags:
+          - Historial
+        responses:
+          200:
+            description: Estadisticas mantenidas incrementalmente por el repositorio
+            schema:
+              type: object
+              properties:
+                cantidad:
+                  type: integer
+                  example: 100
+                media:
+                  type: number
+                  example: 22.5
+                desviacion_estandar:
+                  type: number
+                  example: 1.2
+                minimo:
+                  type: integer
+                  example: 19
+                maximo:
+                  type: integer
+                  example: 26
+        """
+        respuesta = respuesta_condicional(_historial_repo.version(),
+                                          lambda: jsonify(_historial_repo.estadisticas()))
+        logger.info("GET /termostato/historial/estadisticas/ -> %d", respuesta.status_code)
+        return respuesta
+
+    @app.route("/termostato/metricas/", methods=["GET"])
+    def obtener_metricas():
+        """Obtiene metricas internas del termostato.
+        ---
+        tags:
+          - Health
+        responses:
+          200:
+            description: Contadores de actualizaciones y escrituras
+            schema:
+              type: object
+              properties:
+                estado:
+                  type: object
+                  properties:
+                    actualizaciones:
+                      type: integer
+                      description: Actualizaciones validas recibidas
+                    escrituras:
+                      type: integer
+                      description: Guardados de estado realizados
+                    escrituras_evitadas:
+                      type: integer
+                      description: Guardados omitidos porque el valor no cambio
+                    historial_evitados:
+                      type: integer
+                      description: Lecturas repetidas no registradas en el historial
+                stream:
+                  type: object
+                  properties:
+                    suscriptores:
+                      type: integer
+                      description: Clientes conectados a /termostato/stream/
+                    publicados:
+                      type: integer
+                      description: Mensajes difundidos
+                    descartados:
+                      type: integer
+                      description: Clientes desconectados por no consumir a tiempo
+                cache:
+                  type: object
+                  properties:
+                    aciertos:
+                      type: integer
+                      description: GET servidos con el cuerpo ya serializado
+                    fallos:
+                      type: integer
+                      description: GET que reconstruyeron el cuerpo porque cambio el estado
+                    tasa_aciertos:
+                      type: number
+                      description: aciertos / (aciertos + fallos)
+                esperas:
+                  type: object
+                  properties:
+                    en_uso:
+                      type: integer
+                      description: Conexiones abiertas de /cambios/ y /stream/ en este worker
+                    maximo:
+                      type: integer
+                      description: CONEXIONES_LARGAS_MAX
+                    rechazadas:
+                      type: integer
+                      description: Conexiones rechazadas con 503 por falta de lugar
+        """
+        logger.info("GET /termostato/metricas/ -> 200")
         return jsonify({
-            'historial': historial,
-            'total': _historial_repo.cantidad()
+            'estado': _termostato.metricas(),
+            'stream': _difusor.metricas(),
+            'cache': _cache.metricas(),
+            'esperas': _conexiones_largas.metricas()
         })
 
     @app.route("/termostato/temperatura_ambiente/", methods=["GET", "POST"])
-    @endpoint_termostato(_termostato, "temperatura_ambiente", "ambiente")
+    @endpoint_termostato(_termostato, "temperatura_ambiente", "ambiente", cache=_cache)
     def obtener_temperatura_ambiente():
         """Gestiona la temperatura ambiente.
         ---
@@ -220,7 +626,7 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
         """
 
     @app.route("/termostato/temperatura_deseada/", methods=["GET", "POST"])
-    @endpoint_termostato(_termostato, "temperatura_deseada", "deseada")
+    @endpoint_termostato(_termostato, "temperatura_deseada", "deseada", cache=_cache)
     def obtener_temperatura_deseada():
         """Gestiona la temperatura deseada.
         ---
@@ -253,7 +659,7 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
         """
 
     @app.route("/termostato/bateria/", methods=["GET", "POST"])
-    @endpoint_termostato(_termostato, "carga_bateria", "bateria")
+    @endpoint_termostato(_termostato, "carga_bateria", "bateria", cache=_cache)
     def obtener_carga_bateria():
         """Gestiona la carga de bateria.
         ---
@@ -286,7 +692,7 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
         """
 
     @app.route("/termostato/estado_climatizador/", methods=["GET", "POST"])
-    @endpoint_termostato(_termostato, "estado_climatizador", "climatizador")
+    @endpoint_termostato(_termostato, "estado_climatizador", "climatizador", cache=_cache)
     def obtener_estado_climatizador():
         """Gestiona el estado del climatizador.
         ---
@@ -336,12 +742,113 @@ def create_app(termostato=None, historial_repositorio=None, historial_mapper=Non
                   description: NORMAL (>3.5), BAJO (2.5-3.5), CRITICO (<2.5)
                   example: NORMAL
         """
-        logger.info("GET /termostato/indicador/ -> 200")
-        return jsonify({'indicador': _termostato.indicador})
+        version, generar = _cache.respuesta(
+            'indicador', lambda t: {'indicador': t.indicador}
+        )
+        respuesta = respuesta_condicional(_termostato.etiqueta(version), generar)
+        logger.info("GET /termostato/indicador/ -> %d", respuesta.status_code)
+        return respuesta
 
     return app
 
 
+def _solicita_ndjson():
+    """Indica si el cliente pidio el historial como NDJSON."""
+    if request.args.get('formato', '').lower() in ('ndjson', 'stream'):
+        return True
+    mejor = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return mejor == 'application/x-ndjson'
+
+
+def _respuesta_ndjson(registros, mapper, total):
+    """Respuesta que transmite los registros como NDJSON en bloques.
+
+    Los registros se consumen del iterador del repositorio a medida que
+    se envian, por lo que la memoria no crece con la cantidad exportada.
+    """
+    def generar():
+        lineas = []
+        for registro in registros:
+            lineas.append(json.dumps(mapper.a_dict(registro)))
+            if len(lineas) >= _LINEAS_POR_BLOQUE:
+                yield '\n'.join(lineas) + '\n'
+                lineas = []
+        if lineas:
+            yield '\n'.join(lineas) + '\n'
+
+    return Response(generar(), mimetype='application/x-ndjson',
+                    headers={'X-Total-Count': str(total)})
+
+
+def _respuesta_sse(suscripcion, estado, latido):
+    """Respuesta text/event-stream alimentada por una suscripcion del difusor.
+
+    Envia el estado inicial y luego cada mensaje difundido; sin mensajes
+    durante `latido` segundos envia un comentario para mantener viva la
+    conexion y detectar clientes desconectados. La suscripcion se cancela
+    al terminar el stream o al cerrarse la respuesta, aunque el servidor
+    no haya llegado a iterarla.
+    """
+    def generar():
+        try:
+            yield _evento_sse('estado', estado, estado['version'])
+            while True:
+                mensaje = suscripcion.recibir(latido)
+                if mensaje is not None:
+                    yield _evento_sse(*mensaje)
+                elif suscripcion.cerrada:
+                    yield _evento_sse('desconectado', {'motivo': 'cliente lento'})
+                    return
+                else:
+                    yield ': latido\n\n'
+        finally:
+            suscripcion.cancelar()
+
+    respuesta = Response(generar(), mimetype='text/event-stream',
+                         headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    respuesta.call_on_close(suscripcion.cancelar)
+    return respuesta
+
+
+def _evento_sse(tipo, datos, identificador=None):
+    """Formatea un evento de Server-Sent Events."""
+    lineas = [f'event: {tipo}']
+    if identificador is not None:
+        lineas.append(f'id: {identificador}')
+    lineas.append(f'data: {json.dumps(datos)}')
+    return '\n'.join(lineas) + '\n\n'
+
+
+def _parsear_timeout(valor):
+    """Segundos de espera pedidos (default CAMBIOS_ESPERA_MAX_S); None si no es valido."""
+    if valor is None:
+        return Config.CAMBIOS_ESPERA_MAX_S
+    try:
+        segundos = float(valor)
+    except ValueError:
+        return None
+    if not math.isfinite(segundos) or segundos < 0:
+        return None
+    return segundos
+
+
+def _parsear_fecha(valor):
+    """Convierte un parametro ISO 8601 a datetime naive en hora local.
+
+    Los timestamps con zona horaria se convierten a la hora local del
+    servidor, que es como se registran en el historial.
+    """
+    if not valor:
+        return None
+    try:
+        fecha = datetime.fromisoformat(valor)
+    except ValueError as e:
+        raise ValueError(f"Fecha invalida '{valor}', se espera formato ISO 8601") from e
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    return fecha
+
+
 class _AppState:
     """Estado interno de la aplicación Flask."""
     def __init__(self):
@@ -0,0 +1,63 @@
+"""
+Cache de respuestas JSON ya serializadas para los GET del estado del termostato.
+"""
+import threading
+from typing import Callable, Tuple
+
+from flask import Response, current_app
+
+
+class CacheRespuestas:
+    """Guarda el cuerpo JSON codificado de cada endpoint junto a su version.
+
+    Una lectura solo compara la version vigente del termostato con la de
+    la entrada: si coincide reutiliza los bytes, sin recalcular el
+    indicador ni volver a serializar. Cualquier cambio aumenta la version
+    e invalida todas las entradas; la siguiente lectura de cada endpoint
+    la reconstruye. La version se lee antes de armar el cuerpo: si el
+    estado cambia entretanto, la entrada queda con un cuerpo mas nuevo que
+    su version y la siguiente lectura la reconstruye. Como la version del
+    modelo sigue al archivo compartido, tambien se invalida con los
+    cambios de otros workers.
+    """
+
+    def __init__(self, termostato):
+        self._termostato = termostato
+        self._entradas = {}
+        self._lock = threading.Lock()
+        self._aciertos = 0
+        self._fallos = 0
+
+    def obtener(self, clave: str, extraer: Callable[[object], dict]) -> Tuple[int, bytes]:
+        """Retorna (version, cuerpo JSON) de `clave`, reconstruyendolo si cambio el estado.
+
+        Args:
+            clave: Identificador del endpoint
+            extraer: Arma el cuerpo a partir del termostato
+        """
+        version = self._termostato.version
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada[0] == version:
+            with self._lock:
+                self._aciertos += 1
+            return entrada
+        entrada = (version, current_app.json.response(extraer(self._termostato)).get_data())
+        with self._lock:
+            self._fallos += 1
+            self._entradas[clave] = entrada
+        return entrada
+
+    def respuesta(self, clave: str, extraer: Callable[[object], dict]) -> Tuple[int, Callable[[], Response]]:
+        """Como obtener(), pero con el cuerpo envuelto en una respuesta JSON."""
+        version, cuerpo = self.obtener(clave, extraer)
+        return version, lambda: Response(cuerpo, mimetype=current_app.json.mimetype)
+
+    def metricas(self) -> dict:
+        """Aciertos, fallos y proporcion de lecturas servidas desde la cache."""
+        with self._lock:
+            total = self._aciertos + self._fallos
+            return {
+                'aciertos': self._aciertos,
+                'fallos': self._fallos,
+                'tasa_aciertos': round(self._aciertos / total, 4) if total else 0.0
+            }
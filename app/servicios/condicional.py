@@ -0,0 +1,30 @@
+"""
+Respuestas condicionales (ETag / If-None-Match) para los GET consultados periodicamente.
+"""
+from typing import Callable, Optional
+
+from flask import Response, request
+
+
+def respuesta_condicional(etiqueta: Optional[str], generar: Callable[[], Response]) -> Response:
+    """Responde 304 sin generar el cuerpo si el cliente ya tiene `etiqueta`.
+
+    La etiqueta debe obtenerse antes de generar el cuerpo: si el estado
+    cambia entretanto, el cuerpo es mas nuevo que la etiqueta y el
+    cliente solo lo vuelve a pedir en la siguiente consulta. Sin
+    etiqueta (None) retorna la respuesta completa.
+
+    Args:
+        etiqueta: Version del recurso, sin comillas
+        generar: Construye la respuesta completa (solo si hace falta)
+    """
+    if etiqueta is None:
+        return generar()
+    if request.if_none_match.contains_weak(etiqueta):
+        respuesta = Response(status=304)
+    else:
+        respuesta = generar()
+    respuesta.set_etag(etiqueta)
+    # Los clientes pueden guardar la respuesta pero deben revalidarla
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
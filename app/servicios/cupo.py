@@ -0,0 +1,44 @@
+"""
+Cupo de conexiones largas (long polling, streams) por proceso.
+Evita que las esperas ocupen todas las conexiones que atiende un worker.
+"""
+import threading
+
+
+class CupoConexiones:
+    """Cuenta las conexiones largas abiertas en el worker.
+
+    tomar() falla en lugar de esperar cuando el cupo esta completo, para
+    que la peticion se rechace (503) de inmediato. El cupo debe dejar
+    margen bajo la capacidad del worker (WORKER_CONNECTIONS con gevent,
+    --threads con workers de hilos) para las demas peticiones.
+    """
+
+    def __init__(self, maximo: int):
+        self._maximo = max(0, maximo)
+        self._lock = threading.Lock()
+        self._en_uso = 0
+        self._rechazadas = 0
+
+    def tomar(self) -> bool:
+        """Ocupa un lugar; False si el cupo esta completo."""
+        with self._lock:
+            if self._en_uso >= self._maximo:
+                self._rechazadas += 1
+                return False
+            self._en_uso += 1
+            return True
+
+    def liberar(self) -> None:
+        """Libera un lugar tomado con tomar()."""
+        with self._lock:
+            self._en_uso -= 1
+
+    def metricas(self) -> dict:
+        """Conexiones en curso, maximo y rechazadas por falta de lugar."""
+        with self._lock:
+            return {
+                'en_uso': self._en_uso,
+                'maximo': self._maximo,
+                'rechazadas': self._rechazadas
+            }
@@ -7,16 +7,18 @@ from functools import wraps
 
 from flask import request, jsonify
 
+from app.servicios.condicional import respuesta_condicional
 from app.servicios.errors import error_response
 
 logger = logging.getLogger(__name__)
 
 
-def endpoint_termostato(termostato, campo_modelo, campo_request, validar=True):
+def endpoint_termostato(termostato, campo_modelo, campo_request, validar=True, cache=None):
     """Decorador para endpoints GET/POST del termostato.
 
     Centraliza la lógica común: validación de campo requerido,
-    actualización del modelo, manejo de ValueError y logging.
+    actualización del modelo, manejo de ValueError y logging. El GET
+    envía la versión del estado como ETag y responde 304 a If-None-Match.
 
     Args:
         termostato: Instancia del modelo Termostato
@@ -26,6 +28,7 @@ def endpoint_termostato(termostato, campo_modelo, campo_request, validar=True):
                        (ej: 'ambiente')
         validar: Si True, captura ValueError y retorna 400.
                  Si False, deja pasar la excepción.
+        cache: CacheRespuestas opcional; el GET sirve el cuerpo ya serializado.
     """
     def decorator(func):
         @wraps(func)
@@ -54,8 +57,16 @@ def endpoint_termostato(termostato, campo_modelo, campo_request, validar=True):
                 logger.info("POST %s -> 201", ruta)
                 return jsonify({'mensaje': 'dato registrado'}), 201
 
-            logger.info("GET %s -> 200", ruta)
-            return jsonify({campo_modelo: getattr(termostato, campo_modelo)})
+            if cache is not None:
+                version, generar = cache.respuesta(
+                    campo_modelo, lambda t: {campo_modelo: getattr(t, campo_modelo)}
+                )
+            else:
+                version = termostato.version
+                generar = lambda: jsonify({campo_modelo: getattr(termostato, campo_modelo)})
+            respuesta = respuesta_condicional(termostato.etiqueta(version), generar)
+            logger.info("GET %s -> %d", ruta, respuesta.status_code)
+            return respuesta
 
         return wrapper
     return decorator
@@ -0,0 +1,129 @@
+"""
+Difusion de los cambios del termostato a muchos suscriptores (fan-out).
+Alimenta el stream de Server-Sent Events.
+"""
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+from app.configuracion.config import Config
+from app.servicios.eventos import EventoTermostato
+
+# (tipo, datos, id) de cada evento difundido
+Mensaje = Tuple[str, dict, Optional[int]]
+
+
+class Suscripcion:
+    """Buffer acotado de los mensajes pendientes de un suscriptor."""
+
+    def __init__(self, difusor: 'Difusor', capacidad: int):
+        self._difusor = difusor
+        self._capacidad = capacidad
+        self._mensajes = deque()
+        self._condicion = threading.Condition()
+        self._cerrada = False
+
+    @property
+    def cerrada(self) -> bool:
+        """True si se cancelo o se descarto por no consumir a tiempo."""
+        return self._cerrada
+
+    def recibir(self, timeout: float = None) -> Optional[Mensaje]:
+        """Retorna el proximo mensaje, o None si vencio la espera o esta cerrada."""
+        with self._condicion:
+            self._condicion.wait_for(lambda: self._mensajes or self._cerrada, timeout)
+            if self._cerrada or not self._mensajes:
+                return None
+            return self._mensajes.popleft()
+
+    def cancelar(self) -> None:
+        """Deja de recibir mensajes."""
+        self._difusor.cancelar(self)
+
+    def _entregar(self, mensaje: Mensaje) -> bool:
+        """Agrega un mensaje; False si el buffer esta lleno."""
+        with self._condicion:
+            if len(self._mensajes) >= self._capacidad:
+                return False
+            self._mensajes.append(mensaje)
+            self._condicion.notify()
+            return True
+
+    def _cerrar(self) -> None:
+        """Descarta los pendientes y despierta al consumidor."""
+        with self._condicion:
+            self._cerrada = True
+            self._mensajes.clear()
+            self._condicion.notify_all()
+
+
+class Difusor:
+    """Reparte cada cambio del termostato a todos los suscriptores.
+
+    Un unico publicador (suscrito al bus de eventos del servicio) copia
+    cada mensaje al buffer de cada suscriptor, de capacidad `capacidad`.
+    Publicar nunca espera: un suscriptor con el buffer lleno se descarta
+    y su stream termina, en lugar de frenar a los demas o acumular
+    memoria. Los mensajes llevan solo los campos modificados.
+    """
+
+    def __init__(self, capacidad: int = None, max_suscriptores: int = None):
+        self._capacidad = max(1, capacidad or Config.STREAM_CAPACIDAD)
+        self._max_suscriptores = (Config.STREAM_MAX_SUSCRIPTORES if max_suscriptores is None
+                                  else max_suscriptores)
+        self._lock = threading.Lock()
+        self._suscripciones = set()
+        self._publicados = 0
+        self._descartados = 0
+
+    def suscribir(self) -> Optional[Suscripcion]:
+        """Crea una suscripcion, o retorna None si se alcanzo el maximo."""
+        with self._lock:
+            if len(self._suscripciones) >= self._max_suscriptores:
+                return None
+            suscripcion = Suscripcion(self, self._capacidad)
+            self._suscripciones.add(suscripcion)
+            return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion) -> None:
+        """Quita la suscripcion y termina su stream."""
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+        suscripcion._cerrar()
+
+    def publicar(self, tipo: str, datos: dict, identificador: Optional[int] = None) -> None:
+        """Entrega el mensaje a todos los suscriptores sin esperar a ninguno."""
+        mensaje = (tipo, datos, identificador)
+        with self._lock:
+            self._publicados += 1
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            if not suscripcion._entregar(mensaje):
+                with self._lock:
+                    self._descartados += 1
+                self.cancelar(suscripcion)
+
+    def publicar_evento(self, evento: EventoTermostato) -> None:
+        """Suscriptor del bus: difunde el cambio y la lectura de temperatura."""
+        if evento.cambio:
+            cambios = dict(evento.valores)
+            if 'carga_bateria' in cambios:
+                cambios['indicador'] = evento.indicador
+            self.publicar('cambio', {
+                'version': evento.modelo.version,
+                'cambios': cambios
+            }, evento.modelo.version)
+        if evento.lectura is not None:
+            self.publicar('lectura', {
+                'temperatura': evento.lectura,
+                'timestamp': evento.timestamp.isoformat()
+            })
+
+    def metricas(self) -> dict:
+        """Suscriptores activos, mensajes publicados y suscriptores descartados."""
+        with self._lock:
+            return {
+                'suscriptores': len(self._suscripciones),
+                'publicados': self._publicados,
+                'descartados': self._descartados
+            }
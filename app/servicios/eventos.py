@@ -0,0 +1,175 @@
+"""
+Bus de eventos de cambios del termostato.
+Desacopla los efectos secundarios (historial, persistencia) de la actualizacion.
+"""
+import atexit
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from app.configuracion.config import Config
+from app.general.termostato_modelo import TermostatoModelo
+
+logger = logging.getLogger(__name__)
+
+# Politicas ante una cola llena
+DESBORDE_BLOQUEAR = 'bloquear'
+DESBORDE_DESCARTAR = 'descartar'
+POLITICAS_DESBORDE = (DESBORDE_BLOQUEAR, DESBORDE_DESCARTAR)
+
+
+@dataclass(frozen=True)
+class EventoTermostato:
+    """Actualizacion aplicada al termostato.
+
+    `valores` son los campos modificados, `lectura` la temperatura
+    ambiente a registrar en el historial (aunque no haya cambiado),
+    `modelo` el estado inmutable resultante e `indicador` el calculado
+    para ese estado.
+    """
+    valores: Dict[str, Any]
+    lectura: Optional[int]
+    modelo: TermostatoModelo
+    indicador: str
+    timestamp: datetime
+
+    @property
+    def cambio(self) -> bool:
+        """Indica si el estado cambio (False para una lectura repetida)."""
+        return bool(self.valores)
+
+
+Suscriptor = Callable[[EventoTermostato], None]
+
+
+class BusEventos:
+    """Bus sincrono: entrega cada evento a los suscriptores en el hilo que publica."""
+
+    asincrono = False
+
+    def __init__(self):
+        self._suscriptores: List[Suscriptor] = []
+
+    def suscribir(self, suscriptor: Suscriptor) -> None:
+        """Agrega un suscriptor; recibe los eventos en orden de publicacion."""
+        self._suscriptores.append(suscriptor)
+
+    def publicar(self, evento: EventoTermostato) -> None:
+        """Entrega el evento a todos los suscriptores."""
+        for suscriptor in self._suscriptores:
+            suscriptor(evento)
+
+    def vaciar(self, timeout: float = None) -> bool:
+        """Espera a que se entreguen los eventos pendientes."""
+        return True
+
+    def cerrar(self) -> None:
+        """Entrega los pendientes y libera los recursos del bus."""
+
+    def metricas(self) -> dict:
+        """Contadores propios del bus."""
+        return {}
+
+
+class BusEventosAsincrono(BusEventos):
+    """Bus que entrega los eventos desde un hilo de fondo.
+
+    publicar() solo encola el evento en una cola acotada a `capacidad`;
+    un unico hilo lo entrega a los suscriptores, conservando el orden.
+    Con la cola llena, `desborde` decide:
+    - 'bloquear': quien publica espera a que haya lugar
+    - 'descartar': se descarta el evento mas antiguo de la cola
+    El error de un suscriptor se registra y no detiene la entrega. Los
+    pendientes se entregan al cerrar y en atexit.
+    """
+
+    asincrono = True
+
+    def __init__(self, capacidad: int = None, desborde: str = None):
+        super().__init__()
+        capacidad = Config.EVENTOS_CAPACIDAD if capacidad is None else int(capacidad)
+        if capacidad <= 0:
+            raise ValueError("capacidad debe ser mayor que 0")
+        self._desborde = (desborde or Config.EVENTOS_DESBORDE).lower()
+        if self._desborde not in POLITICAS_DESBORDE:
+            raise ValueError(f"Politica de desborde desconocida: '{self._desborde}'")
+        self._capacidad = capacidad
+        self._cola = deque()
+        self._condicion = threading.Condition()
+        self._en_curso = False
+        self._cerrado = False
+        self._descartados = 0
+        self._fallidos = 0
+        self._hilo = threading.Thread(target=self._ejecutar, name='bus-eventos', daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def publicar(self, evento: EventoTermostato) -> None:
+        """Encola el evento aplicando la politica de desborde."""
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El bus de eventos esta cerrado")
+            if len(self._cola) >= self._capacidad:
+                if self._desborde == DESBORDE_DESCARTAR:
+                    self._cola.popleft()
+                    self._descartados += 1
+                else:
+                    self._condicion.wait_for(
+                        lambda: len(self._cola) < self._capacidad or self._cerrado
+                    )
+                    if self._cerrado:
+                        raise RuntimeError("El bus de eventos esta cerrado")
+            self._cola.append(evento)
+            self._condicion.notify_all()
+
+    def vaciar(self, timeout: float = None) -> bool:
+        """Espera a que la cola quede vacia y sin entregas en curso."""
+        if threading.current_thread() is self._hilo:
+            return False
+        with self._condicion:
+            return self._condicion.wait_for(
+                lambda: not self._cola and not self._en_curso, timeout
+            )
+
+    def cerrar(self) -> None:
+        """Entrega los eventos pendientes y detiene el hilo de fondo."""
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+        if self._hilo.is_alive() and self._hilo is not threading.current_thread():
+            self._hilo.join()
+        atexit.unregister(self.cerrar)
+
+    def metricas(self) -> dict:
+        """Eventos pendientes, descartados por desborde y entregas fallidas."""
+        with self._condicion:
+            return {
+                'eventos_pendientes': len(self._cola) + (1 if self._en_curso else 0),
+                'eventos_descartados': self._descartados,
+                'eventos_fallidos': self._fallidos
+            }
+
+    def _ejecutar(self) -> None:
+        """Bucle del hilo de fondo: entrega eventos hasta que se cierre y vacie la cola."""
+        while True:
+            with self._condicion:
+                self._condicion.wait_for(lambda: self._cola or self._cerrado)
+                if not self._cola:
+                    return
+                evento = self._cola.popleft()
+                self._en_curso = True
+                self._condicion.notify_all()
+            for suscriptor in self._suscriptores:
+                try:
+                    suscriptor(evento)
+                except Exception:
+                    logger.exception("Fallo la entrega del evento de la version %s",
+                                     evento.modelo.version)
+                    with self._condicion:
+                        self._fallidos += 1
+            with self._condicion:
+                self._en_curso = False
+                self._condicion.notify_all()
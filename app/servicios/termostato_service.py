@@ -2,83 +2,296 @@
 Servicio de orquestación del termostato.
 Coordina validación, modelo, persistencia, historial y cálculo de indicadores.
 """
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from dataclasses import replace
 from datetime import datetime
+from typing import Optional
 
+from app.datos.persistidor import TermostatoPersistidor
 from app.datos.registro import RegistroTemperatura
 from app.general.calculadores import IndicadorCalculator
 from app.general.termostato_modelo import TermostatoModelo
 from app.general.validators import TermostatoValidator
+from app.servicios.eventos import BusEventos, EventoTermostato
+
+# Intervalo de consulta del archivo compartido al esperar un cambio
+_SONDEO_COMPARTIDO = 0.25
+
+# Metodo del validador que corresponde a cada campo del modelo
+_VALIDACIONES = {
+    'temperatura_ambiente': 'validar_temperatura_ambiente',
+    'temperatura_deseada': 'validar_temperatura_deseada',
+    'carga_bateria': 'validar_carga_bateria',
+    'estado_climatizador': 'validar_estado_climatizador',
+}
 
 
 class TermostatoService:
-    """Orquesta las operaciones del termostato delegando a componentes especializados."""
+    """Orquesta las operaciones del termostato delegando a componentes especializados.
+
+    Una actualizacion con el mismo valor que el actual no modifica el
+    estado: no se persiste y, si `registrar_repetidas` es False, tampoco
+    se registra en el historial. metricas() cuenta las escrituras evitadas.
+
+    El modelo es inmutable: cada cambio construye uno nuevo con la version
+    siguiente y reemplaza la referencia. Las actualizaciones se serializan
+    con un RLock; las lecturas (modelo, snapshot) no lo toman, leen la
+    referencia vigente y nunca esperan a un escritor ni mezclan valores de
+    dos versiones. Si el persistidor es compartido entre procesos
+    (version() no es None), el modelo se recarga cuando otro proceso
+    guardo una version distinta, y cada actualizacion se hace ademas
+    dentro de persistidor.bloqueo(); en ese caso la version del modelo es
+    la del archivo compartido. Las lecturas consultan esa version sin
+    bloqueo y solo toman el RLock para recargar un modelo que cambio.
+
+    Cada actualizacion publica un EventoTermostato en `bus`; el historial
+    y la persistencia son suscriptores. Con el bus sincrono por defecto se
+    ejecutan dentro de la actualizacion; con un BusEventosAsincrono la
+    actualizacion solo valida y reemplaza el modelo, y un evento cuyo
+    modelo ya fue superado no se persiste (lo hara el evento siguiente).
+    El persistidor compartido requiere el bus sincrono.
+    """
 
     def __init__(self, modelo: TermostatoModelo, validator: TermostatoValidator,
                  indicador_calc: IndicadorCalculator, persistidor=None,
-                 historial_repositorio=None):
+                 historial_repositorio=None, registrar_repetidas: bool = True,
+                 bus: BusEventos = None):
         self._modelo = modelo
         self._validator = validator
         self._indicador_calc = indicador_calc
         self._persistidor = persistidor
         self._historial_repositorio = historial_repositorio
+        self._registrar_repetidas = registrar_repetidas
+        self._actualizaciones = 0
+        self._escrituras = 0
+        self._escrituras_evitadas = 0
+        self._historial_evitados = 0
+        self._lock = threading.RLock()
+        # Despierta a quienes esperan una version nueva (esperar_cambio)
+        self._cambio = threading.Condition(self._lock)
+        # Persistidor compartido entre procesos y su version reflejada en el modelo
+        self._compartido = (isinstance(persistidor, TermostatoPersistidor)
+                            and persistidor.version() is not None)
+        self._version_persistida = None
+        # Origen de las etiquetas: las versiones locales se reinician con el proceso
+        self._origen = 'compartido' if self._compartido else uuid.uuid4().hex[:12]
+        self._bus = bus or BusEventos()
+        if self._compartido and self._bus.asincrono:
+            raise ValueError("El persistidor compartido requiere un bus de eventos sincrono")
+        self._bus.suscribir(self._registrar_evento)
+        self._bus.suscribir(self._persistir_evento)
 
     def actualizar_temperatura_ambiente(self, valor) -> None:
         """Valida, actualiza, persiste y registra en historial."""
-        self._modelo.temperatura_ambiente = self._validator.validar_temperatura_ambiente(valor)
-        self._registrar_en_historial(self._modelo.temperatura_ambiente)
-        self._guardar_estado()
+        self.actualizar({'temperatura_ambiente': valor})
 
     def actualizar_temperatura_deseada(self, valor) -> None:
         """Valida, actualiza y persiste."""
-        self._modelo.temperatura_deseada = self._validator.validar_temperatura_deseada(valor)
-        self._guardar_estado()
+        self.actualizar({'temperatura_deseada': valor})
 
     def actualizar_carga_bateria(self, valor) -> None:
         """Valida, actualiza y persiste."""
-        self._modelo.carga_bateria = self._validator.validar_carga_bateria(valor)
-        self._guardar_estado()
+        self.actualizar({'carga_bateria': valor})
 
     def actualizar_estado_climatizador(self, valor) -> None:
         """Valida, actualiza y persiste."""
-        self._modelo.estado_climatizador = self._validator.validar_estado_climatizador(valor)
-        self._guardar_estado()
+        self.actualizar({'estado_climatizador': valor})
+
+    def actualizar(self, valores: dict) -> None:
+        """Valida todos los campos y los aplica juntos, o ninguno si alguno es invalido.
+
+        Los cambios producen una sola version nueva del modelo, un solo
+        guardado y, si incluye la temperatura ambiente, un solo registro
+        en el historial.
+        """
+        if not valores:
+            raise ValueError("Se requiere al menos un campo")
+        validados = {}
+        for campo, valor in valores.items():
+            if campo not in _VALIDACIONES:
+                raise ValueError(f"Campo desconocido: '{campo}'")
+            validados[campo] = getattr(self._validator, _VALIDACIONES[campo])(valor)
+        with self._bloqueo():
+            self._sincronizar()
+            self._actualizaciones += 1
+            cambios = {campo: valor for campo, valor in validados.items()
+                       if getattr(self._modelo, campo) != valor}
+            lectura = validados.get('temperatura_ambiente')
+            repetida = lectura is not None and 'temperatura_ambiente' not in cambios
+            if repetida and not self._registrar_repetidas:
+                # Lectura repetida que no se registra en el historial
+                lectura = None
+                if self._historial_repositorio:
+                    self._historial_evitados += 1
+            if cambios:
+                self._reemplazar(replace(self._modelo, **cambios, version=self._modelo.version + 1))
+            elif self._persistidor:
+                self._escrituras_evitadas += 1
+            if cambios or lectura is not None:
+                self._publicar(cambios, lectura)
+
+    def snapshot(self) -> dict:
+        """Retorna todo el estado, el indicador y la version de un mismo modelo."""
+        modelo = self.modelo
+        return {
+            'temperatura_ambiente': modelo.temperatura_ambiente,
+            'temperatura_deseada': modelo.temperatura_deseada,
+            'carga_bateria': modelo.carga_bateria,
+            'estado_climatizador': modelo.estado_climatizador,
+            'indicador': self._indicador_calc.calcular(modelo.carga_bateria),
+            'version': modelo.version
+        }
+
+    @property
+    def version(self) -> int:
+        """Version del estado; crece con cada cambio aplicado."""
+        return self.modelo.version
+
+    def esperar_cambio(self, version: int, timeout: float) -> Optional[dict]:
+        """Espera hasta `timeout` segundos a que la version difiera de `version`.
+
+        Retorna el snapshot de la version nueva, o None si no cambio. Una
+        version distinta de la vigente (mayor, por ejemplo tras un
+        reinicio) retorna de inmediato. Los cambios de este proceso
+        despiertan a los que esperan; con persistidor compartido, los de
+        otros workers se detectan consultando el archivo cada
+        _SONDEO_COMPARTIDO segundos.
+        """
+        limite = time.monotonic() + max(0.0, timeout)
+        with self._cambio:
+            while True:
+                self._sincronizar()
+                if self._modelo.version != version:
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return None
+                self._cambio.wait(min(restante, _SONDEO_COMPARTIDO) if self._compartido
+                                  else restante)
+        return self.snapshot()
+
+    def etiqueta(self, version: int) -> str:
+        """Etiqueta de entidad (ETag) del estado en `version`.
+
+        Con persistidor compartido la version es el contador del archivo,
+        igual en todos los workers; si no, se antepone un origen aleatorio
+        de esta instancia para no repetir etiquetas tras un reinicio.
+        """
+        return f'{self._origen}-{version}'
+
+    def metricas(self) -> dict:
+        """Retorna los contadores de actualizaciones, escrituras evitadas y del bus."""
+        with self._lock:
+            return {
+                'actualizaciones': self._actualizaciones,
+                'escrituras': self._escrituras,
+                'escrituras_evitadas': self._escrituras_evitadas,
+                'historial_evitados': self._historial_evitados,
+                **self._bus.metricas()
+            }
+
+    def suscribir(self, suscriptor) -> None:
+        """Agrega un suscriptor a los eventos de actualizacion (EventoTermostato)."""
+        self._bus.suscribir(suscriptor)
+
+    def vaciar_eventos(self, timeout: float = None) -> bool:
+        """Espera a que el historial y la persistencia reflejen las actualizaciones."""
+        return self._bus.vaciar(timeout)
 
     def obtener_indicador(self) -> str:
         """Calcula el indicador basado en la carga de batería actual."""
-        return self._indicador_calc.calcular(self._modelo.carga_bateria)
+        return self._indicador_calc.calcular(self.modelo.carga_bateria)
 
     def cargar_estado(self) -> None:
         """Carga el estado desde el persistidor si existe."""
-        if self._persistidor and self._persistidor.existe():
-            datos = self._persistidor.cargar()
-            if datos:
-                self._modelo.temperatura_ambiente = datos.get('temperatura_ambiente', 20)
-                self._modelo.temperatura_deseada = datos.get('temperatura_deseada', 24)
-                self._modelo.carga_bateria = datos.get('carga_bateria', 5.0)
-                self._modelo.estado_climatizador = datos.get('estado_climatizador', 'apagado')
+        if not self._persistidor:
+            return
+        # La version se lee antes que el estado: si otro proceso guarda
+        # entretanto, el modelo queda con una version vieja y se recarga
+        with self._lock:
+            if self._compartido:
+                self._version_persistida = self._persistidor.version()
+            if self._persistidor.existe():
+                datos = self._persistidor.cargar()
+                if datos:
+                    self._reemplazar(replace(
+                        self._modelo,
+                        temperatura_ambiente=datos.get('temperatura_ambiente', 20),
+                        temperatura_deseada=datos.get('temperatura_deseada', 24),
+                        carga_bateria=datos.get('carga_bateria', 5.0),
+                        estado_climatizador=datos.get('estado_climatizador', 'apagado'),
+                        version=(self._version_persistida if self._compartido
+                                 else self._modelo.version + 1)
+                    ))
 
     @property
     def modelo(self) -> TermostatoModelo:
-        """Retorna el modelo de datos actual."""
+        """Retorna el modelo vigente sin esperar a las actualizaciones en curso."""
+        if self._compartido and self._persistidor.version() != self._version_persistida:
+            with self._lock:
+                self._sincronizar()
         return self._modelo
 
-    def _guardar_estado(self) -> None:
-        """Persiste el estado actual si hay persistidor configurado."""
+    @contextmanager
+    def _bloqueo(self):
+        """Seccion critica de una actualizacion (entre hilos y, si es compartido, entre procesos)."""
+        with self._lock:
+            with self._persistidor.bloqueo() if self._compartido else nullcontext():
+                yield
+
+    def _sincronizar(self) -> None:
+        """Recarga el modelo si otro proceso guardo una version distinta. Requiere el lock."""
+        if self._compartido and self._persistidor.version() != self._version_persistida:
+            self.cargar_estado()
+
+    def _reemplazar(self, modelo: TermostatoModelo) -> None:
+        """Publica un modelo nuevo y despierta a los que esperan. Requiere el lock."""
+        self._modelo = modelo
+        self._cambio.notify_all()
+
+    def _publicar(self, cambios: dict, lectura: Optional[int]) -> None:
+        """Publica la actualizacion aplicada. Requiere el lock (orden de versiones)."""
+        self._bus.publicar(EventoTermostato(
+            valores=cambios,
+            lectura=lectura,
+            modelo=self._modelo,
+            indicador=self._indicador_calc.calcular(self._modelo.carga_bateria),
+            timestamp=datetime.now()
+        ))
+
+    def _persistir_evento(self, evento: EventoTermostato) -> None:
+        """Suscriptor: persiste el estado de un cambio si no fue superado."""
+        if evento.cambio and evento.modelo.version >= self._modelo.version:
+            self._guardar_estado(evento.modelo, evento.indicador)
+
+    def _registrar_evento(self, evento: EventoTermostato) -> None:
+        """Suscriptor: registra las lecturas de temperatura ambiente."""
+        if evento.lectura is not None:
+            self._registrar_en_historial(evento.lectura, evento.timestamp)
+
+    def _guardar_estado(self, modelo: TermostatoModelo, indicador: str) -> None:
+        """Persiste el estado del modelo si hay persistidor configurado."""
         if self._persistidor:
+            self._escrituras += 1
             datos = {
-                'temperatura_ambiente': self._modelo.temperatura_ambiente,
-                'temperatura_deseada': self._modelo.temperatura_deseada,
-                'carga_bateria': self._modelo.carga_bateria,
-                'estado_climatizador': self._modelo.estado_climatizador,
-                'indicador': self.obtener_indicador()
+                'temperatura_ambiente': modelo.temperatura_ambiente,
+                'temperatura_deseada': modelo.temperatura_deseada,
+                'carga_bateria': modelo.carga_bateria,
+                'estado_climatizador': modelo.estado_climatizador,
+                'indicador': indicador
             }
             self._persistidor.guardar(datos)
+            if self._compartido:
+                self._version_persistida = self._persistidor.version()
 
-    def _registrar_en_historial(self, temperatura: int) -> None:
+    def _registrar_en_historial(self, temperatura: int, timestamp: datetime) -> None:
         """Registra la temperatura en el historial si hay repositorio configurado."""
         if self._historial_repositorio:
             registro = RegistroTemperatura(
                 temperatura=temperatura,
-                timestamp=datetime.now()
+                timestamp=timestamp
             )
             self._historial_repositorio.agregar(registro)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria de los repositorios de historial en memoria.
+
+Compara HistorialRepositorioMemoria (un RegistroTemperatura + datetime por
+lectura) con HistorialRepositorioCompacto (arrays tipados por columna).
+
+Uso:
+    python quality/benchmarks/benchmark_historial_memoria.py [lecturas]
+"""
+
+import gc
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.datos import (  # noqa: E402
+    HistorialRepositorioCompacto,
+    HistorialRepositorioMemoria,
+    RegistroTemperatura,
+)
+
+
+def medir(clase, lecturas):
+    """Carga `lecturas` registros y retorna (bytes retenidos, segundos)."""
+    gc.collect()
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    repo = clase(capacidad=lecturas)
+    base = datetime(2026, 1, 1)
+    for i in range(lecturas):
+        repo.agregar(RegistroTemperatura(
+            temperatura=20 + i % 10,
+            timestamp=base + timedelta(seconds=i)
+        ))
+    segundos = time.perf_counter() - inicio
+    gc.collect()
+    retenidos, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert repo.cantidad() == lecturas
+    return retenidos, segundos
+
+
+if __name__ == "__main__":
+    lecturas = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    print(f"Lecturas: {lecturas:,}")
+    resultados = {}
+    for clase in (HistorialRepositorioMemoria, HistorialRepositorioCompacto):
+        retenidos, segundos = medir(clase, lecturas)
+        resultados[clase.__name__] = retenidos
+        print(f"  {clase.__name__:32} {retenidos / 2**20:9.1f} MiB "
+              f"({retenidos / lecturas:6.1f} B/lectura) en {segundos:.2f}s")
+
+    ratio = resultados['HistorialRepositorioMemoria'] / resultados['HistorialRepositorioCompacto']
+    print(f"  Reduccion: {ratio:.1f}x")
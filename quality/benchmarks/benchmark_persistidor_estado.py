@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de los persistidores de estado del termostato.
+
+Compara TermostatoPersistidorJSON (JSON indentado, reescritura completa)
+con TermostatoPersistidorBinario (registro fijo actualizado via mmap).
+Se mide el costo por guardar() y por cargar() en un directorio temporal.
+
+Uso:
+    python quality/benchmarks/benchmark_persistidor_estado.py [operaciones]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.datos import (  # noqa: E402
+    TermostatoPersistidorBinario,
+    TermostatoPersistidorJSON,
+)
+
+ESTADO = {
+    'temperatura_ambiente': 22,
+    'temperatura_deseada': 24,
+    'carga_bateria': 3.75,
+    'estado_climatizador': 'enfriando',
+    'indicador': 'NORMAL'
+}
+
+
+def medir(persistidor, operaciones):
+    """Retorna (microsegundos por guardar, microsegundos por cargar)."""
+    inicio = time.perf_counter()
+    for i in range(operaciones):
+        persistidor.guardar({**ESTADO, 'temperatura_ambiente': i % 50})
+    guardar = (time.perf_counter() - inicio) / operaciones
+    inicio = time.perf_counter()
+    for _ in range(operaciones):
+        persistidor.cargar()
+    cargar = (time.perf_counter() - inicio) / operaciones
+    return guardar * 1e6, cargar * 1e6
+
+
+if __name__ == "__main__":
+    operaciones = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+
+    print(f"Operaciones: {operaciones:,}")
+    with tempfile.TemporaryDirectory() as directorio:
+        persistidores = (
+            TermostatoPersistidorJSON(os.path.join(directorio, "estado.json")),
+            TermostatoPersistidorBinario(os.path.join(directorio, "estado.bin")),
+        )
+        resultados = {}
+        for persistidor in persistidores:
+            guardar, cargar = medir(persistidor, operaciones)
+            resultados[type(persistidor).__name__] = (guardar, cargar)
+            print(f"  {type(persistidor).__name__:30} guardar {guardar:8.2f} us   "
+                  f"cargar {cargar:8.2f} us")
+        persistidores[1].cerrar()
+
+    json_guardar, json_cargar = resultados['TermostatoPersistidorJSON']
+    bin_guardar, bin_cargar = resultados['TermostatoPersistidorBinario']
+    print(f"  Aceleracion: guardar {json_guardar / bin_guardar:.1f}x, "
+          f"cargar {json_cargar / bin_cargar:.1f}x")
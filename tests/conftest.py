@@ -1,12 +1,34 @@
 """
 Fixtures compartidos para los tests de la API del termostato.
 Usa Application Factory Pattern para inyección de dependencias.
+Incluye helpers para armar registros de historial y paginar repositorios.
 """
+from datetime import datetime, timedelta
+
 import pytest
 from unittest.mock import MagicMock
 
 from app.servicios.api import create_app
 from app.configuracion.factory import TermostatoFactory
+from app.datos import CursorHistorial, RegistroTemperatura
+
+BASE = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def registro(i):
+    """Registro con temperatura `i` tomado `i` segundos despues de BASE."""
+    return RegistroTemperatura(temperatura=i, timestamp=BASE + timedelta(seconds=i))
+
+
+def paginar(repo, limite):
+    """Recorre el repositorio de a paginas usando el ultimo registro como cursor."""
+    paginas, cursor = [], None
+    while True:
+        pagina = list(repo.iterar(limite=limite, antes_de=cursor))
+        if not pagina:
+            return paginas
+        paginas.append([r.temperatura for r in pagina])
+        cursor = CursorHistorial(pagina[-1].timestamp, pagina[-1].secuencia)
 
 
 @pytest.fixture
@@ -0,0 +1,58 @@
+"""
+Tests unitarios para la agregacion del historial por intervalos.
+"""
+from datetime import timedelta
+
+import pytest
+
+from app.datos import RegistroTemperatura
+from app.datos.agregacion import parsear_intervalo, resumir_por_intervalo
+from tests.conftest import BASE
+
+
+def _registros(temperaturas, paso_segundos=60):
+    """Registros del mas reciente al mas antiguo."""
+    registros = [
+        RegistroTemperatura(temperatura=t, timestamp=BASE + timedelta(seconds=i * paso_segundos))
+        for i, t in enumerate(temperaturas)
+    ]
+    return list(reversed(registros))
+
+
+class TestParsearIntervalo:
+    """Tests para parsear_intervalo()."""
+
+    @pytest.mark.parametrize("texto,segundos", [
+        ("30s", 30), ("5m", 300), ("1h", 3600), ("2d", 172800), (" 5M ", 300)
+    ])
+    def test_intervalos_validos(self, texto, segundos):
+        """Convierte las unidades soportadas a segundos."""
+        assert parsear_intervalo(texto) == segundos
+
+    @pytest.mark.parametrize("texto", ["", "5", "0m", "-5m", "5x", "m5", None])
+    def test_intervalos_invalidos(self, texto):
+        """Formatos no soportados lanzan ValueError."""
+        with pytest.raises(ValueError):
+            parsear_intervalo(texto)
+
+
+class TestResumirPorIntervalo:
+    """Tests para resumir_por_intervalo()."""
+
+    def test_calcula_min_max_media_cantidad(self):
+        """Cada intervalo resume las lecturas que contiene."""
+        intervalos = resumir_por_intervalo(_registros([20, 22, 24, 30, 10]), 180, 100)
+        assert intervalos == [
+            {'inicio': '2026-01-01T12:03:00', 'minimo': 10, 'maximo': 30, 'media': 20.0, 'cantidad': 2},
+            {'inicio': '2026-01-01T12:00:00', 'minimo': 20, 'maximo': 24, 'media': 22.0, 'cantidad': 3},
+        ]
+
+    def test_corta_en_max_intervalos(self):
+        """Solo retorna los intervalos mas recientes hasta el maximo."""
+        intervalos = resumir_por_intervalo(_registros(range(100)), 60, 5)
+        assert len(intervalos) == 5
+        assert intervalos[0]['minimo'] == 99
+
+    def test_sin_registros(self):
+        """Sin registros retorna lista vacia."""
+        assert resumir_por_intervalo([], 60, 10) == []
@@ -2,8 +2,14 @@
 Tests de integracion para la API REST del termostato.
 TER-13: Tests de integracion de API
 """
+import json
+from datetime import datetime, timedelta
+
 import pytest
 
+from app.datos import HistorialRepositorioMemoria, RegistroTemperatura
+from app.servicios.api import create_app
+
 
 class TestHealthCheck:
     """Tests para el endpoint de health check."""
@@ -38,6 +44,12 @@ class TestTermostatoEndpoint:
         assert 'estado_climatizador' in data
         assert 'indicador' in data
 
+    def test_get_termostato_incluye_version(self, client):
+        """La version del estado crece con cada cambio aplicado."""
+        version = client.get('/termostato/').get_json()['version']
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 18})
+        assert client.get('/termostato/').get_json()['version'] == version + 1
+
 
 class TestTemperaturaAmbiente:
     """Tests para el endpoint /termostato/temperatura_ambiente/."""
@@ -267,6 +279,344 @@ class TestHistorial:
         data = response.get_json()
         assert len(data['historial']) <= 5
 
+    def test_get_historial_con_rango(self):
+        """Verifica que desde/hasta filtran por timestamp."""
+        repo = HistorialRepositorioMemoria(capacidad=10)
+        base = datetime(2026, 1, 1, 10, 0, 0)
+        for i in range(6):
+            repo.agregar(RegistroTemperatura(temperatura=20 + i, timestamp=base + timedelta(hours=i)))
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        with app.test_client() as c:
+            response = c.get('/termostato/historial/?desde=2026-01-01T11:00:00&hasta=2026-01-01T13:00:00')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert [r['temperatura'] for r in data['historial']] == [23, 22, 21]
+        assert data['total'] == 6
+
+    def test_get_historial_agregado(self):
+        """Verifica que el endpoint agregado resume por intervalo."""
+        repo = HistorialRepositorioMemoria(capacidad=100)
+        base = datetime(2026, 1, 1, 10, 0, 0)
+        for i in range(60):
+            repo.agregar(RegistroTemperatura(temperatura=20 + i % 3, timestamp=base + timedelta(minutes=i)))
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        with app.test_client() as c:
+            response = c.get('/termostato/historial/agregado/?bucket=15m')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['bucket'] == '15m'
+        assert len(data['intervalos']) == 4
+        assert sum(i['cantidad'] for i in data['intervalos']) == 60
+        assert data['intervalos'][0]['inicio'] == '2026-01-01T10:45:00'
+
+    def test_get_historial_agregado_bucket_invalido(self, client):
+        """Verifica que un bucket invalido retorna 400."""
+        response = client.get('/termostato/historial/agregado/?bucket=5 minutos')
+        assert response.status_code == 400
+
+    def test_get_historial_estadisticas(self):
+        """Verifica que las estadisticas reflejan el historial."""
+        repo = HistorialRepositorioMemoria(capacidad=10)
+        for i, temperatura in enumerate([20, 22, 24]):
+            repo.agregar(RegistroTemperatura(temperatura=temperatura, timestamp=datetime(2026, 1, 1, 10, i)))
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        with app.test_client() as c:
+            response = c.get('/termostato/historial/estadisticas/')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['cantidad'] == 3
+        assert data['media'] == 22.0
+        assert data['minimo'] == 20
+        assert data['maximo'] == 24
+
+    @pytest.mark.parametrize("url,headers", [
+        ('/termostato/historial/?formato=ndjson', {}),
+        ('/termostato/historial/', {'Accept': 'application/x-ndjson'}),
+    ])
+    def test_get_historial_ndjson(self, url, headers):
+        """Verifica que el historial se transmite como NDJSON."""
+        repo = HistorialRepositorioMemoria(capacidad=2000)
+        base = datetime(2026, 1, 1, 10, 0, 0)
+        for i in range(1200):
+            repo.agregar(RegistroTemperatura(temperatura=i % 50, timestamp=base + timedelta(seconds=i)))
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        with app.test_client() as c:
+            response = c.get(url, headers=headers)
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert response.headers['X-Total-Count'] == '1200'
+        lineas = response.get_data(as_text=True).splitlines()
+        assert len(lineas) == 1200
+        assert json.loads(lineas[0]) == {'temperatura': 1199 % 50, 'timestamp': '2026-01-01T10:19:59'}
+
+    def test_get_historial_paginado_con_cursor(self):
+        """Verifica que siguiente permite recorrer el historial por paginas."""
+        repo = HistorialRepositorioMemoria(capacidad=10)
+        base = datetime(2026, 1, 1, 10, 0, 0)
+        for i in range(5):
+            repo.agregar(RegistroTemperatura(temperatura=20 + i, timestamp=base + timedelta(minutes=i)))
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        paginas = []
+        with app.test_client() as c:
+            url = '/termostato/historial/?limite=2'
+            while url:
+                data = c.get(url).get_json()
+                paginas.append([r['temperatura'] for r in data['historial']])
+                url = data['siguiente'] and f"/termostato/historial/?limite=2&cursor={data['siguiente']}"
+        assert paginas == [[24, 23], [22, 21], [20]]
+
+    def test_get_historial_sin_limite_pagina_con_default(self, monkeypatch):
+        """Sin limite se retorna una pagina de HISTORIAL_LIMITE_DEFAULT con cursor a la siguiente."""
+        monkeypatch.setattr('app.servicios.api.Config.HISTORIAL_LIMITE_DEFAULT', 2)
+        repo = HistorialRepositorioMemoria(capacidad=10)
+        base = datetime(2026, 1, 1, 10, 0, 0)
+        for i in range(3):
+            repo.agregar(RegistroTemperatura(temperatura=20 + i, timestamp=base + timedelta(minutes=i)))
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        with app.test_client() as c:
+            data = c.get('/termostato/historial/').get_json()
+            assert [r['temperatura'] for r in data['historial']] == [22, 21]
+            assert data['total'] == 3
+            data = c.get(f"/termostato/historial/?cursor={data['siguiente']}").get_json()
+            assert [r['temperatura'] for r in data['historial']] == [20]
+            assert data['siguiente'] is None
+
+    def test_get_historial_limite_acotado_al_maximo(self, monkeypatch):
+        """Un limite mayor a HISTORIAL_LIMITE_MAXIMO se recorta; NDJSON no se acota."""
+        monkeypatch.setattr('app.servicios.api.Config.HISTORIAL_LIMITE_MAXIMO', 2)
+        repo = HistorialRepositorioMemoria(capacidad=10)
+        for i in range(4):
+            repo.agregar(RegistroTemperatura(temperatura=20 + i, timestamp=datetime(2026, 1, 1, 10, i)))
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        with app.test_client() as c:
+            data = c.get('/termostato/historial/?limite=50').get_json()
+            assert len(data['historial']) == 2
+            assert data['siguiente'] is not None
+            ndjson = c.get('/termostato/historial/?formato=ndjson')
+            assert len(ndjson.get_data(as_text=True).splitlines()) == 4
+
+    def test_get_historial_pagina_exacta_sin_siguiente(self, client):
+        """Si la pagina trae justo los registros restantes no hay cursor siguiente."""
+        for temperatura in [20, 21]:
+            client.post('/termostato/temperatura_ambiente/', json={'ambiente': temperatura})
+        total = client.get('/termostato/historial/').get_json()['total']
+        data = client.get(f'/termostato/historial/?limite={total}').get_json()
+        assert len(data['historial']) == total
+        assert data['siguiente'] is None
+
+    def test_get_historial_con_cursor_invalido(self, client):
+        """Verifica que un cursor mal formado retorna 400."""
+        response = client.get('/termostato/historial/?cursor=no-es-un-cursor')
+        assert response.status_code == 400
+        assert response.get_json()['error']['mensaje'] == 'Parametro invalido'
+
+    def test_get_historial_con_fecha_invalida(self, client):
+        """Verifica que una fecha mal formada retorna 400."""
+        response = client.get('/termostato/historial/?desde=ayer')
+        assert response.status_code == 400
+        assert response.get_json()['error']['mensaje'] == 'Parametro invalido'
+
+
+class TestActualizacionMultiple:
+    """Tests para PATCH /termostato/."""
+
+    def test_patch_aplica_todos_los_campos(self, client):
+        """Un PATCH aplica varios campos y retorna el estado resultante."""
+        version = client.get('/termostato/').get_json()['version']
+        response = client.patch('/termostato/', json={
+            'ambiente': 27, 'deseada': 19, 'bateria': 2.0, 'climatizador': 'enfriando'
+        })
+        assert response.status_code == 200
+        data = response.get_json()
+        assert data['temperatura_ambiente'] == 27
+        assert data['temperatura_deseada'] == 19
+        assert data['carga_bateria'] == 2.0
+        assert data['estado_climatizador'] == 'enfriando'
+        assert data['indicador'] == 'CRITICO'
+        assert data['version'] == version + 1
+
+    def test_patch_persiste_una_vez(self, client):
+        """Todos los campos se guardan con una sola escritura."""
+        antes = client.get('/termostato/metricas/').get_json()['estado']
+        client.patch('/termostato/', json={'deseada': 17, 'climatizador': 'calentando'})
+        despues = client.get('/termostato/metricas/').get_json()['estado']
+        assert despues['escrituras'] == antes['escrituras'] + 1
+
+    def test_patch_con_valor_invalido_no_aplica_ninguno(self, client):
+        """Si un campo es invalido no se aplica ninguno."""
+        antes = client.get('/termostato/').get_json()
+        response = client.patch('/termostato/', json={'deseada': 18, 'bateria': 99})
+        assert response.status_code == 400
+        assert client.get('/termostato/').get_json() == antes
+
+    @pytest.mark.parametrize("cuerpo", [{}, {'desconocido': 1}, [1, 2]])
+    def test_patch_sin_campos_validos_retorna_400(self, client, cuerpo):
+        """Un cuerpo vacio o con campos desconocidos retorna 400."""
+        response = client.patch('/termostato/', json=cuerpo)
+        assert response.status_code == 400
+
+
+class TestCambios:
+    """Tests para el long polling de /termostato/cambios/."""
+
+    def test_sin_cambios_retorna_204(self, client):
+        """Si la version no cambia durante la espera se responde 204."""
+        version = client.get('/termostato/').get_json()['version']
+        response = client.get(f'/termostato/cambios/?version={version}&timeout=0.05')
+        assert response.status_code == 204
+
+    def test_version_anterior_retorna_el_estado(self, client):
+        """Con una version ya superada se responde el estado de inmediato."""
+        version = client.get('/termostato/').get_json()['version']
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 15})
+        response = client.get(f'/termostato/cambios/?version={version}&timeout=5')
+        assert response.status_code == 200
+        assert response.get_json()['temperatura_deseada'] == 15
+        assert response.get_json()['version'] == version + 1
+        assert 'ETag' in response.headers
+
+    def test_maximo_de_esperas_retorna_503(self, client, monkeypatch):
+        """Sin lugar para otra conexion larga se responde 503 sin esperar."""
+        monkeypatch.setattr('app.servicios.api.Config.CONEXIONES_LARGAS_MAX', 0)
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as cliente:
+            response = cliente.get('/termostato/cambios/?version=0&timeout=5')
+            assert response.status_code == 503
+            esperas = cliente.get('/termostato/metricas/').get_json()['esperas']
+            assert esperas['en_uso'] == 0
+
+    @pytest.mark.parametrize("query", ['', '?version=abc', '?version=1&timeout=-1',
+                                       '?version=1&timeout=abc', '?version=1&timeout=nan'])
+    def test_parametros_invalidos_retornan_400(self, client, query):
+        """version es obligatoria y timeout no puede ser negativo."""
+        assert client.get(f'/termostato/cambios/{query}').status_code == 400
+
+
+class TestStream:
+    """Tests para el stream SSE de /termostato/stream/."""
+
+    def test_envia_estado_inicial_y_cambios(self, client):
+        """El stream abre con el estado completo y luego difunde solo los cambios."""
+        response = client.get('/termostato/stream/')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert response.headers['Cache-Control'] == 'no-cache'
+        eventos = response.iter_encoded()
+        inicial = next(eventos)
+        assert inicial.startswith(b'event: estado\n')
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 17})
+        cambio = next(eventos).decode()
+        assert cambio.startswith('event: cambio\n')
+        datos = json.loads(cambio.split('data: ')[1])
+        assert datos['cambios'] == {'temperatura_deseada': 17}
+        response.close()
+        assert client.get('/termostato/metricas/').get_json()['stream']['suscriptores'] == 0
+
+    def test_maximo_de_suscriptores_retorna_503(self, client, monkeypatch):
+        """Sin lugar para otro suscriptor se responde 503."""
+        monkeypatch.setattr('app.servicios.difusor.Config.STREAM_MAX_SUSCRIPTORES', 0)
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as cliente:
+            assert cliente.get('/termostato/stream/').status_code == 503
+            assert cliente.get('/termostato/metricas/').get_json()['esperas']['en_uso'] == 0
+
+    def test_sin_lugar_para_conexiones_largas_retorna_503(self, client, monkeypatch):
+        """Con el cupo de conexiones largas completo el stream se rechaza."""
+        monkeypatch.setattr('app.servicios.api.Config.CONEXIONES_LARGAS_MAX', 0)
+        app = create_app()
+        app.config['TESTING'] = True
+        with app.test_client() as cliente:
+            assert cliente.get('/termostato/stream/').status_code == 503
+            metricas = cliente.get('/termostato/metricas/').get_json()
+            assert metricas['stream']['suscriptores'] == 0
+            assert metricas['esperas']['rechazadas'] == 1
+
+    def test_cerrar_sin_iterar_libera_la_conexion(self, client):
+        """Una respuesta cerrada antes de enviarse libera la suscripcion y su lugar en el cupo."""
+        response = client.get('/termostato/stream/')
+        assert client.get('/termostato/metricas/').get_json()['esperas']['en_uso'] == 1
+        response.close()
+        metricas = client.get('/termostato/metricas/').get_json()
+        assert metricas['esperas']['en_uso'] == 0
+        assert metricas['stream']['suscriptores'] == 0
+
+
+class TestGetCondicional:
+    """Tests de ETag / If-None-Match en los GET."""
+
+    @pytest.mark.parametrize("ruta", [
+        '/termostato/', '/termostato/temperatura_deseada/', '/termostato/indicador/'
+    ])
+    def test_etag_sin_cambios_retorna_304(self, client, ruta):
+        """Con el ETag vigente la respuesta es 304 sin cuerpo."""
+        etag = client.get(ruta).headers['ETag']
+        response = client.get(ruta, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+        assert response.headers['ETag'] == etag
+
+    def test_etag_cambia_con_el_estado(self, client):
+        """Tras un cambio, el ETag anterior obtiene la respuesta completa."""
+        etag = client.get('/termostato/').headers['ETag']
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 16})
+        response = client.get('/termostato/', headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.get_json()['temperatura_deseada'] == 16
+        assert response.headers['ETag'] != etag
+
+    def test_valor_repetido_conserva_el_etag(self, client):
+        """Un POST que no cambia el estado no invalida el ETag."""
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 16})
+        etag = client.get('/termostato/').headers['ETag']
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 16})
+        assert client.get('/termostato/', headers={'If-None-Match': etag}).status_code == 304
+
+    @pytest.mark.parametrize("ruta", [
+        '/termostato/historial/', '/termostato/historial/estadisticas/',
+        '/termostato/historial/agregado/'
+    ])
+    def test_historial_usa_la_version_del_repositorio(self, ruta):
+        """El ETag del historial cambia solo al agregar registros."""
+        repo = HistorialRepositorioMemoria(capacidad=10)
+        app = create_app(historial_repositorio=repo)
+        app.config['TESTING'] = True
+        with app.test_client() as client:
+            etag = client.get(ruta).headers['ETag']
+            assert client.get(ruta, headers={'If-None-Match': etag}).status_code == 304
+            repo.agregar(RegistroTemperatura(temperatura=21, timestamp=datetime.now()))
+            assert client.get(ruta, headers={'If-None-Match': etag}).status_code == 200
+
+
+class TestMetricas:
+    """Tests para el endpoint de metricas."""
+
+    def test_get_metricas_cuenta_escrituras_evitadas(self, client):
+        """Verifica que un POST con el valor actual se cuenta como escritura evitada."""
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 21})
+        antes = client.get('/termostato/metricas/').get_json()['estado']
+        client.post('/termostato/temperatura_deseada/', json={'deseada': 21})
+        despues = client.get('/termostato/metricas/').get_json()['estado']
+        assert despues['actualizaciones'] == antes['actualizaciones'] + 1
+        assert despues['escrituras_evitadas'] == antes['escrituras_evitadas'] + 1
+        assert despues['escrituras'] == antes['escrituras']
+
+    def test_get_metricas_reporta_la_cache(self, client):
+        """Lecturas repetidas del mismo estado cuentan como aciertos de la cache."""
+        client.get('/termostato/')
+        client.get('/termostato/')
+        cache = client.get('/termostato/metricas/').get_json()['cache']
+        assert cache['aciertos'] >= 1
+        assert 0 < cache['tasa_aciertos'] <= 1
+
 
 class TestErrores:
     """Tests para manejo de errores."""
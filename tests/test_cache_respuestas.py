@@ -0,0 +1,49 @@
+"""
+Tests unitarios para la cache de respuestas serializadas.
+"""
+import json
+from unittest.mock import MagicMock
+
+import pytest
+from flask import Flask
+
+from app.configuracion.factory import TermostatoFactory
+from app.servicios.cache_respuestas import CacheRespuestas
+
+
+@pytest.fixture
+def contexto():
+    with Flask(__name__).app_context():
+        yield
+
+
+@pytest.mark.usefixtures('contexto')
+class TestCacheRespuestas:
+    """Tests para la reutilizacion e invalidacion por version."""
+
+    def test_reutiliza_el_cuerpo_mientras_no_cambie_la_version(self):
+        """Con la misma version el cuerpo no se vuelve a armar."""
+        termostato = TermostatoFactory.crear_termostato()
+        cache = CacheRespuestas(termostato)
+        extraer = MagicMock(side_effect=lambda t: {'indicador': t.indicador})
+        primera = cache.obtener('indicador', extraer)
+        segunda = cache.obtener('indicador', extraer)
+        assert segunda is primera
+        assert json.loads(primera[1]) == {'indicador': termostato.indicador}
+        extraer.assert_called_once()
+        assert cache.metricas() == {'aciertos': 1, 'fallos': 1, 'tasa_aciertos': 0.5}
+
+    def test_un_cambio_invalida_las_entradas(self):
+        """Tras una actualizacion se reconstruye el cuerpo con la version nueva."""
+        termostato = TermostatoFactory.crear_termostato()
+        cache = CacheRespuestas(termostato)
+        version, _ = cache.obtener('termostato', lambda t: t.snapshot())
+        termostato.temperatura_deseada = 15 if termostato.temperatura_deseada != 15 else 16
+        nueva, cuerpo = cache.obtener('termostato', lambda t: t.snapshot())
+        assert nueva == version + 1
+        assert json.loads(cuerpo)['temperatura_deseada'] == termostato.temperatura_deseada
+        assert cache.metricas()['fallos'] == 2
+
+    def test_sin_lecturas_la_tasa_es_cero(self):
+        """Sin lecturas las metricas no dividen por cero."""
+        assert CacheRespuestas(MagicMock()).metricas()['tasa_aciertos'] == 0.0
@@ -0,0 +1,36 @@
+"""
+Tests unitarios para HistorialRepositorioCompacto (almacenamiento columnar).
+El contrato comun de los repositorios se prueba en test_repositorio.py.
+"""
+from datetime import datetime
+
+from app.datos import HistorialRepositorioCompacto
+from app.datos.registro import epoch_a_timestamp, timestamp_a_epoch
+from tests.conftest import registro
+
+
+class TestConversionEpoch:
+    """Tests para la conversion timestamp <-> microsegundos."""
+
+    def test_ida_y_vuelta_exacta(self):
+        """La conversion conserva los microsegundos."""
+        ts = datetime(2026, 3, 29, 2, 30, 15, 123456)
+        assert epoch_a_timestamp(timestamp_a_epoch(ts)) == ts
+
+
+class TestHistorialRepositorioCompacto:
+    """Tests para el repositorio columnar."""
+
+    def test_iterar_con_agregados_concurrentes_no_mezcla_lecturas(self, monkeypatch):
+        """Un registro sobrescrito durante el recorrido no se emite ni se mezcla con otro."""
+        monkeypatch.setattr('app.datos.compacto._BLOQUE_LECTURA', 2)
+        repo = HistorialRepositorioCompacto(capacidad=4)
+        for i in range(4):
+            repo.agregar(registro(i))
+        iterador = repo.iterar()
+        leidos = [next(iterador)]
+        repo.agregar(registro(4))
+        repo.agregar(registro(5))
+        leidos.extend(iterador)
+        assert [r.temperatura for r in leidos] == [3, 2]
+        assert all(r == registro(r.temperatura) for r in leidos)
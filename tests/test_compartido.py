@@ -0,0 +1,134 @@
+"""
+Tests unitarios para HistorialRepositorioCompartido.
+El contrato comun de los repositorios se prueba en test_repositorio.py.
+"""
+import multiprocessing
+import random
+from unittest.mock import patch
+
+import pytest
+
+from app.datos import HistorialRepositorioCompartido, RegistroTemperatura
+from app.datos.compartido import _DESPLAZAMIENTO_SECUENCIA, _SECUENCIA
+from tests.conftest import BASE, registro
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "historial.bin")
+
+
+@pytest.fixture
+def repo(ruta):
+    repositorio = HistorialRepositorioCompartido(ruta, capacidad=5)
+    yield repositorio
+    repositorio.cerrar()
+
+
+def _agregar_varios(ruta, desde, cantidad):
+    repositorio = HistorialRepositorioCompartido(ruta, capacidad=1000)
+    for i in range(desde, desde + cantidad):
+        repositorio.agregar(RegistroTemperatura(temperatura=i % 50, timestamp=BASE))
+    repositorio.cerrar()
+
+
+class TestHistorialRepositorioCompartido:
+    """Tests para el buffer circular compartido entre procesos."""
+
+    def test_instancias_comparten_registros(self, repo, ruta):
+        """Otra instancia sobre el mismo archivo ve los registros agregados."""
+        otro = HistorialRepositorioCompartido(ruta, capacidad=5)
+        repo.agregar(registro(1))
+        otro.agregar(registro(2))
+        assert [r.temperatura for r in repo.obtener()] == [2, 1]
+        assert otro.cantidad() == 2
+        otro.cerrar()
+
+    def test_limpiar(self, repo):
+        """limpiar() vacia el buffer para todas las instancias."""
+        for i in range(7):
+            repo.agregar(registro(i))
+        repo.limpiar()
+        assert repo.cantidad() == 0
+        assert repo.obtener() == []
+        assert repo.estadisticas()['media'] is None
+        repo.agregar(registro(9))
+        assert repo.obtener() == [registro(9)]
+        assert repo.estadisticas()['maximo'] == 9
+
+    def test_capacidad_distinta_lanza_error(self, repo, ruta):
+        """Un archivo existente con otra capacidad no se reinterpreta."""
+        with pytest.raises(ValueError):
+            HistorialRepositorioCompartido(ruta, capacidad=10)
+
+    def test_repara_escritura_interrumpida(self, repo):
+        """Un contador impar por un escritor caido no bloquea las lecturas."""
+        repo.agregar(registro(1))
+        _SECUENCIA.pack_into(repo._mapa, _DESPLAZAMIENTO_SECUENCIA, 3)
+        assert repo.obtener() == [registro(1)]
+        repo.agregar(registro(2))
+        assert repo.cantidad() == 2
+
+    def test_procesos_concurrentes(self, ruta):
+        """Los agregados de varios procesos quedan todos en el buffer."""
+        contexto = multiprocessing.get_context('fork')
+        procesos = [contexto.Process(target=_agregar_varios, args=(ruta, i * 100, 100))
+                    for i in range(3)]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        assert all(proceso.exitcode == 0 for proceso in procesos)
+        repositorio = HistorialRepositorioCompartido(ruta, capacidad=1000)
+        assert repositorio.cantidad() == 300
+        assert [r.secuencia for r in repositorio.obtener()] == list(range(299, -1, -1))
+        repositorio.cerrar()
+
+    def test_version_compartida_entre_instancias(self, repo, ruta):
+        """version() es la misma en todos los procesos y cambia con cada escritura."""
+        otro = HistorialRepositorioCompartido(ruta, capacidad=5)
+        inicial = repo.version()
+        otro.agregar(registro(0))
+        agregado = repo.version()
+        assert agregado == otro.version() != inicial
+        repo.limpiar()
+        assert otro.version() == repo.version() not in (inicial, agregado)
+        otro.cerrar()
+
+    def test_obtener_limitado_copia_solo_lo_pedido(self, repo):
+        """obtener(1) copia un unico registro, no todo el buffer."""
+        for i in range(8):
+            repo.agregar(registro(i))
+        with patch.object(HistorialRepositorioCompartido, '_copiar', autospec=True,
+                          side_effect=HistorialRepositorioCompartido._copiar) as copiar:
+            assert repo.obtener(1) == [registro(7)]
+        copiar.assert_called_once_with(repo, 7, 8)
+
+    def test_iterar_por_bloques_cruza_el_fin_del_buffer(self, repo):
+        """Los bloques copian tramos que dan la vuelta al buffer circular."""
+        for i in range(8):
+            repo.agregar(registro(i))
+        with patch('app.datos.compartido._BLOQUE_LECTURA', 2):
+            assert [r.temperatura for r in repo.iterar()] == [7, 6, 5, 4, 3]
+
+    def test_iterar_termina_si_se_sobrescribe(self, repo):
+        """Si los registros pendientes se sobrescriben, el recorrido termina."""
+        for i in range(5):
+            repo.agregar(registro(i))
+        with patch('app.datos.compartido._BLOQUE_LECTURA', 2):
+            registros = repo.iterar()
+            assert [next(registros).temperatura for _ in range(2)] == [4, 3]
+            for i in range(5, 8):
+                repo.agregar(registro(i))
+            assert list(registros) == []
+
+    def test_minimo_y_maximo_se_mantienen_con_desalojos(self, repo):
+        """El minimo y maximo de la cabecera coinciden con los registros retenidos."""
+        generador = random.Random(7)
+        retenidas = []
+        for _ in range(200):
+            temperatura = generador.randint(-10, 40)
+            repo.agregar(RegistroTemperatura(temperatura=temperatura, timestamp=BASE))
+            retenidas = (retenidas + [temperatura])[-5:]
+            estadisticas = repo.estadisticas()
+            assert (estadisticas['minimo'], estadisticas['maximo']) == (min(retenidas), max(retenidas))
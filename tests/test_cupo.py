@@ -0,0 +1,17 @@
+"""
+Tests unitarios para los cupos de conexiones largas.
+"""
+from app.servicios.cupo import CupoConexiones
+
+
+class TestCupoConexiones:
+    """Tests para el conteo de conexiones largas."""
+
+    def test_rechaza_al_completar_el_cupo(self):
+        """tomar() falla sin esperar cuando no hay lugar y lo vuelve a dar al liberar."""
+        cupo = CupoConexiones(2)
+        assert cupo.tomar() and cupo.tomar()
+        assert not cupo.tomar()
+        cupo.liberar()
+        assert cupo.tomar()
+        assert cupo.metricas() == {'en_uso': 2, 'maximo': 2, 'rechazadas': 1}
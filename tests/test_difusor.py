@@ -0,0 +1,82 @@
+"""
+Tests unitarios para el difusor del stream SSE.
+"""
+import threading
+from dataclasses import replace
+from datetime import datetime
+
+from app.general.termostato_modelo import TermostatoModelo
+from app.servicios.difusor import Difusor
+from app.servicios.eventos import EventoTermostato
+
+
+def _evento(valores, lectura=None, version=1):
+    return EventoTermostato(
+        valores=valores,
+        lectura=lectura,
+        modelo=replace(TermostatoModelo(), version=version),
+        indicador='BAJO',
+        timestamp=datetime.now()
+    )
+
+
+class TestDifusor:
+    """Tests para el reparto de mensajes a los suscriptores."""
+
+    def test_todos_los_suscriptores_reciben_el_mensaje(self):
+        """Cada mensaje publicado llega a cada suscripcion, en orden."""
+        difusor = Difusor(capacidad=10, max_suscriptores=10)
+        suscripciones = [difusor.suscribir() for _ in range(3)]
+        difusor.publicar('cambio', {'version': 1}, 1)
+        difusor.publicar('cambio', {'version': 2}, 2)
+        for suscripcion in suscripciones:
+            assert suscripcion.recibir(0) == ('cambio', {'version': 1}, 1)
+            assert suscripcion.recibir(0) == ('cambio', {'version': 2}, 2)
+            assert suscripcion.recibir(0) is None
+        assert difusor.metricas() == {'suscriptores': 3, 'publicados': 2, 'descartados': 0}
+
+    def test_suscriptor_lento_se_descarta(self):
+        """Con el buffer lleno el suscriptor se cierra sin afectar a los demas."""
+        difusor = Difusor(capacidad=2, max_suscriptores=10)
+        lento = difusor.suscribir()
+        rapido = difusor.suscribir()
+        for version in range(3):
+            difusor.publicar('cambio', {}, version)
+            assert rapido.recibir(0) is not None
+        assert lento.cerrada
+        assert lento.recibir(0) is None
+        assert not rapido.cerrada
+        assert difusor.metricas()['descartados'] == 1
+        assert difusor.metricas()['suscriptores'] == 1
+
+    def test_maximo_de_suscriptores(self):
+        """Al alcanzar el maximo suscribir() retorna None hasta que alguien cancele."""
+        difusor = Difusor(capacidad=10, max_suscriptores=1)
+        suscripcion = difusor.suscribir()
+        assert difusor.suscribir() is None
+        suscripcion.cancelar()
+        assert difusor.suscribir() is not None
+
+    def test_cancelar_despierta_al_consumidor(self):
+        """Un recibir() en espera retorna None al cancelar la suscripcion."""
+        difusor = Difusor(capacidad=10, max_suscriptores=10)
+        suscripcion = difusor.suscribir()
+        resultado = []
+        hilo = threading.Thread(target=lambda: resultado.append(suscripcion.recibir(5)))
+        hilo.start()
+        suscripcion.cancelar()
+        hilo.join(5)
+        assert resultado == [None]
+
+    def test_publicar_evento_envia_solo_los_cambios(self):
+        """Un evento se traduce en el delta de campos y la lectura registrada."""
+        difusor = Difusor(capacidad=10, max_suscriptores=10)
+        suscripcion = difusor.suscribir()
+        difusor.publicar_evento(_evento({'carga_bateria': 2.0}, version=4))
+        difusor.publicar_evento(_evento({}, lectura=22, version=4))
+        assert suscripcion.recibir(0) == (
+            'cambio', {'version': 4, 'cambios': {'carga_bateria': 2.0, 'indicador': 'BAJO'}}, 4
+        )
+        tipo, datos, identificador = suscripcion.recibir(0)
+        assert (tipo, datos['temperatura'], identificador) == ('lectura', 22, None)
+        assert suscripcion.recibir(0) is None
@@ -0,0 +1,97 @@
+"""
+Tests unitarios para HistorialRepositorioEscalonado.
+El contrato comun de los repositorios se prueba en test_repositorio.py.
+"""
+import os
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.datos import CursorHistorial, HistorialRepositorioEscalonado
+from app.datos.escalonado import _SegmentoFrio
+from tests.conftest import BASE, registro
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    return str(tmp_path / "frio")
+
+
+@pytest.fixture
+def repo(directorio):
+    repositorio = HistorialRepositorioEscalonado(directorio, capacidad_caliente=4, tamano_bloque=3)
+    for i in range(20):
+        repositorio.agregar(registro(i))
+    yield repositorio
+    repositorio.cerrar()
+
+
+class TestHistorialRepositorioEscalonado:
+    """Tests para el repositorio con nivel caliente y segmentos frios."""
+
+    def test_archiva_bloques_antiguos(self, repo, directorio):
+        """Los bloques que exceden el nivel caliente se comprimen en disco."""
+        assert len([n for n in os.listdir(directorio) if n.endswith('.seg')]) == 5
+        assert len(repo._timestamps) == 5
+        assert repo.cantidad() == 20
+
+    def test_obtener_reciente_no_lee_disco(self, repo):
+        """Las lecturas cubiertas por el nivel caliente no descomprimen segmentos."""
+        with patch.object(_SegmentoFrio, 'leer') as leer:
+            repo.obtener(5)
+        leer.assert_not_called()
+
+    def test_obtener_rango_descomprime_solo_segmentos_necesarios(self, repo):
+        """El indice de tiempo evita leer segmentos fuera del rango."""
+        original = _SegmentoFrio.leer
+        with patch.object(_SegmentoFrio, 'leer', autospec=True, side_effect=original) as leer:
+            registros = repo.obtener_rango(BASE + timedelta(seconds=4), BASE + timedelta(seconds=7))
+        assert [r.temperatura for r in registros] == [7, 6, 5, 4]
+        assert leer.call_count == 2
+
+    def test_caida_sin_cerrar_recupera_el_nivel_caliente(self, repo, directorio):
+        """Sin cerrar (caida del proceso) el diario restaura las lecturas recientes."""
+        repo._cerrar_diario()
+        reabierto = HistorialRepositorioEscalonado(directorio, capacidad_caliente=4, tamano_bloque=3)
+        assert reabierto.cantidad() == 20
+        assert [r.temperatura for r in reabierto.obtener()] == list(range(19, -1, -1))
+        assert reabierto.estadisticas()['cantidad'] == 20
+        reabierto.cerrar()
+
+    def test_diario_omite_registros_ya_archivados(self, directorio):
+        """Si la caida ocurre tras archivar y antes de reescribir el diario no hay duplicados."""
+        repositorio = HistorialRepositorioEscalonado(directorio, capacidad_caliente=4, tamano_bloque=3)
+        for i in range(6):
+            repositorio.agregar(registro(i))
+        with patch.object(HistorialRepositorioEscalonado, '_reescribir_diario'):
+            repositorio.agregar(registro(6))
+        repositorio._cerrar_diario()
+        reabierto = HistorialRepositorioEscalonado(directorio, capacidad_caliente=4, tamano_bloque=3)
+        assert [r.temperatura for r in reabierto.obtener()] == list(range(6, -1, -1))
+        reabierto.cerrar()
+
+    def test_estadisticas_al_reabrir_no_descomprimen(self, repo, directorio):
+        """Las estadisticas de los segmentos frios salen de sus cabeceras."""
+        repo.cerrar()
+        with patch.object(_SegmentoFrio, 'leer') as leer:
+            reabierto = HistorialRepositorioEscalonado(directorio, capacidad_caliente=4,
+                                                       tamano_bloque=3)
+        leer.assert_not_called()
+        assert reabierto.estadisticas()['desviacion_estandar'] == 5.77
+        reabierto.cerrar()
+
+    def test_cursor_omite_segmentos_posteriores(self, repo):
+        """Un cursor en el nivel frio no descomprime segmentos mas recientes."""
+        cursor = CursorHistorial(BASE + timedelta(seconds=5), 5)
+        original = _SegmentoFrio.leer
+        with patch.object(_SegmentoFrio, 'leer', autospec=True, side_effect=original) as leer:
+            registros = list(repo.iterar(limite=2, antes_de=cursor))
+        assert [r.temperatura for r in registros] == [4, 3]
+        assert leer.call_count == 1
+
+    def test_limpiar(self, repo, directorio):
+        """limpiar() elimina ambos niveles."""
+        repo.limpiar()
+        assert repo.cantidad() == 0
+        assert os.listdir(directorio) == []
@@ -0,0 +1,64 @@
+"""
+Tests unitarios para EstadisticasTemperatura.
+"""
+import random
+import statistics
+
+import pytest
+
+from app.datos.estadisticas import EstadisticasTemperatura
+
+
+class TestEstadisticasTemperatura:
+    """Tests para las estadisticas incrementales."""
+
+    def test_sin_valores(self):
+        """Sin valores la media, desviacion y extremos son None."""
+        resumen = EstadisticasTemperatura().resumen()
+        assert resumen['cantidad'] == 0
+        assert resumen['media'] is None
+        assert resumen['minimo'] is None
+
+    def test_coincide_con_calculo_directo(self):
+        """Los valores incrementales coinciden con el calculo sobre la lista."""
+        valores = [random.randint(0, 50) for _ in range(500)]
+        estadisticas = EstadisticasTemperatura()
+        for valor in valores:
+            estadisticas.agregar(valor)
+        resumen = estadisticas.resumen()
+        assert resumen['cantidad'] == 500
+        assert resumen['media'] == round(statistics.fmean(valores), 2)
+        assert resumen['desviacion_estandar'] == round(statistics.pstdev(valores), 2)
+        assert resumen['minimo'] == min(valores)
+        assert resumen['maximo'] == max(valores)
+
+    def test_ventana_deslizante(self):
+        """Con ventana, quitar el mas antiguo equivale a recalcular la ventana."""
+        valores = [random.randint(0, 50) for _ in range(1000)]
+        tamano = 50
+        estadisticas = EstadisticasTemperatura(ventana=True)
+        for i, valor in enumerate(valores):
+            if i >= tamano:
+                estadisticas.quitar(valores[i - tamano])
+            estadisticas.agregar(valor)
+        ventana = valores[-tamano:]
+        resumen = estadisticas.resumen()
+        assert resumen['cantidad'] == tamano
+        assert resumen['media'] == pytest.approx(statistics.fmean(ventana), abs=0.01)
+        assert resumen['desviacion_estandar'] == pytest.approx(statistics.pstdev(ventana), abs=0.01)
+        assert resumen['minimo'] == min(ventana)
+        assert resumen['maximo'] == max(ventana)
+
+    def test_quitar_ultimo_valor_reinicia(self):
+        """Quitar el unico valor deja las estadisticas vacias."""
+        estadisticas = EstadisticasTemperatura(ventana=True)
+        estadisticas.agregar(20)
+        estadisticas.quitar(20)
+        assert estadisticas.resumen()['cantidad'] == 0
+
+    def test_quitar_sin_ventana_no_permitido(self):
+        """Sin ventana no se admite quitar valores."""
+        estadisticas = EstadisticasTemperatura()
+        estadisticas.agregar(20)
+        with pytest.raises(RuntimeError):
+            estadisticas.quitar(20)
@@ -0,0 +1,168 @@
+"""
+Tests unitarios para el bus de eventos del termostato.
+"""
+import threading
+import time
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.datos import HistorialRepositorioMemoria
+from app.general.calculadores import IndicadorCalculatorTresNiveles
+from app.general.termostato_modelo import TermostatoModelo
+from app.general.validators import TermostatoValidator
+from app.servicios.eventos import BusEventos, BusEventosAsincrono, EventoTermostato
+from app.servicios.termostato_service import TermostatoService
+
+
+def _evento(valor=20):
+    return EventoTermostato(
+        valores={'temperatura_ambiente': valor},
+        lectura=valor,
+        modelo=TermostatoModelo(temperatura_ambiente=valor),
+        indicador='NORMAL',
+        timestamp=datetime.now()
+    )
+
+
+@pytest.fixture
+def bus():
+    asincrono = BusEventosAsincrono(capacidad=4, desborde='bloquear')
+    yield asincrono
+    asincrono.cerrar()
+
+
+class TestBusEventos:
+    """Tests para el bus sincrono."""
+
+    def test_entrega_en_el_hilo_que_publica(self):
+        """Los suscriptores reciben el evento antes de que publicar() retorne."""
+        bus = BusEventos()
+        recibidos = []
+        bus.suscribir(lambda evento: recibidos.append(threading.current_thread()))
+        bus.publicar(_evento())
+        assert recibidos == [threading.current_thread()]
+        assert bus.metricas() == {}
+
+
+class TestBusEventosAsincrono:
+    """Tests para el bus con hilo de fondo."""
+
+    def test_entrega_en_orden_desde_otro_hilo(self, bus):
+        """Los eventos llegan en orden de publicacion, fuera del hilo que publica."""
+        recibidos = []
+        bus.suscribir(lambda evento: recibidos.append((evento.valores['temperatura_ambiente'], threading.current_thread())))
+        for valor in range(10):
+            bus.publicar(_evento(valor))
+        assert bus.vaciar(5)
+        assert [valor for valor, _ in recibidos] == list(range(10))
+        assert all(hilo is not threading.current_thread() for _, hilo in recibidos)
+
+    def test_bloquear_espera_lugar_en_la_cola(self, bus):
+        """Con la cola llena, publicar() espera a que el hilo de fondo avance."""
+        liberar = threading.Event()
+        bus.suscribir(lambda evento: liberar.wait(5))
+        for valor in range(5):
+            bus.publicar(_evento(valor))
+        publicado = threading.Event()
+        hilo = threading.Thread(target=lambda: (bus.publicar(_evento(99)), publicado.set()))
+        hilo.start()
+        assert not publicado.wait(0.1)
+        liberar.set()
+        hilo.join(5)
+        assert publicado.is_set()
+        assert bus.metricas()['eventos_descartados'] == 0
+
+    def test_descartar_elimina_el_mas_antiguo(self):
+        """Con la cola llena y desborde=descartar se pierde el evento mas antiguo."""
+        bus = BusEventosAsincrono(capacidad=2, desborde='descartar')
+        liberar = threading.Event()
+        recibidos = []
+        bus.suscribir(lambda evento: (liberar.wait(5), recibidos.append(evento.valores['temperatura_ambiente'])))
+        bus.publicar(_evento(0))
+        while not bus._en_curso:
+            time.sleep(0.001)
+        for valor in range(1, 5):
+            bus.publicar(_evento(valor))
+        assert bus.metricas()['eventos_descartados'] == 2
+        liberar.set()
+        bus.cerrar()
+        assert recibidos == [0, 3, 4]
+
+    def test_error_de_suscriptor_no_detiene_la_entrega(self, bus):
+        """Un suscriptor que falla no impide entregar a los demas ni los eventos siguientes."""
+        recibidos = []
+        bus.suscribir(MagicMock(side_effect=RuntimeError("falla")))
+        bus.suscribir(lambda evento: recibidos.append(evento.valores['temperatura_ambiente']))
+        bus.publicar(_evento(1))
+        bus.publicar(_evento(2))
+        assert bus.vaciar(5)
+        assert recibidos == [1, 2]
+        assert bus.metricas()['eventos_fallidos'] == 2
+
+    def test_cerrar_entrega_pendientes(self):
+        """cerrar() entrega los eventos encolados antes de detener el hilo."""
+        bus = BusEventosAsincrono(capacidad=100)
+        recibidos = []
+        bus.suscribir(lambda evento: recibidos.append(evento.valores['temperatura_ambiente']))
+        for valor in range(50):
+            bus.publicar(_evento(valor))
+        bus.cerrar()
+        assert recibidos == list(range(50))
+        with pytest.raises(RuntimeError):
+            bus.publicar(_evento())
+
+    @pytest.mark.parametrize("argumentos", [
+        {'capacidad': 0}, {'capacidad': 10, 'desborde': 'ignorar'}
+    ])
+    def test_configuracion_invalida(self, argumentos):
+        """Capacidad no positiva o politica desconocida lanzan ValueError."""
+        with pytest.raises(ValueError):
+            BusEventosAsincrono(**argumentos)
+
+
+class TestServicioConBusAsincrono:
+    """Tests del servicio con efectos secundarios en segundo plano."""
+
+    def test_actualizacion_no_espera_a_la_persistencia(self, bus):
+        """La actualizacion retorna con el modelo cambiado aunque guardar no termino."""
+        liberar = threading.Event()
+        persistidor = MagicMock()
+        persistidor.guardar.side_effect = lambda datos: liberar.wait(5)
+        historial = HistorialRepositorioMemoria(capacidad=10)
+        service = TermostatoService(
+            modelo=TermostatoModelo(),
+            validator=TermostatoValidator(),
+            indicador_calc=IndicadorCalculatorTresNiveles(),
+            persistidor=persistidor,
+            historial_repositorio=historial,
+            bus=bus,
+        )
+        service.actualizar_temperatura_ambiente(30)
+        assert service.modelo.temperatura_ambiente == 30
+        liberar.set()
+        assert service.vaciar_eventos(5)
+        assert historial.cantidad() == 1
+        persistidor.guardar.assert_called_once()
+
+    def test_rafaga_persiste_el_ultimo_estado(self, bus):
+        """Los eventos superados no se persisten; el ultimo siempre se guarda."""
+        liberar = threading.Event()
+        guardados = []
+        persistidor = MagicMock()
+        persistidor.guardar.side_effect = lambda datos: (liberar.wait(5), guardados.append(datos))
+        service = TermostatoService(
+            modelo=TermostatoModelo(),
+            validator=TermostatoValidator(),
+            indicador_calc=IndicadorCalculatorTresNiveles(),
+            persistidor=persistidor,
+            bus=bus,
+        )
+        for valor in (18, 19, 20, 21):
+            service.actualizar_temperatura_deseada(valor)
+        liberar.set()
+        assert service.vaciar_eventos(5)
+        assert guardados[-1]['temperatura_deseada'] == 21
+        assert len(guardados) < 4
+        assert service.metricas()['eventos_pendientes'] == 0
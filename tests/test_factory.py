@@ -3,11 +3,25 @@ Tests unitarios para TermostatoFactory.
 HU-002: Eliminar Singleton en Configurador
 """
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 from app.configuracion.factory import TermostatoFactory
 from app.general.termostato import Termostato
-from app.datos import HistorialRepositorioMemoria, HistorialMapper, TermostatoPersistidorJSON
+from app.datos import (
+    HistorialRepositorioMemoria,
+    HistorialRepositorioCompacto,
+    HistorialRepositorioSQLite,
+    HistorialRepositorioSegmentos,
+    HistorialRepositorioEscalonado,
+    HistorialRepositorioCompartido,
+    HistorialMapper,
+    TermostatoPersistidorJSON,
+    TermostatoPersistidorAtomico,
+    TermostatoPersistidorBinario,
+    TermostatoPersistidorWAL,
+    TermostatoPersistidorCompartido,
+    TermostatoPersistidorDiferido,
+)
 
 
 class TestTermostatoFactoryCrearTermostato:
@@ -49,6 +63,23 @@ class TestTermostatoFactoryCrearTermostato:
         )
         assert isinstance(termostato, Termostato)
 
+    def test_config_inyectada_llega_a_las_dependencias(self):
+        """La config inyectada tambien selecciona historial y persistidor."""
+        from app.configuracion.config import Config
+
+        class ConfigCompacta(Config):
+            HISTORIAL_BACKEND = 'compacto'
+            HISTORIAL_MAX_REGISTROS = 7
+
+        persistidor = MagicMock()
+        persistidor.cargar.return_value = None
+        with patch.object(TermostatoFactory, 'crear_persistidor', return_value=persistidor) as crear:
+            termostato = TermostatoFactory.crear_termostato(config=ConfigCompacta)
+        crear.assert_called_once_with(config=ConfigCompacta)
+        repo = termostato._service._historial_repositorio
+        assert isinstance(repo, HistorialRepositorioCompacto)
+        assert repo.capacidad == 7
+
 
 class TestTermostatoFactoryDependencias:
     """Tests para los métodos de creación de dependencias."""
@@ -58,6 +89,71 @@ class TestTermostatoFactoryDependencias:
         repo = TermostatoFactory.crear_historial_repositorio()
         assert isinstance(repo, HistorialRepositorioMemoria)
 
+    def test_crear_historial_repositorio_con_capacidad(self):
+        """Acepta la capacidad del buffer circular."""
+        repo = TermostatoFactory.crear_historial_repositorio(capacidad=10)
+        assert repo.capacidad == 10
+
+    def test_crear_historial_repositorio_compacto(self):
+        """HISTORIAL_BACKEND=compacto selecciona el repositorio columnar."""
+        config = MagicMock(HISTORIAL_BACKEND='compacto', HISTORIAL_MAX_REGISTROS=50)
+        repo = TermostatoFactory.crear_historial_repositorio(config=config)
+        assert isinstance(repo, HistorialRepositorioCompacto)
+        assert repo.capacidad == 50
+
+    def test_crear_historial_repositorio_sqlite(self, tmp_path):
+        """HISTORIAL_BACKEND=sqlite selecciona el repositorio SQLite."""
+        config = MagicMock(
+            HISTORIAL_BACKEND='sqlite',
+            HISTORIAL_SQLITE_RUTA=str(tmp_path / 'historial.db'),
+            HISTORIAL_SQLITE_LOTE=10,
+            HISTORIAL_SQLITE_INTERVALO_MS=100,
+        )
+        repo = TermostatoFactory.crear_historial_repositorio(config=config)
+        assert isinstance(repo, HistorialRepositorioSQLite)
+        repo.cerrar()
+
+    def test_crear_historial_repositorio_segmentos(self, tmp_path):
+        """HISTORIAL_BACKEND=segmentos selecciona el log binario."""
+        config = MagicMock(
+            HISTORIAL_BACKEND='segmentos',
+            HISTORIAL_SEGMENTOS_DIRECTORIO=str(tmp_path / 'historial'),
+            HISTORIAL_SEGMENTO_BYTES=1200,
+        )
+        repo = TermostatoFactory.crear_historial_repositorio(config=config)
+        assert isinstance(repo, HistorialRepositorioSegmentos)
+        repo.cerrar()
+
+    def test_crear_historial_repositorio_escalonado(self, tmp_path):
+        """HISTORIAL_BACKEND=escalonado selecciona el repositorio por niveles."""
+        config = MagicMock(
+            HISTORIAL_BACKEND='escalonado',
+            HISTORIAL_FRIO_DIRECTORIO=str(tmp_path / 'frio'),
+            HISTORIAL_CALIENTE_REGISTROS=100,
+            HISTORIAL_FRIO_BLOQUE=50,
+        )
+        repo = TermostatoFactory.crear_historial_repositorio(config=config)
+        assert isinstance(repo, HistorialRepositorioEscalonado)
+        repo.cerrar()
+
+    def test_crear_historial_repositorio_compartido(self, tmp_path):
+        """HISTORIAL_BACKEND=compartido selecciona el buffer entre procesos."""
+        config = MagicMock(
+            HISTORIAL_BACKEND='compartido',
+            HISTORIAL_COMPARTIDO_RUTA=str(tmp_path / 'historial.bin'),
+            HISTORIAL_MAX_REGISTROS=50,
+        )
+        repo = TermostatoFactory.crear_historial_repositorio(config=config)
+        assert isinstance(repo, HistorialRepositorioCompartido)
+        assert repo.capacidad == 50
+        repo.cerrar()
+
+    def test_crear_historial_repositorio_backend_desconocido(self):
+        """Un backend desconocido lanza ValueError."""
+        config = MagicMock(HISTORIAL_BACKEND='otro', HISTORIAL_MAX_REGISTROS=50)
+        with pytest.raises(ValueError):
+            TermostatoFactory.crear_historial_repositorio(config=config)
+
     def test_crear_historial_repositorio_instancias_independientes(self):
         """Cada llamada retorna una instancia diferente."""
         r1 = TermostatoFactory.crear_historial_repositorio()
@@ -74,6 +170,65 @@ class TestTermostatoFactoryDependencias:
         persistidor = TermostatoFactory.crear_persistidor()
         assert isinstance(persistidor, TermostatoPersistidorJSON)
 
+    def test_crear_persistidor_diferido(self, tmp_path):
+        """PERSISTIDOR_INTERVALO_MS > 0 envuelve el persistidor JSON."""
+        config = MagicMock(PERSISTIDOR_TIPO='json', PERSISTIDOR_INTERVALO_MS=200)
+        persistidor = TermostatoFactory.crear_persistidor(str(tmp_path / "estado.json"), config=config)
+        assert isinstance(persistidor, TermostatoPersistidorDiferido)
+        assert isinstance(persistidor.destino, TermostatoPersistidorJSON)
+        persistidor.cerrar()
+
+    def test_crear_persistidor_atomico(self, tmp_path):
+        """PERSISTIDOR_TIPO=atomico selecciona el persistidor con escritura atomica."""
+        config = MagicMock(PERSISTIDOR_TIPO='atomico', PERSISTIDOR_INTERVALO_MS=0,
+                           PERSISTIDOR_FSYNC='escrituras', PERSISTIDOR_FSYNC_ESCRITURAS=5,
+                           PERSISTIDOR_FSYNC_INTERVALO_MS=1000)
+        persistidor = TermostatoFactory.crear_persistidor(str(tmp_path / "estado.json"), config=config)
+        assert isinstance(persistidor, TermostatoPersistidorAtomico)
+
+    def test_crear_persistidor_binario(self, tmp_path):
+        """PERSISTIDOR_TIPO=binario selecciona el persistidor de formato fijo."""
+        config = MagicMock(PERSISTIDOR_TIPO='binario', PERSISTIDOR_INTERVALO_MS=0)
+        persistidor = TermostatoFactory.crear_persistidor(str(tmp_path / "estado.bin"), config=config)
+        assert isinstance(persistidor, TermostatoPersistidorBinario)
+
+    def test_crear_persistidor_wal(self, tmp_path):
+        """PERSISTIDOR_TIPO=wal selecciona el persistidor con log y snapshots."""
+        config = MagicMock(PERSISTIDOR_TIPO='wal', PERSISTIDOR_INTERVALO_MS=0,
+                           PERSISTIDOR_WAL_COMPACTAR=100, PERSISTIDOR_WAL_FSYNC=False)
+        persistidor = TermostatoFactory.crear_persistidor(str(tmp_path / "wal"), config=config)
+        assert isinstance(persistidor, TermostatoPersistidorWAL)
+
+    def test_crear_persistidor_compartido(self, tmp_path):
+        """PERSISTIDOR_TIPO=compartido selecciona el persistidor entre workers."""
+        config = MagicMock(PERSISTIDOR_TIPO='compartido', PERSISTIDOR_INTERVALO_MS=0)
+        persistidor = TermostatoFactory.crear_persistidor(str(tmp_path / "estado.bin"), config=config)
+        assert isinstance(persistidor, TermostatoPersistidorCompartido)
+
+    def test_crear_persistidor_compartido_no_admite_diferido(self, tmp_path):
+        """El persistidor compartido no puede diferirse: lanza ValueError."""
+        config = MagicMock(PERSISTIDOR_TIPO='compartido', PERSISTIDOR_INTERVALO_MS=200)
+        with pytest.raises(ValueError):
+            TermostatoFactory.crear_persistidor(str(tmp_path / "estado.bin"), config=config)
+
+    def test_crear_bus_eventos_sincrono_por_defecto(self):
+        """EVENTOS_CAPACIDAD=0 ejecuta los efectos en la misma peticion."""
+        bus = TermostatoFactory.crear_bus_eventos(MagicMock(EVENTOS_CAPACIDAD=0))
+        assert not bus.asincrono
+
+    def test_crear_bus_eventos_asincrono(self):
+        """EVENTOS_CAPACIDAD > 0 crea un bus con cola acotada y politica de desborde."""
+        config = MagicMock(EVENTOS_CAPACIDAD=10, EVENTOS_DESBORDE='descartar')
+        bus = TermostatoFactory.crear_bus_eventos(config)
+        assert bus.asincrono
+        bus.cerrar()
+
+    def test_crear_persistidor_tipo_desconocido(self):
+        """Un PERSISTIDOR_TIPO no soportado lanza ValueError."""
+        config = MagicMock(PERSISTIDOR_TIPO='xml')
+        with pytest.raises(ValueError):
+            TermostatoFactory.crear_persistidor(config=config)
+
 
 class TestCreateApp:
     """Tests para el Application Factory Pattern en api.py."""
@@ -0,0 +1,36 @@
+"""
+Tests unitarios para HistorialMapper.
+"""
+from datetime import datetime
+
+import pytest
+
+from app.datos import CursorHistorial, HistorialMapper, RegistroTemperatura
+
+
+@pytest.fixture
+def mapper():
+    return HistorialMapper()
+
+
+class TestHistorialMapper:
+    """Tests para la conversion de registros."""
+
+    def test_dict_ida_y_vuelta(self, mapper):
+        """desde_dict() reconstruye el registro serializado por a_dict()."""
+        registro = RegistroTemperatura(temperatura=22, timestamp=datetime(2026, 1, 1, 12, 30))
+        assert mapper.desde_dict(mapper.a_dict(registro)) == registro
+
+    def test_cursor_ida_y_vuelta(self, mapper):
+        """desde_cursor() recupera timestamp y secuencia del registro."""
+        timestamp = datetime(2026, 1, 1, 12, 30, 0, 123456)
+        registro = RegistroTemperatura(temperatura=22, timestamp=timestamp, secuencia=41)
+        cursor = mapper.a_cursor(registro)
+        assert '=' not in cursor
+        assert mapper.desde_cursor(cursor) == CursorHistorial(timestamp, 41)
+
+    @pytest.mark.parametrize("cursor", ['', 'no-es-un-cursor', 'MTIz', '!!!'])
+    def test_cursor_invalido(self, mapper, cursor):
+        """Un cursor mal formado lanza ValueError."""
+        with pytest.raises(ValueError):
+            mapper.desde_cursor(cursor)
@@ -0,0 +1,37 @@
+"""
+Tests unitarios para HistorialRepositorioMemoria (buffer circular).
+El contrato comun de los repositorios se prueba en test_repositorio.py.
+"""
+import pytest
+
+from app.datos import HistorialRepositorioMemoria
+from tests.conftest import registro
+
+
+class TestHistorialRepositorioMemoria:
+    """Tests para el buffer circular en memoria."""
+
+    def test_iterar_se_detiene_ante_desalojo(self):
+        """iterar() no repite registros si el buffer se sobrescribe a mitad del recorrido."""
+        repo = HistorialRepositorioMemoria(capacidad=4)
+        for i in range(4):
+            repo.agregar(registro(i))
+        iterador = repo.iterar()
+        assert next(iterador).temperatura == 3
+        repo.agregar(registro(4))
+        repo.agregar(registro(5))
+        assert [r.temperatura for r in iterador] == [2]
+
+    def test_capacidad_default_desde_config(self):
+        """Sin argumentos usa HISTORIAL_MAX_REGISTROS."""
+        assert HistorialRepositorioMemoria().capacidad == HistorialRepositorioMemoria.MAX_REGISTROS
+
+    def test_capacidad_invalida(self):
+        """Una capacidad no positiva lanza ValueError."""
+        with pytest.raises(ValueError):
+            HistorialRepositorioMemoria(capacidad=0)
+
+    def test_version_no_se_repite_entre_instancias(self):
+        """Dos instancias vacias no comparten version."""
+        assert HistorialRepositorioMemoria(capacidad=5).version() != \
+            HistorialRepositorioMemoria(capacidad=5).version()
@@ -0,0 +1,81 @@
+"""
+Tests unitarios para TermostatoPersistidorAtomico.
+"""
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.datos import TermostatoPersistidorAtomico
+
+ESTADO = {'temperatura_ambiente': 22, 'temperatura_deseada': 24}
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "estado.json")
+
+
+class TestTermostatoPersistidorAtomico:
+    """Tests para la escritura atomica con politica de fsync."""
+
+    def test_guardar_y_cargar(self, ruta):
+        """El estado guardado se recupera con cargar()."""
+        persistidor = TermostatoPersistidorAtomico(ruta, fsync='siempre')
+        persistidor.guardar(ESTADO)
+        assert persistidor.cargar() == ESTADO
+        assert not os.path.exists(ruta + '.tmp')
+
+    def test_fallo_al_escribir_conserva_version_anterior(self, ruta):
+        """Una escritura interrumpida no trunca el archivo de estado."""
+        persistidor = TermostatoPersistidorAtomico(ruta, fsync='siempre')
+        persistidor.guardar(ESTADO)
+        with patch('app.datos.persistidor_atomico.json.dump', side_effect=OSError("disco lleno")):
+            with pytest.raises(OSError):
+                persistidor.guardar({'temperatura_ambiente': 30})
+        assert persistidor.cargar() == ESTADO
+
+    def test_fsync_siempre(self, ruta):
+        """Con 'siempre' se sincroniza el archivo en cada guardado."""
+        persistidor = TermostatoPersistidorAtomico(ruta, fsync='siempre')
+        with patch('app.datos.persistidor_atomico.os.fsync') as fsync:
+            for _ in range(3):
+                persistidor.guardar(ESTADO)
+        # archivo temporal + directorio por guardado
+        assert fsync.call_count == 6
+
+    def test_fsync_cada_n_escrituras(self, ruta):
+        """Con 'escrituras' se sincroniza cada N guardados."""
+        persistidor = TermostatoPersistidorAtomico(ruta, fsync='escrituras', fsync_escrituras=4)
+        with patch('app.datos.persistidor_atomico.os.fsync') as fsync:
+            for _ in range(8):
+                persistidor.guardar(ESTADO)
+        assert fsync.call_count == 4
+
+    def test_fsync_por_intervalo(self, ruta):
+        """Con 'intervalo' se sincroniza solo al vencer el intervalo."""
+        persistidor = TermostatoPersistidorAtomico(ruta, fsync='intervalo', fsync_intervalo_ms=60000)
+        with patch('app.datos.persistidor_atomico.os.fsync') as fsync:
+            for _ in range(5):
+                persistidor.guardar(ESTADO)
+        fsync.assert_not_called()
+        assert persistidor.cargar() == ESTADO
+
+    def test_fsync_por_intervalo_sin_mas_escrituras(self, ruta):
+        """Si no llegan mas guardados, el ultimo se sincroniza al vencer el intervalo."""
+        persistidor = TermostatoPersistidorAtomico(ruta, fsync='intervalo', fsync_intervalo_ms=50)
+        with patch('app.datos.persistidor_atomico.os.fsync') as fsync:
+            persistidor.guardar(ESTADO)
+            assert fsync.call_count == 0
+            limite = time.monotonic() + 2
+            while fsync.call_count < 2 and time.monotonic() < limite:
+                time.sleep(0.01)
+        # archivo de estado + directorio
+        assert fsync.call_count == 2
+        assert persistidor._sin_fsync == 0
+
+    def test_politica_invalida(self, ruta):
+        """Una politica de fsync desconocida lanza ValueError."""
+        with pytest.raises(ValueError):
+            TermostatoPersistidorAtomico(ruta, fsync='a veces')
@@ -0,0 +1,88 @@
+"""
+Tests unitarios para TermostatoPersistidorBinario.
+"""
+import os
+
+import pytest
+
+from app.datos import TermostatoPersistidorBinario
+from app.datos.persistidor_binario import _CABECERA, _RANURA
+
+ESTADO = {
+    'temperatura_ambiente': 22,
+    'temperatura_deseada': 24,
+    'carga_bateria': 3.75,
+    'estado_climatizador': 'enfriando',
+    'indicador': 'NORMAL'
+}
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "estado.bin")
+
+
+@pytest.fixture
+def persistidor(ruta):
+    binario = TermostatoPersistidorBinario(ruta)
+    yield binario
+    binario.cerrar()
+
+
+class TestTermostatoPersistidorBinario:
+    """Tests para el registro binario de formato fijo."""
+
+    def test_no_existe_antes_de_guardar(self, persistidor, ruta):
+        """Sin guardados no hay estado ni archivo."""
+        assert not persistidor.existe()
+        assert persistidor.cargar() is None
+        assert not os.path.exists(ruta)
+
+    def test_guardar_y_cargar(self, persistidor):
+        """El estado guardado se recupera campo por campo."""
+        persistidor.guardar(ESTADO)
+        assert persistidor.existe()
+        assert persistidor.cargar() == ESTADO
+
+    def test_archivo_de_tamano_fijo(self, persistidor, ruta):
+        """Guardados sucesivos no cambian el tamaño del archivo."""
+        for temperatura in range(10):
+            persistidor.guardar({**ESTADO, 'temperatura_ambiente': temperatura})
+        assert os.path.getsize(ruta) == 128
+        assert persistidor.contador == 10
+        assert persistidor.cargar()['temperatura_ambiente'] == 9
+
+    def test_persiste_entre_instancias(self, persistidor, ruta):
+        """Otra instancia lee el estado y continua el contador."""
+        persistidor.guardar(ESTADO)
+        persistidor.guardar({**ESTADO, 'carga_bateria': 1.5})
+        persistidor.cerrar()
+        reabierto = TermostatoPersistidorBinario(ruta)
+        assert reabierto.cargar()['carga_bateria'] == 1.5
+        assert reabierto.contador == 2
+        reabierto.cerrar()
+
+    def test_ranura_corrupta_recupera_estado_anterior(self, persistidor, ruta):
+        """Si la ultima ranura esta dañada se usa la anterior."""
+        persistidor.guardar(ESTADO)
+        persistidor.guardar({**ESTADO, 'temperatura_ambiente': 30})
+        persistidor.cerrar()
+        # La segunda escritura (contador 2) esta en la ranura 0
+        with open(ruta, 'r+b') as archivo:
+            archivo.seek(_CABECERA.size + 10)
+            archivo.write(b'\xff\xff')
+        reabierto = TermostatoPersistidorBinario(ruta)
+        assert reabierto.cargar() == ESTADO
+        reabierto.cerrar()
+
+    def test_archivo_ajeno_lanza_error(self, ruta):
+        """Un archivo con otro formato no se interpreta como estado."""
+        with open(ruta, 'wb') as archivo:
+            archivo.write(b'{"temperatura_ambiente": 20}'.ljust(_CABECERA.size + 2 * _RANURA.size))
+        with pytest.raises(ValueError):
+            TermostatoPersistidorBinario(ruta).cargar()
+
+    def test_texto_demasiado_largo(self, persistidor):
+        """Un estado que no entra en el campo fijo lanza ValueError."""
+        with pytest.raises(ValueError):
+            persistidor.guardar({**ESTADO, 'estado_climatizador': 'x' * 17})
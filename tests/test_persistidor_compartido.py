@@ -0,0 +1,173 @@
+"""
+Tests unitarios para TermostatoPersistidorCompartido.
+"""
+import multiprocessing
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from app.datos import TermostatoPersistidorCompartido, TermostatoPersistidorBinario
+from app.general.calculadores import IndicadorCalculatorTresNiveles
+from app.general.termostato_modelo import TermostatoModelo
+from app.general.validators import TermostatoValidator
+from app.servicios.termostato_service import TermostatoService
+
+ESTADO = {
+    'temperatura_ambiente': 22,
+    'temperatura_deseada': 24,
+    'carga_bateria': 3.75,
+    'estado_climatizador': 'enfriando',
+    'indicador': 'NORMAL'
+}
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "estado.bin")
+
+
+def _servicio(ruta):
+    """Servicio como el de un worker: su propio persistidor sobre el archivo comun."""
+    service = TermostatoService(
+        modelo=TermostatoModelo(),
+        validator=TermostatoValidator(),
+        indicador_calc=IndicadorCalculatorTresNiveles(),
+        persistidor=TermostatoPersistidorCompartido(ruta),
+    )
+    service.cargar_estado()
+    return service
+
+
+def _termina_sin_esperar(funcion):
+    """Ejecuta `funcion` en otro hilo e indica si termino sin quedar bloqueada."""
+    hilo = threading.Thread(target=funcion, daemon=True)
+    hilo.start()
+    hilo.join(2)
+    return not hilo.is_alive()
+
+
+def _guardar_varias(ruta, veces):
+    persistidor = TermostatoPersistidorCompartido(ruta)
+    for temperatura in range(veces):
+        persistidor.guardar({**ESTADO, 'temperatura_ambiente': temperatura % 50})
+    persistidor.cerrar()
+
+
+class TestTermostatoPersistidorCompartido:
+    """Tests para el estado compartido entre workers."""
+
+    def test_version_cambia_con_cada_guardado(self, ruta):
+        """version() es el contador de escrituras del archivo."""
+        persistidor = TermostatoPersistidorCompartido(ruta)
+        assert persistidor.version() == 0
+        persistidor.guardar(ESTADO)
+        persistidor.guardar(ESTADO)
+        assert persistidor.version() == 2
+        persistidor.cerrar()
+
+    def test_instancias_ven_los_guardados_de_otras(self, ruta):
+        """Un guardado es visible de inmediato desde otra instancia."""
+        escritor = TermostatoPersistidorCompartido(ruta)
+        lector = TermostatoPersistidorCompartido(ruta)
+        escritor.guardar(ESTADO)
+        assert lector.cargar() == ESTADO
+        escritor.guardar({**ESTADO, 'temperatura_ambiente': 30})
+        assert lector.version() == 2
+        assert lector.cargar()['temperatura_ambiente'] == 30
+        escritor.cerrar()
+        lector.cerrar()
+
+    def test_bloqueo_reentrante(self, ruta):
+        """guardar() dentro de bloqueo() no se bloquea a si mismo."""
+        persistidor = TermostatoPersistidorCompartido(ruta)
+        with persistidor.bloqueo():
+            persistidor.guardar(ESTADO)
+            assert persistidor.cargar() == ESTADO
+        persistidor.cerrar()
+
+    def test_lecturas_no_esperan_el_bloqueo(self, ruta):
+        """version() y cargar() leen mientras otro tiene el flock de escritura."""
+        escritor = TermostatoPersistidorCompartido(ruta)
+        lector = TermostatoPersistidorCompartido(ruta)
+        escritor.guardar(ESTADO)
+        assert lector.version() == 1
+        leidos = []
+        with escritor.bloqueo():
+            assert _termina_sin_esperar(lambda: leidos.extend([lector.version(), lector.cargar()]))
+        assert leidos == [1, ESTADO]
+        escritor.cerrar()
+        lector.cerrar()
+
+    def test_lectura_reintenta_si_ninguna_ranura_es_valida(self, ruta):
+        """Una lectura que coincide con dos guardados seguidos se repite."""
+        persistidor = TermostatoPersistidorCompartido(ruta)
+        persistidor.guardar(ESTADO)
+        original = TermostatoPersistidorBinario._leer_ranura_vigente
+        with patch.object(TermostatoPersistidorBinario, '_leer_ranura_vigente', autospec=True,
+                          side_effect=[None, None, original(persistidor)]) as leer:
+            assert persistidor.version() == 1
+        assert leer.call_count == 3
+        persistidor.cerrar()
+
+    def test_procesos_concurrentes_no_pierden_escrituras(self, ruta):
+        """El contador refleja todos los guardados de varios procesos."""
+        contexto = multiprocessing.get_context('fork')
+        procesos = [contexto.Process(target=_guardar_varias, args=(ruta, 100)) for _ in range(3)]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        assert all(proceso.exitcode == 0 for proceso in procesos)
+        assert TermostatoPersistidorCompartido(ruta).version() == 300
+
+
+class TestServicioConEstadoCompartido:
+    """Tests de TermostatoService con persistidor compartido."""
+
+    def test_servicio_ve_cambios_de_otro_worker(self, ruta):
+        """Un servicio recarga el modelo cuando otro guardo una version nueva."""
+        worker_a = _servicio(ruta)
+        worker_b = _servicio(ruta)
+        worker_a.actualizar_temperatura_deseada(18)
+        assert worker_b.modelo.temperatura_deseada == 18
+        worker_b.actualizar_carga_bateria(3.0)
+        assert worker_a.modelo.carga_bateria == 3.0
+        assert worker_a.modelo.temperatura_deseada == 18
+        assert worker_a.obtener_indicador() == 'BAJO'
+
+    def test_leer_el_modelo_sin_cambios_no_toma_el_lock(self, ruta):
+        """Sin guardados de otro worker, modelo no espera a una actualizacion en curso."""
+        worker = _servicio(ruta)
+        worker.actualizar_temperatura_deseada(18)
+        tomado, liberar = threading.Event(), threading.Event()
+
+        def actualizacion_en_curso():
+            with worker._lock:
+                tomado.set()
+                liberar.wait(5)
+
+        hilo = threading.Thread(target=actualizacion_en_curso, daemon=True)
+        hilo.start()
+        tomado.wait(2)
+        try:
+            assert _termina_sin_esperar(lambda: worker.snapshot())
+        finally:
+            liberar.set()
+            hilo.join()
+
+    def test_deteccion_de_cambios_usa_el_estado_compartido(self, ruta):
+        """Un valor igual al guardado por otro worker no se vuelve a persistir."""
+        worker_a = _servicio(ruta)
+        worker_b = _servicio(ruta)
+        worker_a.actualizar_temperatura_deseada(18)
+        worker_b.actualizar_temperatura_deseada(18)
+        assert worker_b.metricas()['escrituras_evitadas'] == 1
+
+    def test_etiqueta_igual_en_todos_los_workers(self, ruta):
+        """La version del modelo es la del archivo: la etiqueta no depende del worker."""
+        worker_a = _servicio(ruta)
+        worker_b = _servicio(ruta)
+        worker_a.actualizar({'temperatura_deseada': 18, 'carga_bateria': 3.0})
+        assert worker_b.version == worker_a.version == 1
+        assert worker_b.etiqueta(worker_b.version) == worker_a.etiqueta(worker_a.version)
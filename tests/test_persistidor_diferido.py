@@ -0,0 +1,108 @@
+"""
+Tests unitarios para TermostatoPersistidorDiferido (write-behind).
+"""
+import json
+import os
+import signal
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.datos import TermostatoPersistidorDiferido, TermostatoPersistidorJSON
+from app.datos import persistidor_diferido
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "estado.json")
+
+
+@pytest.fixture
+def persistidor(ruta):
+    diferido = TermostatoPersistidorDiferido(TermostatoPersistidorJSON(ruta), intervalo_ms=60000)
+    yield diferido
+    diferido.cerrar()
+
+
+class TestTermostatoPersistidorDiferido:
+    """Tests para la persistencia diferida."""
+
+    def test_guardar_no_escribe_en_disco(self, persistidor, ruta):
+        """guardar() retorna sin escribir el archivo."""
+        persistidor.guardar({'temperatura_ambiente': 25})
+        assert not os.path.exists(ruta)
+
+    def test_cargar_retorna_pendiente(self, persistidor):
+        """cargar() ve la ultima instantanea aunque no se haya volcado."""
+        persistidor.guardar({'temperatura_ambiente': 25})
+        assert persistidor.existe()
+        assert persistidor.cargar() == {'temperatura_ambiente': 25}
+
+    def test_volcar_escribe_solo_la_ultima_instantanea(self, ruta):
+        """Una rafaga de guardar() se convierte en una sola escritura."""
+        destino = MagicMock()
+        diferido = TermostatoPersistidorDiferido(destino, intervalo_ms=60000)
+        for valor in range(10):
+            diferido.guardar({'temperatura_ambiente': valor})
+        diferido.volcar()
+        diferido.volcar()
+        destino.guardar.assert_called_once_with({'temperatura_ambiente': 9})
+        diferido.cerrar()
+
+    def test_vuelca_periodicamente(self, ruta):
+        """El hilo de fondo vuelca al vencer el intervalo."""
+        diferido = TermostatoPersistidorDiferido(TermostatoPersistidorJSON(ruta), intervalo_ms=20)
+        diferido.guardar({'temperatura_ambiente': 25})
+        limite = time.monotonic() + 2
+        while not os.path.exists(ruta) and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert os.path.exists(ruta)
+        diferido.cerrar()
+        with open(ruta, encoding='utf-8') as archivo:
+            assert json.load(archivo) == {'temperatura_ambiente': 25}
+
+    def test_cerrar_vuelca_pendientes(self, persistidor, ruta):
+        """cerrar() escribe los cambios pendientes."""
+        persistidor.guardar({'temperatura_ambiente': 25})
+        persistidor.cerrar()
+        assert TermostatoPersistidorJSON(ruta).cargar() == {'temperatura_ambiente': 25}
+
+    def test_error_de_escritura_conserva_pendiente(self):
+        """Si el destino falla, la instantanea se reintenta en el proximo volcado."""
+        destino = MagicMock()
+        destino.guardar.side_effect = [OSError("disco lleno"), None]
+        diferido = TermostatoPersistidorDiferido(destino, intervalo_ms=60000)
+        diferido.guardar({'temperatura_ambiente': 25})
+        with pytest.raises(OSError):
+            diferido.volcar()
+        diferido.cerrar()
+        assert destino.guardar.call_count == 2
+
+    def test_sigterm_vuelca_y_encadena(self, persistidor, ruta, monkeypatch):
+        """El manejador de SIGTERM vuelca los pendientes y delega al manejador previo."""
+        original = signal.getsignal(signal.SIGTERM)
+        llamadas = []
+        monkeypatch.setattr(persistidor_diferido, '_sigterm_instalado', False)
+        signal.signal(signal.SIGTERM, lambda signum, frame: llamadas.append(signum))
+        try:
+            persistidor_diferido._instalar_sigterm()
+            persistidor.guardar({'temperatura_ambiente': 25})
+            signal.getsignal(signal.SIGTERM)(signal.SIGTERM, None)
+        finally:
+            signal.signal(signal.SIGTERM, original)
+        assert TermostatoPersistidorJSON(ruta).cargar() == {'temperatura_ambiente': 25}
+        assert llamadas == [signal.SIGTERM]
+
+    def test_sigterm_durante_un_volcado_no_bloquea(self, persistidor, ruta):
+        """Si la senal llega con un volcado en curso, el manejador no espera el lock."""
+        persistidor.guardar({'temperatura_ambiente': 26})
+        with persistidor._lock_volcado:
+            hilo = threading.Thread(target=persistidor_diferido._volcar_activos)
+            hilo.start()
+            hilo.join(2)
+            assert not hilo.is_alive()
+        assert not os.path.exists(ruta)
+        persistidor.cerrar()
+        assert TermostatoPersistidorJSON(ruta).cargar() == {'temperatura_ambiente': 26}
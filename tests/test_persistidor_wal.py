@@ -0,0 +1,111 @@
+"""
+Tests unitarios para TermostatoPersistidorWAL.
+"""
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.datos import TermostatoPersistidorWAL
+
+ESTADO = {
+    'temperatura_ambiente': 20,
+    'temperatura_deseada': 24,
+    'carga_bateria': 5.0,
+    'estado_climatizador': 'apagado',
+    'indicador': 'NORMAL'
+}
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    return str(tmp_path / "wal")
+
+
+@pytest.fixture
+def persistidor(directorio):
+    wal = TermostatoPersistidorWAL(directorio, compactar_cada=100, sincronizar=False)
+    yield wal
+    wal.cerrar()
+
+
+def _entradas(directorio):
+    with open(os.path.join(directorio, 'estado.wal'), encoding='utf-8') as archivo:
+        return [json.loads(linea) for linea in archivo]
+
+
+class TestTermostatoPersistidorWAL:
+    """Tests para el log de escritura anticipada con snapshots."""
+
+    def test_no_existe_sin_archivos(self, persistidor):
+        """Sin guardados no hay estado."""
+        assert not persistidor.existe()
+        assert persistidor.cargar() is None
+
+    def test_agrega_solo_campos_modificados(self, persistidor, directorio):
+        """Cada guardado agrega una entrada por campo que cambio."""
+        persistidor.guardar(ESTADO)
+        persistidor.guardar({**ESTADO, 'temperatura_ambiente': 25})
+        entradas = _entradas(directorio)
+        assert len(entradas) == len(ESTADO) + 1
+        assert entradas[-1]['campo'] == 'temperatura_ambiente'
+        assert entradas[-1]['valor'] == 25
+        assert 'timestamp' in entradas[-1]
+
+    def test_recupera_reaplicando_el_log(self, persistidor, directorio):
+        """Otra instancia reconstruye el estado desde el log."""
+        persistidor.guardar(ESTADO)
+        persistidor.guardar({**ESTADO, 'carga_bateria': 2.0, 'indicador': 'BAJO'})
+        persistidor.cerrar()
+        reabierto = TermostatoPersistidorWAL(directorio)
+        assert reabierto.existe()
+        assert reabierto.cargar() == {**ESTADO, 'carga_bateria': 2.0, 'indicador': 'BAJO'}
+        reabierto.cerrar()
+
+    def test_compacta_en_snapshot(self, directorio):
+        """Al alcanzar el umbral el estado pasa al snapshot y el log se vacia."""
+        wal = TermostatoPersistidorWAL(directorio, compactar_cada=7, sincronizar=False)
+        wal.guardar(ESTADO)
+        wal.guardar({**ESTADO, 'temperatura_ambiente': 21})
+        wal.guardar({**ESTADO, 'temperatura_ambiente': 22})
+        assert _entradas(directorio) == []
+        wal.cerrar()
+        reabierto = TermostatoPersistidorWAL(directorio)
+        assert reabierto.cargar() == {**ESTADO, 'temperatura_ambiente': 22}
+        reabierto.cerrar()
+
+    def test_compactar_sincroniza_el_directorio_antes_de_truncar(self, persistidor, directorio):
+        """El rename del snapshot es durable antes de vaciar el log."""
+        persistidor.guardar(ESTADO)
+        tamanos = []
+        with patch('app.datos.persistidor_wal._fsync_directorio',
+                   side_effect=lambda _: tamanos.append(
+                       os.path.getsize(os.path.join(directorio, 'estado.wal')))) as fsync:
+            persistidor.compactar()
+        fsync.assert_called_once_with(directorio)
+        assert tamanos[0] > 0
+        assert _entradas(directorio) == []
+
+    def test_snapshot_mas_cola_del_log(self, persistidor, directorio):
+        """La recuperacion aplica el log posterior al snapshot."""
+        persistidor.guardar(ESTADO)
+        persistidor.compactar()
+        persistidor.guardar({**ESTADO, 'estado_climatizador': 'enfriando'})
+        persistidor.cerrar()
+        reabierto = TermostatoPersistidorWAL(directorio)
+        assert reabierto.cargar()['estado_climatizador'] == 'enfriando'
+        reabierto.cerrar()
+
+    def test_descarta_linea_incompleta(self, persistidor, directorio):
+        """Una ultima entrada truncada por una caida se ignora y se elimina."""
+        persistidor.guardar(ESTADO)
+        persistidor.cerrar()
+        ruta_log = os.path.join(directorio, 'estado.wal')
+        with open(ruta_log, 'a', encoding='utf-8') as archivo:
+            archivo.write('{"campo": "temperatura_ambiente", "val')
+        reabierto = TermostatoPersistidorWAL(directorio)
+        assert reabierto.cargar() == ESTADO
+        reabierto.guardar({**ESTADO, 'temperatura_ambiente': 30})
+        reabierto.cerrar()
+        assert _entradas(directorio)[-1]['valor'] == 30
@@ -0,0 +1,228 @@
+"""
+Tests del contrato comun de HistorialRepositorio, ejecutados sobre cada backend.
+Los comportamientos propios de un backend se prueban en su archivo.
+"""
+import os
+from datetime import timedelta
+
+import pytest
+
+from app.datos import (
+    CursorHistorial,
+    HistorialRepositorioCompacto,
+    HistorialRepositorioCompartido,
+    HistorialRepositorioEscalonado,
+    HistorialRepositorioMemoria,
+    HistorialRepositorioSegmentos,
+    HistorialRepositorioSQLite,
+    RegistroTemperatura,
+)
+from tests.conftest import BASE, paginar, registro
+
+# Cada backend se abre sobre un directorio temporal; abrirlo de nuevo sobre
+# el mismo directorio reabre el mismo historial. La capacidad solo aplica a
+# los backends acotados
+_BACKENDS = {
+    'memoria': lambda directorio, capacidad: HistorialRepositorioMemoria(capacidad=capacidad),
+    'compacto': lambda directorio, capacidad: HistorialRepositorioCompacto(capacidad=capacidad),
+    'compartido': lambda directorio, capacidad: HistorialRepositorioCompartido(
+        os.path.join(directorio, 'historial.bin'), capacidad=capacidad),
+    'sqlite': lambda directorio, capacidad: HistorialRepositorioSQLite(
+        os.path.join(directorio, 'historial.db'), lote=3, intervalo_ms=0),
+    # 4 registros de 12 bytes por segmento
+    'segmentos': lambda directorio, capacidad: HistorialRepositorioSegmentos(
+        os.path.join(directorio, 'segmentos'), tamano_segmento=48),
+    'escalonado': lambda directorio, capacidad: HistorialRepositorioEscalonado(
+        os.path.join(directorio, 'frio'), capacidad_caliente=4, tamano_bloque=3),
+}
+_ACOTADOS = ['memoria', 'compacto', 'compartido']
+_PERSISTENTES = ['compartido', 'sqlite', 'segmentos', 'escalonado']
+
+
+class _Abridor:
+    """Abre instancias de un backend y las cierra al terminar el test."""
+
+    def __init__(self, backend, directorio):
+        self._crear = _BACKENDS[backend]
+        self._directorio = directorio
+        self._abiertos = []
+
+    def __call__(self, capacidad=100, cantidad=0):
+        repo = self._crear(self._directorio, capacidad)
+        self._abiertos.append(repo)
+        for i in range(cantidad):
+            repo.agregar(registro(i))
+        return repo
+
+    def reabrir(self, repo, capacidad=100):
+        """Cierra `repo` y abre otra instancia sobre el mismo almacenamiento."""
+        repo.cerrar()
+        self._abiertos.remove(repo)
+        return self(capacidad)
+
+    def cerrar(self):
+        for repo in self._abiertos:
+            if hasattr(repo, 'cerrar'):
+                repo.cerrar()
+
+
+@pytest.fixture(params=list(_BACKENDS))
+def abrir(request, tmp_path):
+    abridor = _Abridor(request.param, str(tmp_path))
+    yield abridor
+    abridor.cerrar()
+
+
+def _temperaturas(registros):
+    return [r.temperatura for r in registros]
+
+
+class TestObtener:
+    """Tests para obtener() e iterar()."""
+
+    def test_obtener_mas_reciente_primero(self, abrir):
+        """obtener() retorna del mas reciente al mas antiguo."""
+        repo = abrir(cantidad=10)
+        assert _temperaturas(repo.obtener()) == list(range(9, -1, -1))
+        assert repo.obtener(3) == [registro(9), registro(8), registro(7)]
+        assert repo.cantidad() == 10
+
+    def test_obtener_con_limite(self, abrir):
+        """El limite restringe la cantidad de registros retornados."""
+        repo = abrir(cantidad=5)
+        assert _temperaturas(repo.obtener(2)) == [4, 3]
+        assert len(repo.obtener(50)) == 5
+        assert repo.obtener(0) == []
+
+    def test_limpiar(self, abrir):
+        """limpiar() deja el repositorio vacio y reutilizable."""
+        repo = abrir(cantidad=7)
+        repo.limpiar()
+        assert repo.cantidad() == 0
+        assert repo.obtener() == []
+        repo.agregar(registro(9))
+        assert repo.obtener() == [registro(9)]
+
+    def test_version_cambia_al_agregar_y_limpiar(self, abrir):
+        """version() cambia con cada agregado y limpieza."""
+        repo = abrir()
+        inicial = repo.version()
+        repo.agregar(registro(0))
+        agregado = repo.version()
+        repo.limpiar()
+        assert len({inicial, agregado, repo.version()}) == 3
+
+
+class TestObtenerRango:
+    """Tests para consultas por rango de tiempo."""
+
+    def test_rango_inclusivo_mas_reciente_primero(self, abrir):
+        """Retorna los registros dentro de [desde, hasta] en orden descendente."""
+        repo = abrir(cantidad=10)
+        registros = repo.obtener_rango(BASE + timedelta(seconds=3), BASE + timedelta(seconds=6))
+        assert _temperaturas(registros) == [6, 5, 4, 3]
+
+    def test_rango_sin_cotas(self, abrir):
+        """Sin cotas equivale a obtener()."""
+        repo = abrir(cantidad=10)
+        assert repo.obtener_rango() == repo.obtener()
+
+    def test_rango_con_limite(self, abrir):
+        """El limite se aplica sobre los mas recientes del rango."""
+        repo = abrir(cantidad=10)
+        registros = repo.obtener_rango(desde=BASE + timedelta(seconds=2), limite=3)
+        assert _temperaturas(registros) == [9, 8, 7]
+
+    def test_rango_vacio(self, abrir):
+        """Un rango sin registros retorna lista vacia."""
+        repo = abrir(cantidad=10)
+        assert repo.obtener_rango(desde=BASE + timedelta(hours=1)) == []
+        assert repo.obtener_rango(BASE + timedelta(seconds=5), BASE + timedelta(seconds=4)) == []
+
+
+class TestCursor:
+    """Tests para la paginacion por cursor."""
+
+    def test_paginar_con_cursor(self, abrir):
+        """Las paginas por cursor cubren el historial sin repetir registros."""
+        repo = abrir(cantidad=10)
+        assert paginar(repo, 3) == [[9, 8, 7], [6, 5, 4], [3, 2, 1], [0]]
+
+    def test_cursor_desempata_por_secuencia(self, abrir):
+        """Registros con el mismo timestamp se separan por su secuencia."""
+        repo = abrir()
+        for temperatura in range(5):
+            repo.agregar(RegistroTemperatura(temperatura=temperatura, timestamp=BASE))
+        assert paginar(repo, 2) == [[4, 3], [2, 1], [0]]
+
+    def test_iterar_desde_cursor_con_agregados_nuevos(self, abrir):
+        """iterar() retoma despues del cursor aunque se agreguen registros."""
+        repo = abrir(cantidad=6)
+        pagina = list(repo.iterar(limite=3))
+        repo.agregar(registro(6))
+        cursor = CursorHistorial(pagina[-1].timestamp, pagina[-1].secuencia)
+        assert _temperaturas(repo.iterar(limite=3, antes_de=cursor)) == [2, 1, 0]
+
+
+@pytest.mark.parametrize('abrir', _ACOTADOS, indirect=True)
+class TestCapacidad:
+    """Tests para los backends con capacidad fija (buffer circular)."""
+
+    def test_descarta_mas_antiguo_al_superar_capacidad(self, abrir):
+        """Al llenarse se sobrescribe el registro mas antiguo."""
+        repo = abrir(capacidad=3, cantidad=7)
+        assert repo.cantidad() == 3
+        assert _temperaturas(repo.obtener()) == [6, 5, 4]
+
+    def test_rango_con_buffer_circular_lleno(self, abrir):
+        """La busqueda respeta el orden logico tras sobrescribir registros."""
+        repo = abrir(capacidad=4, cantidad=10)
+        registros = repo.obtener_rango(hasta=BASE + timedelta(seconds=7, microseconds=500))
+        assert _temperaturas(registros) == [7, 6]
+
+    def test_estadisticas_con_desalojo(self, abrir):
+        """Las estadisticas solo consideran los registros retenidos."""
+        repo = abrir(capacidad=3)
+        for temperatura in [40, 10, 20, 30, 25]:
+            repo.agregar(RegistroTemperatura(temperatura=temperatura, timestamp=BASE))
+        estadisticas = repo.estadisticas()
+        assert estadisticas['cantidad'] == 3
+        assert estadisticas['media'] == 25.0
+        assert estadisticas['minimo'] == 20
+        assert estadisticas['maximo'] == 30
+
+    def test_iterar_desde_cursor_desalojado(self, abrir):
+        """Un cursor anterior al registro mas antiguo retenido no retorna registros."""
+        repo = abrir(capacidad=3, cantidad=6)
+        assert list(repo.iterar(antes_de=CursorHistorial(BASE, 1))) == []
+
+
+@pytest.mark.parametrize('abrir', _PERSISTENTES, indirect=True)
+class TestReabrir:
+    """Tests para los backends que conservan el historial entre instancias."""
+
+    def test_persiste_entre_instancias(self, abrir):
+        """Al reabrir se recupera el historial y se sigue agregando."""
+        repo = abrir.reabrir(abrir(cantidad=6))
+        assert repo.cantidad() == 6
+        repo.agregar(registro(6))
+        assert _temperaturas(repo.obtener(3)) == [6, 5, 4]
+
+    def test_cursor_valido_al_reabrir(self, abrir):
+        """Las secuencias se conservan al reabrir."""
+        repo = abrir(cantidad=10)
+        ultimo = repo.obtener(5)[-1]
+        repo = abrir.reabrir(repo)
+        cursor = CursorHistorial(ultimo.timestamp, ultimo.secuencia)
+        assert _temperaturas(repo.iterar(antes_de=cursor)) == [4, 3, 2, 1, 0]
+
+    def test_estadisticas_se_recuperan_al_reabrir(self, abrir):
+        """Las estadisticas se reconstruyen al abrir el historial existente."""
+        repo = abrir()
+        for temperatura in [10, 20, 30]:
+            repo.agregar(RegistroTemperatura(temperatura=temperatura, timestamp=BASE))
+        assert repo.estadisticas()['media'] == 20.0
+        estadisticas = abrir.reabrir(repo).estadisticas()
+        assert estadisticas['cantidad'] == 3
+        assert estadisticas['minimo'] == 10
+        assert estadisticas['maximo'] == 30
@@ -0,0 +1,86 @@
+"""
+Tests unitarios para HistorialRepositorioSegmentos.
+El contrato comun de los repositorios se prueba en test_repositorio.py.
+"""
+import os
+from unittest.mock import patch
+
+import pytest
+
+from app.datos import HistorialRepositorioSegmentos
+from app.datos.segmentos import _Segmento
+from tests.conftest import registro
+
+
+@pytest.fixture
+def directorio(tmp_path):
+    return str(tmp_path / "historial")
+
+
+@pytest.fixture
+def repo(directorio):
+    # 4 registros de 12 bytes por segmento
+    repositorio = HistorialRepositorioSegmentos(directorio, tamano_segmento=48)
+    yield repositorio
+    repositorio.cerrar()
+
+
+class TestHistorialRepositorioSegmentos:
+    """Tests para el log binario segmentado."""
+
+    def test_rota_segmentos_por_tamano(self, repo, directorio):
+        """Se crea un segmento nuevo al completar el tamaño configurado."""
+        for i in range(10):
+            repo.agregar(registro(i))
+        archivos = sorted(a for a in os.listdir(directorio) if a.endswith('.bin'))
+        assert len(archivos) == 3
+        assert [os.path.getsize(os.path.join(directorio, a)) for a in archivos] == [48, 48, 24]
+
+    def test_descarta_registro_incompleto(self, repo, directorio):
+        """Un registro truncado al final del ultimo segmento se ignora."""
+        for i in range(2):
+            repo.agregar(registro(i))
+        repo.cerrar()
+        ultimo = os.path.join(directorio, sorted(os.listdir(directorio))[-1])
+        with open(ultimo, 'ab') as archivo:
+            archivo.write(b'\x01\x02\x03')
+        reabierto = HistorialRepositorioSegmentos(directorio, tamano_segmento=48)
+        assert reabierto.cantidad() == 2
+        reabierto.agregar(registro(2))
+        assert [r.temperatura for r in reabierto.obtener()] == [2, 1, 0]
+        reabierto.cerrar()
+
+    def test_limpiar(self, repo, directorio):
+        """limpiar() elimina los segmentos."""
+        for i in range(5):
+            repo.agregar(registro(i))
+        repo.limpiar()
+        assert repo.cantidad() == 0
+        assert os.listdir(directorio) == []
+        repo.agregar(registro(1))
+        assert repo.obtener() == [registro(1)]
+
+    def test_estadisticas_al_reabrir_solo_recorren_el_activo(self, repo, directorio):
+        """Los segmentos cerrados aportan sus sumas desde el resumen, sin leerlos."""
+        for i in range(10):
+            repo.agregar(registro(i))
+        repo.cerrar()
+        original = _Segmento.temperaturas
+        with patch.object(_Segmento, 'temperaturas', autospec=True, side_effect=original) as leer:
+            reabierto = HistorialRepositorioSegmentos(directorio, tamano_segmento=48)
+        assert leer.call_count == 1
+        estadisticas = reabierto.estadisticas()
+        assert (estadisticas['cantidad'], estadisticas['media']) == (10, 4.5)
+        assert (estadisticas['minimo'], estadisticas['maximo']) == (0, 9)
+        reabierto.cerrar()
+
+    def test_resumen_faltante_se_reconstruye(self, repo, directorio):
+        """Sin archivo de resumen se recorren los segmentos cerrados una vez."""
+        for i in range(10):
+            repo.agregar(registro(i))
+        repo.cerrar()
+        os.remove(os.path.join(directorio, 'resumen.est'))
+        reabierto = HistorialRepositorioSegmentos(directorio, tamano_segmento=48)
+        assert reabierto.estadisticas()['cantidad'] == 10
+        assert os.path.exists(os.path.join(directorio, 'resumen.est'))
+        reabierto.cerrar()
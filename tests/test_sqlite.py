@@ -0,0 +1,60 @@
+"""
+Tests unitarios para HistorialRepositorioSQLite.
+El contrato comun de los repositorios se prueba en test_repositorio.py.
+"""
+import sqlite3
+import time
+
+import pytest
+
+from app.datos import HistorialRepositorioSQLite
+from tests.conftest import registro
+
+
+def _filas_confirmadas(ruta):
+    """Cuenta filas visibles desde otra conexion (solo commits)."""
+    conexion = sqlite3.connect(ruta)
+    try:
+        return conexion.execute("SELECT COUNT(*) FROM historial").fetchone()[0]
+    finally:
+        conexion.close()
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "historial.db")
+
+
+@pytest.fixture
+def repo(ruta):
+    repositorio = HistorialRepositorioSQLite(ruta, lote=3, intervalo_ms=0)
+    yield repositorio
+    repositorio.cerrar()
+
+
+class TestHistorialRepositorioSQLite:
+    """Tests para el repositorio SQLite."""
+
+    def test_usa_modo_wal(self, repo, ruta):
+        """La base queda configurada en journal WAL."""
+        conexion = sqlite3.connect(ruta)
+        assert conexion.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+        conexion.close()
+
+    def test_confirma_por_lotes(self, repo, ruta):
+        """Los inserts se confirman al completar el lote."""
+        repo.agregar(registro(0))
+        repo.agregar(registro(1))
+        assert _filas_confirmadas(ruta) == 0
+        repo.agregar(registro(2))
+        assert _filas_confirmadas(ruta) == 3
+
+    def test_confirma_al_vencer_intervalo(self, ruta):
+        """Un lote incompleto se confirma al pasar el intervalo."""
+        repo = HistorialRepositorioSQLite(ruta, lote=100, intervalo_ms=20)
+        repo.agregar(registro(0))
+        limite = time.monotonic() + 2
+        while _filas_confirmadas(ruta) == 0 and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert _filas_confirmadas(ruta) == 1
+        repo.cerrar()
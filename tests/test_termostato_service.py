@@ -1,7 +1,14 @@
 """Tests unitarios de TermostatoService."""
+import json
+import threading
+import time
+
 import pytest
 from unittest.mock import MagicMock
 
+from app.datos.compacto import HistorialRepositorioCompacto
+from app.datos.memoria import HistorialRepositorioMemoria
+from app.datos.persistidor_json import TermostatoPersistidorJSON
 from app.general.calculadores import IndicadorCalculatorTresNiveles
 from app.general.termostato_modelo import TermostatoModelo
 from app.general.validators import TermostatoValidator
@@ -110,3 +117,284 @@ class TestCargarEstado:
         service.cargar_estado()
         assert service.modelo.temperatura_ambiente == 28
         assert service.modelo.estado_climatizador == "enfriando"
+
+
+class TestDeteccionDeCambios:
+
+    def test_valor_repetido_no_persiste(self, service_con_persistidor):
+        service_con_persistidor.actualizar_temperatura_deseada(22)
+        service_con_persistidor.actualizar_temperatura_deseada(22)
+        service_con_persistidor._persistidor.guardar.assert_called_once()
+        assert service_con_persistidor.metricas()['escrituras_evitadas'] == 1
+
+    @pytest.mark.parametrize("metodo,valor", [
+        ('actualizar_temperatura_ambiente', 20),
+        ('actualizar_temperatura_deseada', 24),
+        ('actualizar_carga_bateria', 5.0),
+        ('actualizar_estado_climatizador', 'apagado'),
+    ])
+    def test_valor_actual_no_persiste(self, service_con_persistidor, metodo, valor):
+        getattr(service_con_persistidor, metodo)(valor)
+        service_con_persistidor._persistidor.guardar.assert_not_called()
+
+    def test_valor_repetido_invalido_lanza_error(self, service_con_persistidor):
+        with pytest.raises(ValueError):
+            service_con_persistidor.actualizar_temperatura_ambiente("20x")
+
+    def test_lectura_repetida_se_registra_por_defecto(self):
+        repositorio = MagicMock()
+        service = TermostatoService(
+            modelo=TermostatoModelo(),
+            validator=TermostatoValidator(),
+            indicador_calc=IndicadorCalculatorTresNiveles(),
+            historial_repositorio=repositorio,
+        )
+        service.actualizar_temperatura_ambiente(20)
+        repositorio.agregar.assert_called_once()
+
+    def test_lectura_repetida_se_omite_si_se_configura(self):
+        repositorio = MagicMock()
+        service = TermostatoService(
+            modelo=TermostatoModelo(),
+            validator=TermostatoValidator(),
+            indicador_calc=IndicadorCalculatorTresNiveles(),
+            historial_repositorio=repositorio,
+            registrar_repetidas=False,
+        )
+        service.actualizar_temperatura_ambiente(25)
+        service.actualizar_temperatura_ambiente(25)
+        assert repositorio.agregar.call_count == 1
+        assert service.metricas() == {
+            'actualizaciones': 2,
+            'escrituras': 0,
+            'escrituras_evitadas': 0,
+            'historial_evitados': 1
+        }
+
+
+class TestActualizar:
+
+    def test_aplica_varios_campos_en_una_version(self, service):
+        service.actualizar({'temperatura_deseada': 18, 'carga_bateria': 3.0})
+        assert service.modelo.temperatura_deseada == 18
+        assert service.modelo.carga_bateria == 3.0
+        assert service.version == 1
+
+    def test_valor_invalido_no_aplica_ninguno(self, service_con_persistidor):
+        with pytest.raises(ValueError):
+            service_con_persistidor.actualizar({'temperatura_deseada': 18, 'carga_bateria': 9.0})
+        assert service_con_persistidor.modelo.temperatura_deseada == 24
+        service_con_persistidor._persistidor.guardar.assert_not_called()
+
+    @pytest.mark.parametrize("valores", [{}, {'indicador': 'NORMAL'}])
+    def test_sin_campos_validos_lanza_error(self, service, valores):
+        with pytest.raises(ValueError):
+            service.actualizar(valores)
+
+    def test_persiste_y_registra_una_vez(self):
+        persistidor = MagicMock()
+        repositorio = MagicMock()
+        service = TermostatoService(
+            modelo=TermostatoModelo(),
+            validator=TermostatoValidator(),
+            indicador_calc=IndicadorCalculatorTresNiveles(),
+            persistidor=persistidor,
+            historial_repositorio=repositorio,
+        )
+        service.actualizar({
+            'temperatura_ambiente': 25,
+            'temperatura_deseada': 18,
+            'carga_bateria': 3.0,
+            'estado_climatizador': 'enfriando'
+        })
+        persistidor.guardar.assert_called_once()
+        assert persistidor.guardar.call_args[0][0]['estado_climatizador'] == 'enfriando'
+        repositorio.agregar.assert_called_once()
+        assert repositorio.agregar.call_args[0][0].temperatura == 25
+
+    def test_lectura_repetida_se_registra_sin_persistir(self, service_con_persistidor):
+        repositorio = MagicMock()
+        service_con_persistidor._historial_repositorio = repositorio
+        service_con_persistidor.actualizar({'temperatura_ambiente': 20})
+        repositorio.agregar.assert_called_once()
+        service_con_persistidor._persistidor.guardar.assert_not_called()
+
+
+class TestSnapshot:
+
+    def test_snapshot_incluye_estado_e_indicador(self, service):
+        service.actualizar_carga_bateria(2.0)
+        assert service.snapshot() == {
+            'temperatura_ambiente': 20,
+            'temperatura_deseada': 24,
+            'carga_bateria': 2.0,
+            'estado_climatizador': 'apagado',
+            'indicador': 'CRITICO',
+            'version': 1
+        }
+
+    def test_valor_repetido_no_cambia_version(self, service):
+        service.actualizar_temperatura_deseada(18)
+        service.actualizar_temperatura_deseada(18)
+        assert service.version == 1
+
+    def test_modelo_es_inmutable(self, service):
+        modelo = service.modelo
+        service.actualizar_temperatura_deseada(18)
+        assert modelo.temperatura_deseada == 24
+        with pytest.raises(AttributeError):
+            service.modelo.temperatura_deseada = 20
+
+    def test_lectura_no_espera_a_un_escritor(self, service):
+        tomado, liberar = threading.Event(), threading.Event()
+
+        def escritor():
+            with service._bloqueo():
+                tomado.set()
+                liberar.wait(5)
+
+        hilo = threading.Thread(target=escritor)
+        hilo.start()
+        tomado.wait(5)
+        try:
+            assert service.snapshot()['version'] == 0
+        finally:
+            liberar.set()
+            hilo.join()
+
+
+class TestEsperarCambio:
+
+    def test_sin_cambios_retorna_none_al_vencer(self, service):
+        assert service.esperar_cambio(0, timeout=0.05) is None
+
+    def test_version_distinta_retorna_de_inmediato(self, service):
+        service.actualizar_temperatura_deseada(18)
+        assert service.esperar_cambio(0, timeout=0)['temperatura_deseada'] == 18
+        assert service.esperar_cambio(7, timeout=0)['version'] == 1
+
+    def test_cambio_despierta_a_los_que_esperan(self, service):
+        resultados = []
+
+        def esperar():
+            inicio = time.monotonic()
+            resultados.append((service.esperar_cambio(0, timeout=5), time.monotonic() - inicio))
+
+        hilos = [threading.Thread(target=esperar) for _ in range(3)]
+        for hilo in hilos:
+            hilo.start()
+        time.sleep(0.05)
+        service.actualizar_carga_bateria(2.0)
+        for hilo in hilos:
+            hilo.join()
+        assert len(resultados) == 3
+        for estado, espera in resultados:
+            assert estado['version'] == 1
+            assert estado['indicador'] == 'CRITICO'
+            assert espera < 5
+
+    def test_valor_repetido_no_despierta(self, service):
+        threading.Timer(0.02, service.actualizar_temperatura_deseada, args=(24,)).start()
+        assert service.esperar_cambio(0, timeout=0.1) is None
+
+
+def _en_hilos(*objetivos):
+    """Ejecuta cada objetivo en su propio hilo y propaga el primer error."""
+    errores = []
+
+    def envolver(objetivo):
+        def ejecutar():
+            try:
+                objetivo()
+            except BaseException as error:
+                errores.append(error)
+        return ejecutar
+
+    hilos = [threading.Thread(target=envolver(objetivo)) for objetivo in objetivos]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    if errores:
+        raise errores[0]
+
+
+class TestConcurrencia:
+
+    ITERACIONES = 300
+
+    def test_snapshot_nunca_mezcla_estados(self, tmp_path):
+        persistidor = TermostatoPersistidorJSON(str(tmp_path / "estado.json"))
+        calculador = IndicadorCalculatorTresNiveles()
+        service = TermostatoService(
+            modelo=TermostatoModelo(),
+            validator=TermostatoValidator(),
+            indicador_calc=calculador,
+            persistidor=persistidor,
+            historial_repositorio=HistorialRepositorioMemoria(capacidad=10000),
+        )
+        terminado = threading.Event()
+
+        def escribir(desplazamiento):
+            for i in range(self.ITERACIONES):
+                service.actualizar_carga_bateria(1.0 if (i + desplazamiento) % 2 else 5.0)
+                service.actualizar_temperatura_ambiente(10 + (i + desplazamiento) % 20)
+
+        def leer():
+            while not terminado.is_set():
+                estado = service.snapshot()
+                assert estado['indicador'] == calculador.calcular(estado['carga_bateria'])
+                time.sleep(0)
+
+        def escritores():
+            try:
+                _en_hilos(*(lambda d=d: escribir(d) for d in range(4)))
+            finally:
+                terminado.set()
+
+        _en_hilos(escritores, leer, leer)
+
+        guardado = json.loads((tmp_path / "estado.json").read_text(encoding='utf-8'))
+        assert guardado['indicador'] == calculador.calcular(guardado['carga_bateria'])
+        estado = service.snapshot()
+        assert estado.pop('version') == service.metricas()['escrituras']
+        assert guardado == estado
+        assert service.metricas()['actualizaciones'] == 8 * self.ITERACIONES
+
+    def test_guardados_concurrentes_dejan_json_valido(self, tmp_path):
+        persistidor = TermostatoPersistidorJSON(str(tmp_path / "estado.json"))
+
+        def guardar(valor):
+            for _ in range(self.ITERACIONES):
+                persistidor.guardar({'campo': valor, 'relleno': valor * 100})
+
+        def cargar():
+            for _ in range(self.ITERACIONES):
+                datos = persistidor.cargar()
+                if datos is not None:
+                    assert datos['relleno'] == datos['campo'] * 100
+
+        _en_hilos(lambda: guardar('a'), lambda: guardar('bb'), cargar)
+        assert persistidor.cargar()['campo'] in ('a', 'bb')
+
+    @pytest.mark.parametrize("repositorio", [
+        HistorialRepositorioMemoria, HistorialRepositorioCompacto
+    ])
+    def test_agregados_concurrentes_no_se_pierden(self, repositorio):
+        repositorio = repositorio(capacidad=10000)
+        service = TermostatoService(
+            modelo=TermostatoModelo(),
+            validator=TermostatoValidator(),
+            indicador_calc=IndicadorCalculatorTresNiveles(),
+            historial_repositorio=repositorio,
+        )
+
+        def registrar():
+            for i in range(self.ITERACIONES):
+                service.actualizar_temperatura_ambiente(i % 40)
+
+        _en_hilos(*[registrar] * 4)
+        registros = repositorio.obtener()
+        assert repositorio.cantidad() == 4 * self.ITERACIONES
+        assert repositorio.estadisticas()['cantidad'] == 4 * self.ITERACIONES
+        assert len({registro.secuencia for registro in registros}) == len(registros)